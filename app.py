@@ -1,31 +1,223 @@
 import dash
-from dash import dcc, html, Input, Output, State, callback_context
-import plotly.graph_objects as go
-import plotly.express as px
-import pandas as pd
+from dash import dcc, html, Input, Output, State, Patch, ClientsideFunction, callback_context
 import numpy as np
+from plotly.io.json import to_json_plotly
 from dash.exceptions import PreventUpdate
+from flask import Response, jsonify, request
+from urllib.parse import quote
 import json
+import os
+import threading
+from batch_parser import parse_batch_text
+from callback_metrics import CallbackMetrics, SamplingProfiler, callback_name
+from compute_cache import ComputeCache
+from edit_history import EditHistory
+from exporter import EXPORT_FILENAME, EXPORT_FORMATS, available_formats, build_export_frame, stream_export
+from figures import FigureTemplates
+from period_detection import detect_periods
+from schedule_profile import Profile
+from session_store import SessionStore
+from simulation import DEFAULT_CORRELATION, DEFAULT_PERCENTILES, DEFAULT_SPREAD, SPREADS, simulate, summarize
+from variance_models import DEFAULT_MODEL, VarianceEngine
+from workspace import Workspace
+
+# 布局是静态的：启动时序列化一次（preload_app 时在主进程中完成，工作进程通过 fork 共享），
+# 之后每次请求直接返回，不再重新序列化
+class PreloadedDash(dash.Dash):
+    layout_json = None
+
+    def serve_layout(self):
+        if self.layout_json is None:
+            self.layout_json = to_json_plotly(self._layout_value())
+        return Response(self.layout_json, mimetype='application/json')
+    
+    # 所有服务器端回调都记录回调函数本身的耗时
+    def callback(self, *args, **kwargs):
+        register = super().callback(*args, **kwargs)
+        return lambda func: register(callback_metrics.instrument(func))
+
+# 回调性能指标（/metrics）
+callback_metrics = CallbackMetrics()
 
 # 初始化Dash应用
-app = dash.Dash(__name__, suppress_callback_exceptions=True)
+app = PreloadedDash(__name__, suppress_callback_exceptions=True)
 app.title = "作息分析工具"
 
-# 读取初始数据
-df = pd.read_csv('作息.csv')
+# 读取初始数据：设置 WORKSPACE_PATH 时加载多站点/日型的作息曲线工作区，
+# 否则只加载 作息.csv（方差和上下界按系数1.0初始化）
+if os.environ.get('WORKSPACE_PATH'):
+    workspace = Workspace.load(os.environ['WORKSPACE_PATH'])
+else:
+    workspace = Workspace.from_profile(Profile.from_csv('作息.csv'), '341', '工作日')
+
+# 图表模板：所有作息曲线共享同一组时间槽
+figure_templates = FigureTemplates(workspace.times)
+
+# 默认曲线自动识别的作息时间，作为 period-times 的初始值
+default_periods = detect_periods(workspace.averages[workspace.index[workspace.default_label]], workspace.times)[0]
+
+# 计算结果缓存：多个工作进程共享，反复拖回之前的系数时直接返回结果
+compute_cache = ComputeCache()
+
+# 蒙特卡洛模拟每次最多的样本数；在请求线程中单进程运行，批量模拟请用 simulation.py 的命令行
+SIMULATION_MAX_SAMPLES = int(os.environ.get('SIMULATION_MAX_SAMPLES', 100000))
+
+# 作息方差模型：配置了历史数据（VARIANCE_HISTORY_PATH）时可以选择拟合模型，拟合参数保存在计算结果缓存中
+variance_engine = VarianceEngine(os.environ.get('VARIANCE_HISTORY_PATH'), workspace.times, compute_cache)
+
+# 全局调整：按 (模型, 历史数据指纹, 曲线名称, 平均作息, 系数) 缓存方差和上下界
+def apply_global_cached(profile, multiplier, model=DEFAULT_MODEL, label=None):
+    key = ComputeCache.make_key('bounds', model, variance_engine.fingerprint, label, profile.average.tobytes(),
+                                float(multiplier))
+    with callback_metrics.stage('apply_global'):
+        payload = compute_cache.get(key)
+        if payload is None:
+            profile.apply_global(multiplier, variance_engine.model_function(model, label))
+            compute_cache.set(key, np.concatenate([profile.variance, profile.upper, profile.lower]).tobytes())
+        else:
+            profile.variance, profile.upper, profile.lower = np.frombuffer(payload).reshape(3, -1).copy()
+
+# 生成图表并缓存图表JSON，缓存键为 (模板指纹, 图, 平均作息, 方差, 曲线名称, 可见范围)
+# 方差数组已经包含了全局系数和逐点修改的结果，所以不需要单独记录系数和修改记录
+def build_figure_cached(graph_id, profile, label, window=None):
+    key = ComputeCache.make_key('figure', figure_templates.fingerprint, graph_id, profile.average.tobytes(),
+                                profile.variance.tobytes(), label, window)
+    with callback_metrics.stage('build_figure'):
+        payload = compute_cache.get(key)
+        if payload is not None:
+            return json.loads(payload)
+        if graph_id == 'graph1':
+            figure = figure_templates.graph1_figure(profile, label, window)
+        else:
+            figure = figure_templates.graph2_figure(profile, label, window)
+        compute_cache.set(key, to_json_plotly(figure).encode('utf-8'))
+        return figure
+
+# 缓存命中情况（监控用）
+@app.server.route('/metrics/cache')
+def cache_metrics():
+    return jsonify(compute_cache.stats())
+
+# 回调性能指标：每个回调的各阶段耗时、请求/响应大小和触发来源（Prometheus 文本格式，见 callback_metrics.py）
+# 设置 CALLBACK_PROFILE_DIR 时对每个回调请求做采样分析，折叠栈文件写入该目录；
+# CALLBACK_PROFILE_MIN_MS 为只保存耗时不少于该值的请求（默认全部保存），CALLBACK_PROFILE_INTERVAL_MS 为采样间隔
+if os.environ.get('CALLBACK_PROFILE_DIR'):
+    profiler = SamplingProfiler(os.environ['CALLBACK_PROFILE_DIR'],
+                                float(os.environ.get('CALLBACK_PROFILE_INTERVAL_MS', 5)) / 1000,
+                                float(os.environ.get('CALLBACK_PROFILE_MIN_MS', 0)) / 1000)
+else:
+    profiler = None
+
+@app.server.before_request
+def begin_callback_metrics():
+    if request.path.endswith('/_dash-update-component'):
+        body = request.get_json(silent=True) or {}
+        changed = body.get('changedPropIds') or ['initial']
+        callback_metrics.begin(callback_name(body.get('output', '')), changed[0].split('.')[0],
+                               request.content_length or 0)
+        if profiler:
+            profiler.start()
+
+# 只统计回调请求；流式响应（如 /export/all）不能计算长度，否则会在发送前生成全部内容
+@app.server.after_request
+def finish_callback_metrics(response):
+    if not request.path.endswith('/_dash-update-component'):
+        return response
+    size = 0 if response.is_streamed else response.calculate_content_length() or 0
+    finished = callback_metrics.finish(response.status_code, size)
+    if finished and profiler:
+        callback, stages = finished
+        profiler.stop(callback, stages['total'])
+    return response
+
+@app.server.route('/metrics')
+def prometheus_metrics():
+    cache = compute_cache.stats()
+    lines = ['# HELP dash_compute_cache_lookups_total 计算结果缓存查找次数（所有工作进程累计）',
+             '# TYPE dash_compute_cache_lookups_total counter',
+             f'dash_compute_cache_lookups_total{{result="hit"}} {cache["hits"]}',
+             f'dash_compute_cache_lookups_total{{result="miss"}} {cache["misses"]}',
+             '# HELP dash_compute_cache_entries 计算结果缓存条目数',
+             '# TYPE dash_compute_cache_entries gauge',
+             f'dash_compute_cache_entries {cache["entries"]}']
+    return Response(callback_metrics.render() + '\n'.join(lines) + '\n',
+                    mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+# 录制回调请求：设置 CALLBACK_RECORD_PATH 时把每个回调请求体追加一行到该文件，
+# 可以用 benchmarks/loadtest.py --replay 回放
+CALLBACK_RECORD_PATH = os.environ.get('CALLBACK_RECORD_PATH')
+if CALLBACK_RECORD_PATH:
+    record_lock = threading.Lock()
+    
+    @app.server.before_request
+    def record_callback_request():
+        if request.path.endswith('/_dash-update-component'):
+            line = json.dumps(request.get_json(silent=True), ensure_ascii=False) + '\n'
+            with record_lock, open(CALLBACK_RECORD_PATH, 'a', encoding='utf-8') as f:
+                f.write(line)
+
+# 服务器端会话存储：浏览器的 data-store 只保存 {'key': 会话键, 'profile': 当前曲线, 'version': 版本号, 'changed': 修改的时间槽}
+# 每条修改过的作息曲线单独保存一行，存储键为 "会话键:曲线名称"
+sessions = SessionStore()
 
-# 计算初始方差和上下界
-df['作息方差'] = (df['平均作息'] ** 3) * 1.0
-df['作息上界'] = np.minimum(df['平均作息'] + df['作息方差'], 1)
-df['作息下界'] = np.maximum(df['平均作息'] - df['作息方差'], 0)
+# 编辑历史：每次保存记录变化的时间槽，用于撤销/重做；会话数据被淘汰后也可以由历史恢复（见 edit_history.py）
+history = EditHistory()
 
-# 添加作息时间字段
-df['作息启动期A'] = ''
-df['作息启动期B'] = ''
-df['作息启动期C'] = ''
-df['作息结束期A'] = ''
-df['作息结束期B'] = ''
-df['作息结束期C'] = ''
+def session_row(session_key, label):
+    return f"{session_key}:{label}"
+
+# 会话中保存的作息曲线：会话数据不存在时由编辑历史恢复，都没有（未修改过或已过期）时使用工作区中的原始数据
+def stored_profile(session_key, label):
+    if session_key:
+        row = session_row(session_key, label)
+        payload = sessions.load(row)
+        if payload is not None:
+            return Profile.from_bytes(payload)
+        restored = history.restore(row)
+        if restored is not None:
+            return restored
+    return workspace.profile(label)
+
+# 读取会话中的作息曲线，label 默认为会话当前选中的曲线；version 为浏览器看到的版本号
+def load_session(store, label=None):
+    session_key = store['key'] if store else None
+    version = store.get('version', 0) if store else 0
+    label = label or (store['profile'] if store else workspace.default_label)
+    if label not in workspace:
+        label = workspace.default_label
+    with callback_metrics.stage('load_session'):
+        return {'key': session_key, 'profile': label, 'version': version}, stored_profile(session_key, label)
+
+# 写回会话数据，返回新的 data-store 内容；changed 为本次修改的时间槽（None 表示整条曲线）
+# 新版本号大于浏览器看到的版本号，会话数据被淘汰、由编辑历史恢复后图表也会重新渲染
+# record 为 False 时不记录编辑历史（撤销/重做本身）；undo/redo 为可以撤销和重做的步数
+def save_session(ref, profile, changed=None, record=True):
+    session_key = ref['key'] or sessions.new_key()
+    row = session_row(session_key, ref['profile'])
+    with callback_metrics.stage('save_session'):
+        if record:
+            history.record(row, stored_profile(ref['key'], ref['profile']), profile)
+        version = sessions.save(row, profile.to_bytes(), ref['version'] if ref['key'] else 0)
+        undo, redo = history.counts(row)
+    return {'key': session_key, 'profile': ref['profile'], 'version': version, 'changed': changed,
+            'undo': undo, 'redo': redo}
+
+# 生成作息时间显示
+def period_times_display(period_times):
+    return html.Div([
+        html.H5("已设置的作息时间：", style={'marginBottom': '10px', 'fontSize': '14px'}),
+        html.Div(f"作息启动期A: {period_times['作息启动期A'] or '未设置'}", style={'marginBottom': '5px', 'fontSize': '12px'}),
+        html.Div(f"作息启动期B: {period_times['作息启动期B'] or '未设置'}", style={'marginBottom': '5px', 'fontSize': '12px'}),
+        html.Div(f"作息启动期C: {period_times['作息启动期C'] or '未设置'}", style={'marginBottom': '5px', 'fontSize': '12px'}),
+        html.Div(f"作息结束期A: {period_times['作息结束期A'] or '未设置'}", style={'marginBottom': '5px', 'fontSize': '12px'}),
+        html.Div(f"作息结束期B: {period_times['作息结束期B'] or '未设置'}", style={'marginBottom': '5px', 'fontSize': '12px'}),
+        html.Div(f"作息结束期C: {period_times['作息结束期C'] or '未设置'}", style={'marginBottom': '5px', 'fontSize': '12px'})
+    ])
+
+# 初始状态：默认曲线的图1在启动时生成并写入布局，页面加载后不需要再请求服务器渲染
+# 各回调的初始输出都已写入布局，所以这些回调都设置了 prevent_initial_call
+initial_rendered = {'key': None, 'profile': workspace.default_label, 'version': 0, 'window': None}
+initial_graph1 = build_figure_cached('graph1', workspace.profile(workspace.default_label), workspace.default_label)
 
 # 应用布局
 app.layout = html.Div([
@@ -36,15 +228,32 @@ app.layout = html.Div([
     html.Div([
         #html.H3("控制面板", style={'marginBottom': '20px'}),
         
+        # 作息曲线选择（多站点/日型工作区）
+        html.H4("作息曲线"),
+        dcc.Dropdown(
+            id='profile-select',
+            options=workspace.labels,
+            value=workspace.default_label,
+            clearable=False
+        ),
+        
+        # 撤销/重做当前曲线的修改
+        html.Div([
+            html.Button("↶ 撤销", id='undo-edit', n_clicks=0, disabled=True, style={'marginRight': '10px'}),
+            html.Button("↷ 重做", id='redo-edit', n_clicks=0, disabled=True)
+        ], style={'marginTop': '10px'}),
+        
+        html.Hr(),
+        
         # 数据输入区域
         html.H4("数据输入"),
         html.Label("批量输入平均作息值（支持多种格式）："),
         html.P("💡 支持：逗号分隔、空格分隔、换行分隔、表格复制粘贴", style={'fontSize': '12px', 'color': 'gray'}),
         dcc.Textarea(
             id='batch-textarea',
-            value='0.00, 0.00, 0.00, 0.00, 0.00, 0.00, 0.00, 0.00, 0.00, 0.00, 0.00, 0.00, 0.00, 0.00, 0.00, 0.00, 0.00, 0.00, 0.00, 0.00, 0.00, 0.00, 0.00, 0.00, 0.00, 0.00, 0.00, 0.00, 0.00, 0.00, 0.00, 0.00, 0.00, 0.00, 0.00, 0.00, 0.00, 0.18, 0.24, 0.34, 0.44, 0.54, 0.64, 0.58, 0.52, 0.46, 0.40, 0.40, 0.40, 0.40, 0.40, 0.46, 0.52, 0.58, 0.64, 0.68, 0.72, 0.76, 0.80, 0.80, 0.80, 0.80, 0.80, 0.72, 0.64, 0.56, 0.48, 0.48, 0.48, 0.48, 0.48, 0.56, 0.64, 0.72, 0.80, 0.80, 0.80, 0.80, 0.80, 0.74, 0.68, 0.62, 0.56, 0.44, 0.32, 0.20, 0.08, 0.06, 0.04, 0.02, 0.00, 0.00, 0.00, 0.00, 0.00, 0.00',
+            value=', '.join(f"{v:.2f}" for v in workspace.averages[0]),
             style={'width': '100%', 'height': '100px'},
-            placeholder="请输入96个数值，支持多种格式..."
+            placeholder=f"请输入{len(workspace.times)}个数值，支持多种格式..."
         ),
         html.Button("应用批量输入", id='apply-batch', n_clicks=0, style={'marginTop': '10px'}),
         html.Div(id='batch-input-status', style={'marginTop': '5px', 'fontSize': '12px'}),
@@ -64,7 +273,15 @@ app.layout = html.Div([
         ),
         
         # 全局调整滑块
-        html.Div(id='global-adjustment', children=[
+        html.Div(id='global-adjustment', style={'display': 'none'}, children=[
+            html.Label("作息方差模型："),
+            dcc.Dropdown(
+                id='variance-model',
+                options=[{'label': title, 'value': name} for name, title in variance_engine.available()],
+                value=DEFAULT_MODEL,
+                clearable=False,
+                style={'marginBottom': '10px'}
+            ),
             html.Label("作息方差调整系数："),
             dcc.Slider(
                 id='variance-multiplier',
@@ -78,7 +295,7 @@ app.layout = html.Div([
         ]),
         
         # 逐个调整面板
-        html.Div(id='individual-adjustment', style={'display': 'none'}, children=[
+        html.Div(id='individual-adjustment', style={'display': 'block'}, children=[
             html.H4("逐个调整模式"),
             html.Div(id='selected-point-info'),
             html.Div(id='individual-variance-slider', children=[
@@ -92,13 +309,34 @@ app.layout = html.Div([
                     marks={i/10: str(i/10) for i in range(0, 11)},
                     tooltip={"placement": "bottom", "always_visible": True}
                 )
+            ]),
+            
+            # 批量修改：用图上的框选/套索选择多个点，一次修改全部选中的点
+            html.Div(id='selection-edit', style={'marginTop': '15px'}, children=[
+                html.Label("批量修改选中的点："),
+                html.Div(id='selection-info', children="💡 在图上用框选或套索选择多个点",
+                         style={'fontSize': '12px', 'color': 'gray', 'marginBottom': '5px'}),
+                dcc.Dropdown(
+                    id='selection-operation',
+                    options=[
+                        {'label': '方差设为', 'value': 'set'},
+                        {'label': '方差乘以', 'value': 'scale'},
+                        {'label': '平滑（窗口时间槽数，不小于3的奇数）', 'value': 'smooth'}
+                    ],
+                    value='set',
+                    clearable=False,
+                    style={'marginBottom': '5px'}
+                ),
+                dcc.Input(id='selection-value', type='number', value=0.1, min=0, step=0.01,
+                          style={'width': '100px', 'marginRight': '10px'}),
+                html.Button("应用到选中的点", id='apply-selection', n_clicks=0)
             ])
         ]),
         
         # 作息时间设置区域
         html.Hr(),
         html.H4("作息时间设置"),
-        html.P("💡 点击图表中的点，然后点击下方按钮设置作息时间", style={'fontSize': '12px', 'color': 'gray'}),
+        html.P("💡 作息时间已按曲线自动识别；点击图表中的点，然后点击下方按钮可以逐个修改", style={'fontSize': '12px', 'color': 'gray'}),
         
         # 作息启动期按钮
         html.Div([
@@ -120,8 +358,13 @@ app.layout = html.Div([
                        style={'width': '30%', 'margin': '2px', 'backgroundColor': '#dc3545', 'color': 'white', 'border': 'none', 'padding': '8px 4px', 'fontSize': '11px'})
         ], style={'display': 'flex', 'justifyContent': 'space-between'}),
         
+        # 自动识别按钮
+        html.Button("🔍 自动识别作息时间", id='detect-periods', n_clicks=0,
+                   style={'width': '100%', 'margin': '2px', 'backgroundColor': '#6c757d', 'color': 'white', 'border': 'none', 'padding': '8px 4px', 'fontSize': '11px'}),
+        
         # 作息时间显示
-        html.Div(id='period-times-display', style={'marginTop': '10px', 'fontSize': '12px'}),
+        html.Div(id='period-times-display', children=period_times_display(default_periods),
+                 style={'marginTop': '10px', 'fontSize': '12px'}),
         
         # 应用按钮
         html.Button("🔄 应用更改", id='apply-changes', n_clicks=0, 
@@ -132,10 +375,11 @@ app.layout = html.Div([
     html.Div([
         # 图表区域
         html.Div([
-            dcc.Tabs([
-                dcc.Tab(label="图1: 平均作息与作息方差", children=[
+            dcc.Tabs(id='graph-tabs', value='graph1', children=[
+                dcc.Tab(label="图1: 平均作息与作息方差", value='graph1', children=[
                     dcc.Graph(
                         id='graph1',
+                        figure=initial_graph1,
                         config={
                             'displayModeBar': True, 
                             'modeBarButtonsToAdd': ['pan2d', 'select2d', 'lasso2d'],
@@ -146,7 +390,7 @@ app.layout = html.Div([
                     ),
                     html.Div(id='click-output1', style={'marginTop': '10px'})
                 ]),
-                dcc.Tab(label="图2: 平均作息与上下界", children=[
+                dcc.Tab(label="图2: 平均作息与上下界", value='graph2', children=[
                     dcc.Graph(
                         id='graph2',
                         config={
@@ -158,6 +402,31 @@ app.layout = html.Div([
                         style={'height': '500px'}
                     ),
                     html.Div(id='click-output2', style={'marginTop': '10px'})
+                ]),
+                # 蒙特卡洛模拟：按当前曲线的平均作息和作息方差生成模拟的一天，显示分位数带和超过容量阈值的概率
+                dcc.Tab(label="蒙特卡洛模拟", value='simulation', children=[
+                    html.Div([
+                        html.Label("样本数：", style={'marginRight': '5px'}),
+                        dcc.Input(id='simulation-samples', type='number', value=10000, min=1000,
+                                  max=SIMULATION_MAX_SAMPLES, step=1000, style={'width': '100px', 'marginRight': '15px'}),
+                        html.Label("容量阈值：", style={'marginRight': '5px'}),
+                        dcc.Input(id='simulation-capacity', type='number', value=0.9, min=0, max=1, step=0.01,
+                                  style={'width': '80px', 'marginRight': '15px'}),
+                        html.Label("相邻时间槽相关系数：", style={'marginRight': '5px'}),
+                        dcc.Input(id='simulation-correlation', type='number', value=DEFAULT_CORRELATION, min=0,
+                                  max=0.99, step=0.05, style={'width': '80px', 'marginRight': '15px'}),
+                        html.Button("▶ 运行模拟", id='run-simulation', n_clicks=0)
+                    ], style={'marginTop': '10px'}),
+                    # 标准差的取法：默认与图2的上下界一致（平均作息 ± 作息方差 为 ±1 个标准差）
+                    dcc.RadioItems(
+                        id='simulation-spread',
+                        options=[{'label': title, 'value': name} for name, title in SPREADS.items()],
+                        value=DEFAULT_SPREAD,
+                        inline=True,
+                        style={'marginTop': '5px', 'fontSize': '12px'}
+                    ),
+                    dcc.Loading(dcc.Graph(id='simulation-graph', style={'height': '500px'})),
+                    html.Div(id='simulation-summary', style={'marginTop': '10px'})
                 ])
             ])
         ], style={'width': '90%', 'float': 'left'}),
@@ -178,24 +447,44 @@ app.layout = html.Div([
                 'cursor': 'pointer',
                 'boxShadow': '0 4px 8px rgba(0,0,0,0.2)',
                 'transition': 'all 0.3s ease'
-            })
+            }),
+            # 导出全部作息：链接由浏览器端按当前会话和调整参数生成，文件由 /export/all 流式下载
+            html.A("📦 导出全部作息", id='download-all-link', href=app.get_relative_path('/export/all'), style={
+                'display': 'inline-block',
+                'marginTop': '10px',
+                'marginLeft': '10px',
+                'padding': '15px 30px',
+                'fontSize': '16px',
+                'fontWeight': 'bold',
+                'backgroundColor': '#17a2b8',
+                'color': 'white',
+                'border': 'none',
+                'borderRadius': '8px',
+                'cursor': 'pointer',
+                'textDecoration': 'none',
+                'boxShadow': '0 4px 8px rgba(0,0,0,0.2)',
+                'transition': 'all 0.3s ease'
+            }),
+            dcc.Dropdown(
+                id='export-format',
+                options=[{'label': title, 'value': name} for name, title in available_formats()],
+                value='csv',
+                clearable=False,
+                style={'marginTop': '10px', 'width': '260px'}
+            )
         ], style={'width': '30%', 'float': 'left', 'padding': '20px'})
     ], style={'marginLeft': '20%'}),
     
     # 存储组件
-    dcc.Store(id='data-store', data=df.to_dict('records')),
+    dcc.Store(id='data-store', data=None),
     dcc.Store(id='selected-point', data=None),
-    dcc.Store(id='period-times', data={
-        '作息启动期A': '',
-        '作息启动期B': '',
-        '作息启动期C': '',
-        '作息结束期A': '',
-        '作息结束期B': '',
-        '作息结束期C': ''
-    }),
-    
-    # 键盘事件监听
-    dcc.Store(id='keyboard-events', data={'last_key': None}),
+    dcc.Store(id='graph1-rendered', data=initial_rendered),
+    dcc.Store(id='graph2-rendered', data=None),
+    dcc.Store(id='period-times', data=default_periods),
+    
+    # 键盘微调（assets/keyboard.js）：累计的净变化量 {'index': 时间槽, 'delta': 变化量, 'seq': 序号}
+    dcc.Store(id='keyboard-events', data=None),
+    html.Button(id='keyboard-sync', n_clicks=0, style={'display': 'none'}),
     
     # 下载组件
     dcc.Download(id='download-dataframe-csv'),
@@ -203,18 +492,6 @@ app.layout = html.Div([
     # 加载组件
     dcc.Loading(id="loading-1", type="default"),
     
-    # 键盘事件监听脚本
-    html.Script('''
-        document.addEventListener('keydown', function(event) {
-            if (event.key === 'ArrowUp' || event.key === 'ArrowDown') {
-                // 发送键盘事件到Dash
-                window.dispatchEvent(new CustomEvent('dash-keyboard', {
-                    detail: { key: event.key }
-                }));
-            }
-        });
-    '''),
-    
     # 清除浮动
     html.Div(style={'clear': 'both'})
 ], style={'fontFamily': 'Arial, sans-serif'})
@@ -223,7 +500,8 @@ app.layout = html.Div([
 @app.callback(
     [Output('global-adjustment', 'style'),
      Output('individual-adjustment', 'style')],
-    [Input('adjustment-mode', 'value')]
+    [Input('adjustment-mode', 'value')],
+    prevent_initial_call=True
 )
 def update_adjustment_mode(mode):
     if mode == 'global':
@@ -231,196 +509,303 @@ def update_adjustment_mode(mode):
     else:
         return {'display': 'none'}, {'display': 'block'}
 
-# 合并的回调函数：处理所有数据更新和图表渲染
+# 生成批量输入的状态提示
+def batch_status_message(result, labels, times):
+    n_values = result.values.size - result.padded - len(result.rejected)
+    if len(result.values) == 1:
+        messages = [f"✅ 成功解析 {n_values} 个数值"]
+    else:
+        messages = [f"✅ 解析到 {len(result.values)} 条曲线（共 {n_values} 个有效数值），已应用到：{'、'.join(labels)}"]
+        if len(labels) < len(result.values):
+            messages.append(f"⚠️ 工作区中没有更多曲线，后 {len(result.values) - len(labels)} 条未使用")
+    if result.rejected:
+        positions = '、'.join(f"第{block + 1}条 {times[slot]}（{token or '空白'}）"
+                              for block, slot, token in result.rejected[:5])
+        more = f" 等{len(result.rejected)}处" if len(result.rejected) > 5 else ""
+        messages.append(f"⚠️ 空白、非数值或超出[0,1]范围的单元格已置为0：{positions}{more}")
+    if result.truncated:
+        messages.append(f"⚠️ 数值个数不是 {len(times)} 的整数倍，只使用前 {len(times)} 个，忽略 {result.truncated} 个")
+    if result.padded:
+        messages.append(f"⚠️ 数值不足，已用0填充 {result.padded} 个")
+    return html.Div([html.Div(message) for message in messages])
+
+# 浏览器端回调：拖动全局方差滑块时在本地重算方差和上下界（见 assets/clientside.js）
+# 拖动过程中只触发 drag_value，不产生服务器请求；松开鼠标后 value 变化，
+# 再由模型阶段回调把结果写回会话存储。浏览器端只实现了立方模型，其他模型松开后由服务器计算
+app.clientside_callback(
+    ClientsideFunction(namespace='variance', function_name='recompute'),
+    [Output('graph1', 'figure', allow_duplicate=True),
+     Output('graph2', 'figure', allow_duplicate=True)],
+    [Input('variance-multiplier', 'drag_value')],
+    [State('adjustment-mode', 'value'),
+     State('variance-model', 'value'),
+     State('graph1', 'figure'),
+     State('graph2', 'figure')],
+    prevent_initial_call=True
+)
+
+# 数据处理分为几个阶段，每个阶段只在自己的输入变化时运行：
+#   解析（批量输入）→ 模型（方差）→ 上下界 → 按图渲染
+# 前三个阶段在 update_model 中按触发源分派，结果写入会话存储；
+# data-store 中的 changed 记录本次修改的时间槽（None 表示整条曲线都变了，[] 表示图表已由浏览器端更新），
+# 渲染阶段据此决定是整图重建还是只发送变化的点。平移/缩放只触发渲染阶段。
+
+# 回调函数：模型阶段（解析批量输入、计算方差和上下界），只写会话存储，不生成图表
 @app.callback(
     [Output('data-store', 'data'),
-     Output('graph1', 'figure'),
-     Output('graph2', 'figure'),
      Output('batch-input-status', 'children')],
     [Input('variance-multiplier', 'value'),
      Input('adjustment-mode', 'value'),
-     Input('selected-point', 'data'),
+     Input('variance-model', 'value'),
      Input('individual-variance', 'value'),
      Input('apply-batch', 'n_clicks'),
      Input('apply-changes', 'n_clicks'),
-     Input('graph1', 'relayoutData'),
-     Input('graph2', 'relayoutData')],
-    [State('batch-textarea', 'value'),
-     State('data-store', 'data')]
+     Input('apply-selection', 'n_clicks'),
+     Input('keyboard-events', 'data'),
+     Input('undo-edit', 'n_clicks'),
+     Input('redo-edit', 'n_clicks'),
+     Input('profile-select', 'value')],
+    [State('selected-point', 'data'),
+     State('batch-textarea', 'value'),
+     State('data-store', 'data'),
+     State('graph-tabs', 'value'),
+     State('graph1', 'selectedData'),
+     State('graph2', 'selectedData'),
+     State('selection-operation', 'value'),
+     State('selection-value', 'value')],
+    prevent_initial_call=True
 )
-def update_data_and_handle_interactions(variance_multiplier, adjustment_mode, selected_point, individual_variance, 
-                                      batch_clicks, apply_clicks, relayout1, relayout2, batch_text, data):
+def update_model(variance_multiplier, adjustment_mode, variance_model, individual_variance, batch_clicks,
+                 apply_clicks, selection_clicks, keyboard_event, undo_clicks, redo_clicks, profile_label, selected_point, batch_text, data, active_tab,
+                 selected_data1, selected_data2, selection_operation, selection_value):
     ctx = callback_context
     if not ctx.triggered:
         raise PreventUpdate
     
     trigger_id = ctx.triggered[0]['prop_id'].split('.')[0]
     
-    # 从存储中获取数据
-    df = pd.DataFrame(data)
+    # 撤销/重做：只写回记录的变化，渲染阶段据此只发送这些点（平均作息或整条曲线变化时整图重建）
+    if trigger_id in ('undo-edit', 'redo-edit'):
+        ref, profile = load_session(data, profile_label)
+        if not ref['key']:
+            raise PreventUpdate
+        row = session_row(ref['key'], ref['profile'])
+        changed = history.undo(row, profile) if trigger_id == 'undo-edit' else history.redo(row, profile)
+        if changed is False:
+            raise PreventUpdate
+        return save_session(ref, profile, changed=changed, record=False), ""
+    
+    # 键盘微调：应用浏览器端累计的净变化量（同一次请求中滑块也被设为新值，以这里为准）
+    if any(t['prop_id'] == 'keyboard-events.data' for t in ctx.triggered):
+        if adjustment_mode != 'individual' or not keyboard_event:
+            raise PreventUpdate
+        ref, profile = load_session(data, profile_label)
+        point_index = keyboard_event['index']
+        profile.set_variance(point_index, min(max(profile.variance[point_index] + keyboard_event['delta'], 0), 1))
+        return save_session(ref, profile, changed=[point_index]), ""
+    
+    # 逐个调整：只修改选中的时间点
+    if trigger_id == 'individual-variance':
+        point_index = selected_point.get('index') if selected_point else None
+        if adjustment_mode != 'individual' or point_index is None:
+            raise PreventUpdate
+        ref, profile = load_session(data, profile_label)
+        # 选中新的点时滑块会被设置为该点当前的值，此时数据没有变化
+        if profile.variance[point_index] == individual_variance:
+            raise PreventUpdate
+        profile.set_variance(point_index, individual_variance)
+        return save_session(ref, profile, changed=[point_index]), ""
+    
+    # 批量修改：当前标签页的图上框选/套索选中的点，一次向量化修改，渲染阶段只发送这些点
+    # 降采样显示时按选区在完整曲线上取点，包括图上没有画出的时间槽
+    if trigger_id == 'apply-selection':
+        selected_data = selected_data1 if active_tab == 'graph1' else selected_data2
+        if adjustment_mode != 'individual' or not selected_data or selection_value is None:
+            raise PreventUpdate
+        ref, profile = load_session(data, profile_label)
+        if figure_templates.decimates(len(profile)):
+            series = ([profile.average, profile.variance] if active_tab == 'graph1'
+                      else [profile.average, profile.upper, profile.lower])
+            indices = figure_templates.selected_slots(selected_data, series)
+        else:
+            indices = [point['customdata'] for point in selected_data.get('points', []) if 'customdata' in point]
+        if len(indices) == 0:
+            raise PreventUpdate
+        try:
+            indices = profile.edit_variance(indices, selection_operation, selection_value)
+        except ValueError as e:
+            return dash.no_update, f"❌ {e}"
+        return save_session(ref, profile, changed=indices.tolist()), ""
+    
+    # 全局系数变化时立方模型的图表已由浏览器端更新，服务器只负责保存结果
+    if trigger_id == 'variance-multiplier':
+        if adjustment_mode != 'global':
+            raise PreventUpdate
+        ref, profile = load_session(data, profile_label)
+        apply_global_cached(profile, variance_multiplier, variance_model, ref['profile'])
+        changed = [] if variance_model == 'cube' else None
+        return save_session(ref, profile, changed=changed), ""
+    
+    # 切换到逐个调整时数据不变；方差模型只在全局调整时生效
+    if trigger_id in ('adjustment-mode', 'variance-model') and adjustment_mode != 'global':
+        raise PreventUpdate
+    
+    # 从会话存储中获取数据
+    ref, profile = load_session(data, profile_label)
     status_message = ""
     
-    # 处理键盘事件和拖拽
-    if trigger_id in ['graph1', 'graph2']:
-        relayout_data = relayout1 if trigger_id == 'graph1' else relayout2
-        if relayout_data and selected_point:
-            point_index = selected_point['index']
-            
-            # 检查是否是键盘事件（通过relayoutData中的特殊标记）
-            if 'keyboard_event' in relayout_data:
-                key = relayout_data['keyboard_event']
-                current_variance = df.loc[point_index, '作息方差']
-                
-                if key == 'ArrowUp':
-                    # 增加方差值
-                    new_variance = min(current_variance + 0.01, 1.0)
-                    df.loc[point_index, '作息方差'] = new_variance
-                elif key == 'ArrowDown':
-                    # 减少方差值
-                    new_variance = max(current_variance - 0.01, 0.0)
-                    df.loc[point_index, '作息方差'] = new_variance
-                
-                # 更新上下界
-                current_average = df.loc[point_index, '平均作息']
-                df.loc[point_index, '作息上界'] = np.minimum(current_average + new_variance, 1)
-                df.loc[point_index, '作息下界'] = np.maximum(current_average - new_variance, 0)
-    
-    # 处理批量输入
+    # 解析阶段：处理批量输入，支持逗号、空格、换行、制表符分隔和表格复制粘贴
+    # 粘贴多条曲线时，依次应用到当前曲线及工作区中其后的曲线
     if trigger_id == 'apply-batch' and batch_text:
         try:
-            # 支持多种分隔符：逗号、空格、换行、制表符
-            import re
-            # 先按换行分割，再按逗号、空格、制表符分割
-            lines = batch_text.strip().split('\n')
-            values_str = []
-            
-            for line in lines:
-                if line.strip():
-                    # 分割每行中的数值
-                    line_values = re.split(r'[,\s\t]+', line.strip())
-                    values_str.extend([v.strip() for v in line_values if v.strip()])
-            
-            # 过滤掉非数字的字符串
-            numeric_values = []
-            for v in values_str:
-                try:
-                    val = float(v)
-                    if 0 <= val <= 1:
-                        numeric_values.append(val)
-                except ValueError:
-                    continue
-            
-            if len(numeric_values) == 96:
-                df['平均作息'] = numeric_values
-                status_message = f"✅ 成功解析 {len(numeric_values)} 个数值"
-            elif len(numeric_values) > 96:
-                df['平均作息'] = numeric_values[:96]
-                status_message = f"⚠️ 数值过多，只使用前96个"
-            elif len(numeric_values) < 96:
-                # 如果数值不足96个，用0填充
-                while len(numeric_values) < 96:
-                    numeric_values.append(0.0)
-                df['平均作息'] = numeric_values
-                status_message = f"⚠️ 数值不足96个，已用0填充到96个"
-            else:
+            result = parse_batch_text(batch_text, len(profile))
+            if len(result.values) == 0:
                 status_message = "❌ 未找到有效数值"
+            else:
+                profile.set_average(result.values[0])
+                start = workspace.index[ref['profile']]
+                labels = workspace.labels[start:start + len(result.values)]
+                if len(labels) > 1:
+                    ref['key'] = ref['key'] or sessions.new_key()
+                for label, values in zip(labels[1:], result.values[1:]):
+                    other_ref, other = load_session(ref, label)
+                    other.set_average(values)
+                    if adjustment_mode == 'global':
+                        apply_global_cached(other, variance_multiplier, variance_model, label)
+                    save_session(other_ref, other)
+                status_message = batch_status_message(result, labels, profile.times)
         except Exception as e:
             status_message = f"❌ 解析错误: {str(e)}"
-            pass
     
-    # 更新方差
+    # 模型和上下界阶段
     if adjustment_mode == 'global':
-        df['作息方差'] = (df['平均作息'] ** 3) * variance_multiplier
-        # 更新上下界
-        df['作息上界'] = np.minimum(df['平均作息'] + df['作息方差'], 1)
-        df['作息下界'] = np.maximum(df['平均作息'] - df['作息方差'], 0)
-    elif selected_point and adjustment_mode == 'individual' and trigger_id == 'individual-variance':
-        # 处理个别点调整
-        point_index = selected_point.get('index')
-        if point_index is not None:
-            # 更新选中点的方差
-            df.loc[point_index, '作息方差'] = individual_variance
-            # 更新该点的上下界
-            current_average = df.loc[point_index, '平均作息']
-            df.loc[point_index, '作息上界'] = np.minimum(current_average + individual_variance, 1)
-            df.loc[point_index, '作息下界'] = np.maximum(current_average - individual_variance, 0)
-    
-    # 创建图1
-    fig1 = go.Figure()
-    fig1.add_trace(go.Scatter(
-        x=df['时间'],
-        y=df['平均作息'],
-        mode='lines+markers',
-        name='平均作息',
-        line=dict(color='orange', width=3),
-        marker=dict(size=4),
-        customdata=np.arange(len(df))
-    ))
-    fig1.add_trace(go.Scatter(
-        x=df['时间'],
-        y=df['作息方差'],
-        mode='lines+markers',
-        name='作息方差',
-        line=dict(color='green', width=3, dash='dash'),
-        marker=dict(size=4),
-        customdata=np.arange(len(df))
-    ))
-    fig1.update_layout(
-        title="341-工作日客流",
-        xaxis_title="时间",
-        yaxis_title="数值",
-        xaxis=dict(
-            tickmode='array',
-            tickvals=df['时间'][::4],
-            ticktext=[f"{i//4:02d}:00" for i in range(0, 96, 4)]
-        ),
-        yaxis=dict(range=[0, 1]),
-        hovermode='x unified'
-    )
-    
-    # 创建图2
-    fig2 = go.Figure()
-    fig2.add_trace(go.Scatter(
-        x=df['时间'],
-        y=df['平均作息'],
-        mode='lines+markers',
-        name='平均作息',
-        line=dict(color='blue', width=3),
-        marker=dict(size=4),
-        customdata=np.arange(len(df))
-    ))
-    fig2.add_trace(go.Scatter(
-        x=df['时间'],
-        y=df['作息上界'],
-        mode='lines+markers',
-        name='作息上界',
-        line=dict(color='red', width=2),
-        marker=dict(size=3),
-        customdata=np.arange(len(df))
-    ))
-    fig2.add_trace(go.Scatter(
-        x=df['时间'],
-        y=df['作息下界'],
-        mode='lines+markers',
-        name='作息下界',
-        line=dict(color='purple', width=2),
-        marker=dict(size=3),
-        customdata=np.arange(len(df))
-    ))
-    fig2.update_layout(
-        title="作息上下界分析",
-        xaxis_title="时间",
-        yaxis_title="数值",
-        xaxis=dict(
-            tickmode='array',
-            tickvals=df['时间'][::4],
-            ticktext=[f"{i//4:02d}:00" for i in range(0, 96, 4)]
-        ),
-        yaxis=dict(range=[0, 1]),
-        hovermode='x unified'
-    )
+        apply_global_cached(profile, variance_multiplier, variance_model, ref['profile'])
+    
+    return save_session(ref, profile), status_message
+
+# 增量更新：只发送变化的时间点的方差或上下界（轨迹顺序见 figures.py）
+def build_points_patch(graph_id, profile, indices):
+    series = {1: profile.variance} if graph_id == 'graph1' else {1: profile.upper, 2: profile.lower}
+    patch = Patch()
+    for trace, values in series.items():
+        for i in indices:
+            patch['data'][trace]['y'][i] = float(values[i])
+    return patch
+
+# 渲染阶段：只渲染当前可见标签页中的图，另一个图在打开其标签页时再渲染
+# graph*-rendered 记录图上当前显示的是哪个会话、哪条曲线的哪个版本，以及降采样时按哪个可见范围取点
+# （relayoutData 只是最后一次操作，切换拖动模式等操作不含 x 轴范围，不能作为当前的可见范围）
+def render_graph(graph_id, data, active_tab, relayout, rendered):
+    if active_tab != graph_id:
+        raise PreventUpdate
+    
+    ctx = callback_context
+    trigger_id = ctx.triggered[0]['prop_id'].split('.')[0] if ctx.triggered else None
+    ref, profile = load_session(data)
+    decimated = figure_templates.decimates(len(profile))
+    rendered = rendered or {}
+    
+    # 平移/缩放：数据没有变化，只有降采样显示、且 x 轴范围确实变化时才需要按新的可见范围重新取点
+    if trigger_id == graph_id:
+        window = figure_templates.window_from_relayout(relayout, rendered.get('window'))
+        if not decimated or window == rendered.get('window'):
+            raise PreventUpdate
+        return build_figure_cached(graph_id, profile, ref['profile'], window), dict(rendered, window=window)
+    
+    # 切换曲线（uirevision 变化）或重新打开标签页后图按完整范围显示
+    window = rendered.get('window')
+    if trigger_id == 'graph-tabs' or rendered.get('profile') != ref['profile']:
+        window = None
+    current = {'key': ref['key'], 'profile': ref['profile'], 'version': data['version'] if data else 0,
+               'window': window}
+    if rendered == current:
+        raise PreventUpdate
+    
+    # 图上显示的正好是上一个版本（或会话建立前的初始数据）时，只发送变化的点
+    changed = data.get('changed') if data else None
+    previous = (rendered.get('profile') == current['profile']
+                and rendered.get('version') == current['version'] - 1
+                and rendered.get('key') in (current['key'], None)
+                and rendered.get('window') == window)
+    if changed is not None and previous and not decimated:
+        if not changed:
+            return dash.no_update, current
+        return build_points_patch(graph_id, profile, changed), current
+    
+    return build_figure_cached(graph_id, profile, ref['profile'], window), current
+
+# 回调函数：渲染图1
+@app.callback(
+    [Output('graph1', 'figure'),
+     Output('graph1-rendered', 'data')],
+    [Input('data-store', 'data'),
+     Input('graph-tabs', 'value'),
+     Input('graph1', 'relayoutData')],
+    [State('graph1-rendered', 'data')],
+    prevent_initial_call=True
+)
+def render_graph1(data, active_tab, relayout, rendered):
+    return render_graph('graph1', data, active_tab, relayout, rendered)
+
+# 回调函数：渲染图2
+@app.callback(
+    [Output('graph2', 'figure'),
+     Output('graph2-rendered', 'data')],
+    [Input('data-store', 'data'),
+     Input('graph-tabs', 'value'),
+     Input('graph2', 'relayoutData')],
+    [State('graph2-rendered', 'data')],
+    prevent_initial_call=True
+)
+def render_graph2(data, active_tab, relayout, rendered):
+    return render_graph('graph2', data, active_tab, relayout, rendered)
+
+# 模拟结果摘要
+def simulation_summary(summary, samples, capacity, spread):
+    return html.Div([
+        html.Div(f"样本数: {samples}，容量阈值: {capacity}，{SPREADS[spread]}", style={'fontSize': '12px', 'color': 'gray'}),
+        html.Div(f"每天峰值超过容量的概率: {summary['峰值超限概率']:.2%}", style={'fontWeight': 'bold'}),
+        html.Div(f"最易超限的时间: {summary['最易超限时间']}（超限概率 {summary['该时间超限概率']:.2%}）"),
+        html.Div("各分位数的峰值: " + "，".join(f"P{q} {summary[f'P{q}峰值']:.3f}" for q in DEFAULT_PERCENTILES),
+                 style={'fontSize': '12px'})
+    ])
+
+# 回调函数：蒙特卡洛模拟。使用当前曲线（包含会话中的修改），固定随机种子，
+# 结果按 (模板指纹, 曲线名称, 平均作息, 方差, 参数) 缓存，重复运行同样的模拟直接返回
+@app.callback(
+    [Output('simulation-graph', 'figure'),
+     Output('simulation-summary', 'children')],
+    [Input('run-simulation', 'n_clicks')],
+    [State('data-store', 'data'),
+     State('simulation-samples', 'value'),
+     State('simulation-capacity', 'value'),
+     State('simulation-correlation', 'value'),
+     State('simulation-spread', 'value')],
+    prevent_initial_call=True
+)
+def run_simulation(n_clicks, data, samples, capacity, correlation, spread):
+    if samples is None or capacity is None or correlation is None:
+        return dash.no_update, html.Div("❌ 请填写样本数、容量阈值和相关系数", style={'color': 'red'})
+    samples = min(max(int(samples), 1000), SIMULATION_MAX_SAMPLES)
+    capacity = min(max(float(capacity), 0.0), 1.0)
+    correlation = min(max(float(correlation), 0.0), 0.99)
+    spread = spread if spread in SPREADS else DEFAULT_SPREAD
     
-    return df.to_dict('records'), fig1, fig2, status_message
+    ref, profile = load_session(data)
+    label = ref['profile']
+    key = ComputeCache.make_key('simulation', figure_templates.fingerprint, label, profile.average.tobytes(),
+                                profile.variance.tobytes(), samples, capacity, correlation, spread)
+    with callback_metrics.stage('simulate'):
+        payload = compute_cache.get(key)
+        if payload is not None:
+            figure, summary = json.loads(payload)
+        else:
+            result = simulate(profile.average, profile.variance, samples, correlation, spread=spread)
+            summary = summarize(result, profile.times, capacity)
+            figure = figure_templates.simulation_figure(result.percentiles(DEFAULT_PERCENTILES), profile.average,
+                                                        label, capacity)
+            compute_cache.set(key, to_json_plotly([figure, summary]).encode('utf-8'))
+    return figure, simulation_summary(summary, samples, capacity, spread)
 
 # 回调函数：处理图表点击事件
 @app.callback(
@@ -428,7 +813,8 @@ def update_data_and_handle_interactions(variance_multiplier, adjustment_mode, se
      Output('click-output1', 'children'),
      Output('click-output2', 'children')],
     [Input('graph1', 'clickData'),
-     Input('graph2', 'clickData')]
+     Input('graph2', 'clickData')],
+    prevent_initial_call=True
 )
 def handle_click(click_data1, click_data2):
     ctx = callback_context
@@ -440,14 +826,15 @@ def handle_click(click_data1, click_data2):
     
     if click_data:
         point = click_data['points'][0]
+        # 图上的x为时间轴坐标，时间标签按下标从工作区中取
         point_info = {
             'index': point['customdata'],
-            'x': point['x'],
+            'x': workspace.times[point['customdata']],
             'y': point['y'],
             'curveNumber': point['curveNumber']
         }
         
-        output_text = f"点击了时间: {point['x']}, 数值: {point['y']:.3f}"
+        output_text = f"点击了时间: {point_info['x']}, 数值: {point['y']:.3f}"
         return point_info, output_text, output_text
     
     return None, "", ""
@@ -459,19 +846,20 @@ def handle_click(click_data1, click_data2):
     [Output('selected-point-info', 'children'),
      Output('individual-variance', 'value')],
     [Input('selected-point', 'data')],
-    [State('data-store', 'data')]
+    [State('data-store', 'data')],
+    prevent_initial_call=True
 )
 def update_selected_point_info(selected_point, data):
-    if not selected_point or not data:
+    if not selected_point:
         return "", 0.0
     
-    df = pd.DataFrame(data)
+    _, profile = load_session(data)
     point_index = selected_point['index']
     
-    if point_index < len(df):
-        current_time = df.iloc[point_index]['时间']
-        current_average = df.iloc[point_index]['平均作息']
-        current_variance = df.iloc[point_index]['作息方差']
+    if point_index < len(profile):
+        current_time = profile.times[point_index]
+        current_average = profile.average[point_index]
+        current_variance = float(profile.variance[point_index])
         
         info_text = f"""
         **选中时间：{current_time}**
@@ -484,6 +872,7 @@ def update_selected_point_info(selected_point, data):
     return "请点击图表中的点来选择要调整的时间点", 0.0
 
 # 回调函数：处理作息时间按钮点击
+# 切换曲线或点击"自动识别"时按当前曲线重新识别，之后可以用按钮逐个修正
 @app.callback(
     [Output('period-times', 'data'),
      Output('period-times-display', 'children')],
@@ -492,19 +881,31 @@ def update_selected_point_info(selected_point, data):
      Input('start-period-c', 'n_clicks'),
      Input('end-period-a', 'n_clicks'),
      Input('end-period-b', 'n_clicks'),
-     Input('end-period-c', 'n_clicks')],
+     Input('end-period-c', 'n_clicks'),
+     Input('detect-periods', 'n_clicks'),
+     Input('profile-select', 'value')],
     [State('selected-point', 'data'),
-     State('period-times', 'data')]
+     State('period-times', 'data'),
+     State('data-store', 'data')],
+    prevent_initial_call=True
 )
-def handle_period_button_click(start_a, start_b, start_c, end_a, end_b, end_c, selected_point, period_times):
+def handle_period_button_click(start_a, start_b, start_c, end_a, end_b, end_c, detect_clicks, profile_label,
+                               selected_point, period_times, data):
     ctx = callback_context
     if not ctx.triggered:
         raise PreventUpdate
     
+    trigger_id = ctx.triggered[0]['prop_id'].split('.')[0]
+    
+    # 自动识别
+    if trigger_id in ('detect-periods', 'profile-select'):
+        _, profile = load_session(data, profile_label)
+        period_times = detect_periods(profile.average, profile.times)[0]
+        return period_times, period_times_display(period_times)
+    
     if not selected_point:
-        return period_times, ""
+        return period_times, period_times_display(period_times)
     
-    trigger_id = ctx.triggered[0]['prop_id'].split('.')[0]
     selected_time = selected_point['x']
     
     # 更新对应的作息时间
@@ -521,18 +922,7 @@ def handle_period_button_click(start_a, start_b, start_c, end_a, end_b, end_c, s
     elif trigger_id == 'end-period-c':
         period_times['作息结束期C'] = selected_time
     
-    # 生成显示文本
-    display_text = html.Div([
-        html.H5("已设置的作息时间：", style={'marginBottom': '10px', 'fontSize': '14px'}),
-        html.Div(f"作息启动期A: {period_times['作息启动期A'] or '未设置'}", style={'marginBottom': '5px', 'fontSize': '12px'}),
-        html.Div(f"作息启动期B: {period_times['作息启动期B'] or '未设置'}", style={'marginBottom': '5px', 'fontSize': '12px'}),
-        html.Div(f"作息启动期C: {period_times['作息启动期C'] or '未设置'}", style={'marginBottom': '5px', 'fontSize': '12px'}),
-        html.Div(f"作息结束期A: {period_times['作息结束期A'] or '未设置'}", style={'marginBottom': '5px', 'fontSize': '12px'}),
-        html.Div(f"作息结束期B: {period_times['作息结束期B'] or '未设置'}", style={'marginBottom': '5px', 'fontSize': '12px'}),
-        html.Div(f"作息结束期C: {period_times['作息结束期C'] or '未设置'}", style={'marginBottom': '5px', 'fontSize': '12px'})
-    ])
-    
-    return period_times, display_text
+    return period_times, period_times_display(period_times)
 
 # 回调函数：更新数据表格
 @app.callback(
@@ -543,7 +933,8 @@ def update_table(data):
     if not data:
         return ""
     
-    df = pd.DataFrame(data)
+    _, profile = load_session(data)
+    df = profile.to_frame()
     
     # 创建表格
     table_header = [html.Th(col) for col in df.columns]
@@ -565,38 +956,106 @@ def update_table(data):
     prevent_initial_call=True
 )
 def download_csv(n_clicks, data, period_times):
-    if not data:
-        raise PreventUpdate
-    
-    df = pd.DataFrame(data)
-    
-    # 创建一个新的DataFrame，只包含原始数据（A-F列）
-    export_df = df[['时间', '平均作息', '作息方差', '作息上界', '作息下界']].copy()
-    
-    # 添加G-J列，初始化为空
-    export_df['作息启动期'] = ''
-    export_df['作息启动期A'] = ''
-    export_df['作息启动期B'] = ''
-    export_df['作息启动期C'] = ''
-    
-    # 在第1行设置作息启动期信息
-    export_df.loc[0, '作息启动期'] = '作息启动期'
-    export_df.loc[0, '作息启动期A'] = period_times['作息启动期A'] or ''
-    export_df.loc[0, '作息启动期B'] = period_times['作息启动期B'] or ''
-    export_df.loc[0, '作息启动期C'] = period_times['作息启动期C'] or ''
-    
-    # 在第2行设置作息结束期信息
-    export_df.loc[1, '作息启动期'] = '作息结束期'
-    export_df.loc[1, '作息启动期A'] = period_times['作息结束期A'] or ''
-    export_df.loc[1, '作息启动期B'] = period_times['作息结束期B'] or ''
-    export_df.loc[1, '作息启动期C'] = period_times['作息结束期C'] or ''
-    
-    # 限制数值列的小数点后最多6位
-    numeric_columns = ['平均作息', '作息方差', '作息上界', '作息下界']
-    for col in numeric_columns:
-        export_df[col] = export_df[col].apply(lambda x: round(x, 6) if isinstance(x, (int, float)) else x)
+    _, profile = load_session(data)
+    export_df = build_export_frame(profile, period_times)
+    return dcc.send_data_frame(export_df.to_csv, EXPORT_FILENAME)
+
+# 键盘微调：浏览器端记录选中的点；按键停止后把累计的净变化量写入 keyboard-events，同时更新滑块
+app.clientside_callback(
+    ClientsideFunction(namespace='keyboard', function_name='track'),
+    Output('keyboard-events', 'data', allow_duplicate=True),
+    [Input('selected-point', 'data'),
+     Input('individual-variance', 'value'),
+     Input('adjustment-mode', 'value')],
+    prevent_initial_call='initial_duplicate'
+)
+
+app.clientside_callback(
+    ClientsideFunction(namespace='keyboard', function_name='flush'),
+    [Output('keyboard-events', 'data'),
+     Output('individual-variance', 'value', allow_duplicate=True)],
+    [Input('keyboard-sync', 'n_clicks')],
+    prevent_initial_call=True
+)
+
+# 撤销/重做按钮：按 data-store 中的可撤销/重做步数启用
+app.clientside_callback(
+    ClientsideFunction(namespace='history', function_name='buttons'),
+    [Output('undo-edit', 'disabled'),
+     Output('redo-edit', 'disabled')],
+    [Input('data-store', 'data')],
+    prevent_initial_call=True
+)
+
+# 选中点数：框选/套索后在浏览器端直接显示，不经过服务器
+app.clientside_callback(
+    ClientsideFunction(namespace='selection', function_name='summary'),
+    Output('selection-info', 'children'),
+    [Input('graph1', 'selectedData'),
+     Input('graph2', 'selectedData'),
+     Input('graph-tabs', 'value')],
+    [State('graph1', 'figure'),
+     State('graph2', 'figure')],
+    prevent_initial_call=True
+)
+
+# 导出全部作息的链接：参数为当前会话、调整模式、系数、方差模型和导出格式
+app.clientside_callback(
+    ClientsideFunction(namespace='export', function_name='allProfilesUrl'),
+    Output('download-all-link', 'href'),
+    [Input('data-store', 'data'),
+     Input('variance-multiplier', 'value'),
+     Input('adjustment-mode', 'value'),
+     Input('variance-model', 'value'),
+     Input('export-format', 'value')],
+    [State('download-all-link', 'href')]
+)
+
+# 会话中修改过的曲线 {显示名称: Profile}；全局调整时按当前系数和模型重新计算方差
+def session_overrides(session_key, multiplier, model, adjustment_mode):
+    overrides = {}
+    if not session_key:
+        return overrides
+    rows = sessions.load_many(session_row(session_key, label) for label in workspace.labels)
+    for label in workspace.labels:
+        payload = rows.get(session_row(session_key, label))
+        if payload is not None:
+            profile = Profile.from_bytes(payload)
+            if adjustment_mode == 'global':
+                profile.apply_global(multiplier, variance_engine.model_function(model, label))
+            overrides[label] = profile
+    return overrides
+
+# 导出工作区中的全部作息曲线（会话中修改过的曲线使用修改后的数据）
+# 按块生成并逐块发送，内存占用与曲线数无关
+@app.server.route('/export/all')
+def export_all():
+    fmt = request.args.get('format', 'csv')
+    adjustment_mode = request.args.get('mode', 'individual')
+    model = request.args.get('model', DEFAULT_MODEL) if adjustment_mode == 'global' else DEFAULT_MODEL
+    try:
+        multiplier = float(request.args.get('multiplier', 1.0)) if adjustment_mode == 'global' else 1.0
+    except ValueError:
+        return Response("系数格式错误", status=400, mimetype='text/plain')
+    if model not in dict(variance_engine.available()):
+        return Response(f"不支持的方差模型: {model}", status=400, mimetype='text/plain')
     
-    return dcc.send_data_frame(export_df.to_csv, '作息分析结果.csv')
+    overrides = session_overrides(request.args.get('session'), multiplier, model, adjustment_mode)
+    frames = workspace.iter_frames(multiplier, overrides,
+                                   lambda labels: variance_engine.model_function(model, labels))
+    try:
+        body = stream_export(frames, fmt)
+    except ValueError as e:
+        return Response(str(e), status=400, mimetype='text/plain')
+    _, filename, mimetype = EXPORT_FORMATS[fmt]
+    return Response(body, mimetype=mimetype,
+                    headers={'Content-Disposition': f"attachment; filename*=UTF-8''{quote(filename)}"})
+
+# 启动预热：在导入时完成布局序列化和方差模型拟合，gunicorn 设置 preload_app 时只在主进程中做一次，
+# 工作进程 fork 后直接共享（写时复制）。SQLite 连接按进程建立，fork 之后会自动重新连接
+app.layout_json = to_json_plotly(app.layout)
+if variance_engine.history_path:
+    variance_engine.fit()
 
 # 运行应用
 if __name__ == '__main__':
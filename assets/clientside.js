@@ -0,0 +1,77 @@
+// 浏览器端计算引擎：拖动全局方差滑块时直接在本地重算方差和上下界，
+// 不经过服务器。公式与 app.py 保持一致：
+//   作息方差 = 平均作息³ × 系数
+//   作息上界 = min(平均作息 + 作息方差, 1)
+//   作息下界 = max(平均作息 - 作息方差, 0)
+// 图1的轨迹顺序为 [平均作息, 作息方差]，图2为 [平均作息, 作息上界, 作息下界]
+// 只实现了立方模型（variance_models.py 中的 cube），其他模型由服务器在松开滑块后计算
+//
+// history.buttons 启用/禁用撤销重做按钮；selection.summary 显示框选/套索选中的点数；export.allProfilesUrl 生成导出全部作息的下载链接
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    variance: {
+        recompute: function(multiplier, mode, model, fig1, fig2) {
+            const noUpdate = window.dash_clientside.no_update;
+            // 图只在其标签页打开后才渲染，未渲染的图保持不变
+            const rendered = fig => fig && fig.data && fig.data.length > 0;
+            if (!rendered(fig1)) fig1 = null;
+            if (!rendered(fig2)) fig2 = null;
+            if (mode !== 'global' || model !== 'cube' || multiplier === null || multiplier === undefined || (!fig1 && !fig2)) {
+                return [noUpdate, noUpdate];
+            }
+
+            const average = (fig1 || fig2).data[0].y;
+            const variance = average.map(a => a * a * a * multiplier);
+            const upper = average.map((a, i) => Math.min(a + variance[i], 1));
+            const lower = average.map((a, i) => Math.max(a - variance[i], 0));
+
+            // 浅拷贝，只替换y数组，保证Dash识别为新的figure
+            let newFig1 = noUpdate;
+            if (fig1) {
+                newFig1 = Object.assign({}, fig1, {data: fig1.data.slice()});
+                newFig1.data[1] = Object.assign({}, fig1.data[1], {y: variance});
+            }
+
+            let newFig2 = noUpdate;
+            if (fig2) {
+                newFig2 = Object.assign({}, fig2, {data: fig2.data.slice()});
+                newFig2.data[1] = Object.assign({}, fig2.data[1], {y: upper});
+                newFig2.data[2] = Object.assign({}, fig2.data[2], {y: lower});
+            }
+
+            return [newFig1, newFig2];
+        }
+    },
+    history: {
+        // 撤销/重做按钮是否禁用（data-store 中的 undo/redo 为可以撤销/重做的步数）
+        buttons: function(data) {
+            return [!(data && data.undo > 0), !(data && data.redo > 0)];
+        }
+    },
+    selection: {
+        // 当前标签页的图上选中的时间槽数（各条轨迹上同一时间槽的点只算一次）
+        // 降采样显示时图上只画出部分点，应用时按选区包含其中的全部时间点（见 figures.selected_slots）
+        summary: function(selected1, selected2, activeTab, fig1, fig2) {
+            const selected = activeTab === 'graph1' ? selected1 : selected2;
+            const fig = activeTab === 'graph1' ? fig1 : fig2;
+            const points = (selected && selected.points) || [];
+            const slots = new Set(points.map(p => p.customdata).filter(i => i !== undefined));
+            if (slots.size === 0) return '💡 在图上用框选或套索选择多个点';
+            if (fig && fig.layout && fig.layout.meta && fig.layout.meta.decimated) {
+                return `图上选中 ${slots.size} 个显示的点（降采样显示，应用时包含选区内的全部时间点）`;
+            }
+            return `已选中 ${slots.size} 个时间点`;
+        }
+    },
+    export: {
+        // 导出全部作息的下载链接（/export/all 的查询参数），与 app.py 中 export_all 读取的参数一致
+        allProfilesUrl: function(data, multiplier, mode, model, format, href) {
+            const params = new URLSearchParams({format: format || 'csv', mode: mode || 'individual'});
+            if (data && data.key) params.set('session', data.key);
+            if (mode === 'global') {
+                params.set('multiplier', multiplier);
+                params.set('model', model);
+            }
+            return href.split('?')[0] + '?' + params.toString();
+        }
+    }
+});
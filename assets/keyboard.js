@@ -0,0 +1,97 @@
+// 键盘微调：逐个调整模式下按 ↑/↓ 把选中点的方差加减 0.01（按住 Shift 为 0.1）
+// 每次按键立即在浏览器端用 Plotly.restyle 更新图上的点，不等服务器；
+// 连续按键合并为一次同步：停止按键 300ms 后（按住不放时至少每秒一次）点击隐藏的 keyboard-sync 按钮，
+// keyboard.flush 把累计的净变化量写入 keyboard-events，服务器在 update_model 中一次应用。
+// 图1的轨迹顺序为 [平均作息, 作息方差]，图2为 [平均作息, 作息上界, 作息下界]（见 figures.py）
+(function() {
+    const DEBOUNCE_MS = 300;
+    const MAX_WAIT_MS = 1000;
+
+    // index/variance 为选中的点及其方差（已包含已同步的修改），pending 为尚未同步的净变化量
+    const state = {enabled: false, index: null, variance: null, pending: 0, timer: null, firstPending: null};
+
+    // 限制在滑块范围内，并去掉反复加减 0.01 累积的浮点误差
+    const clamp = v => Math.round(Math.min(Math.max(v, 0), 1) * 1e6) / 1e6;
+
+    function plotDiv(graphId) {
+        const gd = document.querySelector('#' + graphId + ' .js-plotly-plot');
+        return gd && gd.data && gd.data.length > 0 ? gd : null;
+    }
+
+    // 在图上更新选中时间槽的点；降采样显示时该时间槽可能不在图上，此时等服务器同步后再更新
+    function restyle(variance) {
+        if (!window.Plotly) return;
+        const gd1 = plotDiv('graph1');
+        if (gd1) {
+            const position = Array.prototype.indexOf.call(gd1.data[0].customdata, state.index);
+            if (position >= 0) {
+                const y = Array.from(gd1.data[1].y);
+                y[position] = variance;
+                Plotly.restyle(gd1, {y: [y]}, [1]);
+            }
+        }
+        const gd2 = plotDiv('graph2');
+        if (gd2) {
+            const position = Array.prototype.indexOf.call(gd2.data[0].customdata, state.index);
+            if (position >= 0) {
+                const average = gd2.data[0].y[position];
+                const upper = Array.from(gd2.data[1].y);
+                const lower = Array.from(gd2.data[2].y);
+                upper[position] = Math.min(average + variance, 1);
+                lower[position] = Math.max(average - variance, 0);
+                Plotly.restyle(gd2, {y: [upper, lower]}, [1, 2]);
+            }
+        }
+    }
+
+    function sync() {
+        clearTimeout(state.timer);
+        state.timer = null;
+        state.firstPending = null;
+        const button = document.getElementById('keyboard-sync');
+        if (button) button.click();
+    }
+
+    document.addEventListener('keydown', function(event) {
+        if (event.key !== 'ArrowUp' && event.key !== 'ArrowDown') return;
+        const target = event.target;
+        if (target && (target.isContentEditable || /^(INPUT|TEXTAREA|SELECT)$/.test(target.tagName))) return;
+        // 焦点在滑块手柄上时由滑块自己处理方向键，否则同一次按键会被应用两次
+        if (target && target.closest && target.closest('[role=slider]')) return;
+        if (!state.enabled || state.index === null || state.variance === null) return;
+        event.preventDefault();
+
+        const step = (event.shiftKey ? 0.1 : 0.01) * (event.key === 'ArrowUp' ? 1 : -1);
+        const value = clamp(state.variance + state.pending + step);
+        state.pending = value - state.variance;
+        restyle(value);
+
+        const now = Date.now();
+        state.firstPending = state.firstPending || now;
+        clearTimeout(state.timer);
+        state.timer = setTimeout(sync, Math.max(0, Math.min(DEBOUNCE_MS, state.firstPending + MAX_WAIT_MS - now)));
+    });
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        keyboard: {
+            // 记录选中的点和滑块上的方差；切换选中点时丢弃未同步的变化
+            track: function(selectedPoint, variance, mode) {
+                const index = selectedPoint ? selectedPoint.index : null;
+                if (index !== state.index) state.pending = 0;
+                state.enabled = mode === 'individual';
+                state.index = index;
+                state.variance = variance;
+                return window.dash_clientside.no_update;
+            },
+            // 取出累计的净变化量：写入 keyboard-events 交给服务器，同时把滑块设为新值
+            flush: function(nClicks) {
+                const noUpdate = window.dash_clientside.no_update;
+                if (state.index === null || state.pending === 0) return [noUpdate, noUpdate];
+                const event = {index: state.index, delta: Math.round(state.pending * 1e6) / 1e6, seq: nClicks};
+                state.variance = clamp(state.variance + state.pending);
+                state.pending = 0;
+                return [event, state.variance];
+            }
+        }
+    });
+})();
@@ -0,0 +1,148 @@
+# 批处理命令行 / 库接口：不依赖 Dash 和 Plotly
+# 对多个作息 CSV（列为 时间, 平均作息）按与网页相同的模型计算方差和上下界，
+# 并按 作息分析结果.csv 的布局导出。文件通过进程池并行处理。
+#
+# 用法示例：
+#   python batch.py data/*.csv -o 结果 --multiplier 1.5 --workers 8
+#   python batch.py data/ -o 结果 --periods 作息时间.json
+#   python batch.py 作息库/ -o 结果            （列式作息库，见 profile_store.py）
+#
+# --periods 为 JSON 文件，可以是一组作息时间（所有文件共用），
+# 也可以是 {文件名（不含扩展名）: 作息时间} 的映射；作息库中的曲线以 "<站点>-<日型>" 作为文件名。
+# --detect-periods 时，没有在 --periods 中给出作息时间的文件按曲线自动识别（见 period_detection.py）。
+import argparse
+import glob
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from exporter import EXPORT_FILENAME, PERIOD_KEYS, build_export_frame
+from period_detection import detect_periods
+from profile_store import ProfileStore, is_store
+from schedule_profile import Profile
+from workspace import profile_label
+
+
+# 展开输入参数：作息库取其中所有曲线（(库目录, 站点, 日型)），目录取其中所有 .csv，通配符按 glob 展开
+def expand_inputs(inputs):
+    paths = []
+    for item in inputs:
+        if is_store(item):
+            paths.extend((item, station, day_type) for station, day_type in ProfileStore(item).keys)
+        elif os.path.isdir(item):
+            paths.extend(sorted(glob.glob(os.path.join(item, '*.csv'))))
+        elif glob.has_magic(item):
+            paths.extend(sorted(glob.glob(item)))
+        else:
+            paths.append(item)
+    return paths
+
+
+# 输入的名称：文件名（不含扩展名），作息库中的曲线为 "<站点>-<日型>"
+def input_stem(path):
+    if isinstance(path, tuple):
+        return profile_label(path[1], path[2])
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def input_name(path):
+    return f"{path[0]}:{input_stem(path)}" if isinstance(path, tuple) else path
+
+
+# 每个进程打开的作息库（只映射一次）
+_stores = {}
+
+
+def load_input(path):
+    if isinstance(path, tuple):
+        store_path, station, day_type = path
+        if store_path not in _stores:
+            _stores[store_path] = ProfileStore(store_path)
+        store = _stores[store_path]
+        return Profile(store.times, store.average(station, day_type))
+    return Profile.from_csv(path)
+
+
+# 输出文件名：<输入文件名>_作息分析结果.csv
+def output_path(path, out_dir):
+    return os.path.join(out_dir, f"{input_stem(path)}_{EXPORT_FILENAME}")
+
+
+# 读取作息时间配置，返回 {文件名: 作息时间} 或所有文件共用的一组作息时间
+def load_period_times(path):
+    if not path:
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def period_times_for(path, period_times):
+    if not period_times:
+        return None
+    if any(key in period_times for key in PERIOD_KEYS):
+        return period_times
+    return period_times.get(input_stem(path))
+
+
+# 处理单个文件，返回 (输入路径, 输出路径, 错误信息)
+def process_file(path, out_dir, multiplier=1.0, period_times=None, detect=False):
+    out_path = output_path(path, out_dir)
+    try:
+        profile = load_input(path)
+        profile.apply_global(multiplier)
+        if period_times is None and detect:
+            period_times = detect_periods(profile.average, profile.times)[0]
+        build_export_frame(profile, period_times).to_csv(out_path)
+    except Exception as e:
+        return path, out_path, str(e)
+    return path, out_path, None
+
+
+def _process_task(task):
+    return process_file(*task)
+
+
+# 批量处理：workers 为 1 时在当前进程内顺序执行，否则使用进程池
+def run_batch(paths, out_dir, multiplier=1.0, period_times=None, workers=None, detect=False):
+    os.makedirs(out_dir, exist_ok=True)
+    tasks = [(path, out_dir, multiplier, period_times_for(path, period_times), detect) for path in paths]
+    if workers == 1:
+        yield from map(_process_task, tasks)
+        return
+    workers = workers or os.cpu_count() or 1
+    # 小文件很多时按块分发任务，减少进程间通信开销
+    chunksize = max(1, len(tasks) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(_process_task, tasks, chunksize=chunksize)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="批量计算作息方差和上下界并导出")
+    parser.add_argument('inputs', nargs='+', help="作息CSV文件、目录或通配符")
+    parser.add_argument('-o', '--out-dir', default='.', help="输出目录（默认为当前目录）")
+    parser.add_argument('--multiplier', type=float, default=1.0, help="作息方差调整系数（默认1.0）")
+    parser.add_argument('--periods', help="作息时间配置（JSON）")
+    parser.add_argument('--detect-periods', action='store_true', help="自动识别未配置的作息时间")
+    parser.add_argument('--workers', type=int, default=None, help="进程数（默认为CPU核数）")
+    args = parser.parse_args(argv)
+
+    paths = expand_inputs(args.inputs)
+    if not paths:
+        parser.error("没有找到输入文件")
+
+    failed = 0
+    for path, out_path, error in run_batch(paths, args.out_dir, args.multiplier,
+                                           load_period_times(args.periods), args.workers, args.detect_periods):
+        if error:
+            failed += 1
+            print(f"❌ {input_name(path)}: {error}", file=sys.stderr)
+        else:
+            print(f"✅ {input_name(path)} -> {out_path}")
+
+    print(f"完成：{len(paths) - failed} 个成功，{failed} 个失败")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
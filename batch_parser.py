@@ -0,0 +1,111 @@
+# 批量输入解析：把粘贴的文本解析为 N×时间槽数 的平均作息矩阵
+# 整段文本一次拆分、一次向量化转换为数值，不逐个 try/except。
+#
+# 规则：
+#   - 分隔符为逗号、空格、制表符、换行
+#   - 只有一行时按读取顺序取数值，非数值内容忽略
+#   - 多行时按单元格拆分（有制表符时按制表符拆分，空白单元格保留位置；否则按逗号或空格），
+#     开头全部为非数值的行（表头）和全部为非数值的列（时间列等）忽略，不占用时间槽；
+#     其余的空白或非数值单元格保留其位置并置为0，同时报告位置，避免后续数值错位
+#   - 超出 [0,1] 的数值同样保留其位置并置为0
+#   - 多列且行数为时间槽数的整数倍时（表格按列复制），每一列为一条曲线；
+#     否则按读取顺序，数值个数为时间槽数的整数倍时每 时间槽数 个数值为一条曲线。
+#     多列表格中有空白或非数值单元格、又不能按列读取时，无法确定各数值的时间槽，抛出 ValueError
+#   - 其他情况只有一条曲线：多出的数值忽略，不足的部分用0填充（不会把残缺的部分当作下一条曲线）
+import re
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+_TOKEN = re.compile(r'[^,\s]+')
+
+# values: N×时间槽数矩阵；rejected: [(曲线序号, 时间槽序号, 原始文本)]，空白单元格的原始文本为 ''；
+# padded: 用0填充的个数；truncated: 超出一条曲线而忽略的数值个数；ignored: 忽略的非数值个数
+ParseResult = namedtuple('ParseResult', ['values', 'rejected', 'padded', 'truncated', 'ignored'])
+
+
+def _to_numbers(tokens):
+    return pd.to_numeric(pd.Series(tokens, dtype=object), errors='coerce').to_numpy(dtype=np.float64)
+
+
+# 一行拆分为单元格：制表符分隔时保留空白单元格；逗号分隔时忽略行尾的空单元格（如 "0.1, 0.2,"）
+def _split_cells(line):
+    if '\t' in line:
+        return [cell.strip() for cell in line.split('\t')]
+    if ',' in line:
+        cells = [cell.strip() for cell in line.split(',')]
+        while cells and not cells[-1]:
+            cells.pop()
+        return cells
+    return line.split()
+
+
+# 多行文本拆分为单元格表格，返回 (单元格 行×列, 是否为真实单元格 行×列, 忽略的非数值个数)
+def _parse_table(lines):
+    tabbed = any('\t' in line for line in lines)
+    rows = [_split_cells(line) for line in lines]
+    width = max(len(row) for row in rows)
+    cells = np.full((len(rows), width), '', dtype=object)
+    present = np.zeros((len(rows), width), dtype=bool)
+    for i, row in enumerate(rows):
+        cells[i, :len(row)] = row
+        present[i, :len(row)] = True
+    # 制表符分隔时短行缺少的单元格也是空白单元格
+    if tabbed:
+        present[:] = True
+
+    numeric = ~np.isnan(_to_numbers(cells.ravel())).reshape(cells.shape)
+    columns = numeric.any(axis=0)
+    first_row = int(numeric.any(axis=1).argmax())
+    ignored = int((present & ~numeric).sum())
+    cells, present = cells[first_row:, columns], present[first_row:, columns]
+    ignored -= int((present & ~numeric[first_row:, columns]).sum())
+    return cells, present, ignored
+
+
+def parse_batch_text(text, slots=96):
+    lines = (text or '').replace('\r', '').split('\n')
+    while lines and not lines[-1].strip():
+        lines.pop()
+    while lines and not lines[0].strip():
+        lines.pop(0)
+
+    if len(lines) <= 1:
+        tokens = np.array(_TOKEN.findall(lines[0] if lines else ''), dtype=object)
+        numbers = _to_numbers(tokens)
+        numeric = ~np.isnan(numbers)
+        ignored = int(tokens.size - numeric.sum())
+        numbers, tokens = numbers[numeric], tokens[numeric]
+    else:
+        cells, present, ignored = _parse_table(lines)
+        if cells.size == 0 or not present.any():
+            numbers, tokens = np.zeros(0), np.zeros(0, dtype=object)
+        elif cells.shape[1] > 1 and len(cells) % slots == 0:
+            # 表格按列复制：转置为按列读取
+            tokens = cells.T.ravel()
+            numbers = _to_numbers(tokens)
+        else:
+            tokens = cells[present]
+            numbers = _to_numbers(tokens)
+            if cells.shape[1] > 1 and np.isnan(numbers).any():
+                raise ValueError("表格中有空白或非数值的单元格，且行数不是时间槽数的整数倍，无法确定各数值对应的时间槽；"
+                                 "请补全空白单元格，或按列粘贴完整的时间槽")
+    if numbers.size == 0 or np.isnan(numbers).all():
+        return ParseResult(np.zeros((0, slots)), [], 0, 0, ignored + numbers.size)
+
+    # 不是整数倍时只取一条曲线
+    truncated = 0
+    if numbers.size % slots:
+        truncated = max(numbers.size - slots, 0)
+        numbers, tokens = numbers[:slots], tokens[:slots]
+
+    invalid = np.isnan(numbers) | (numbers < 0) | (numbers > 1)
+    rejected = [(int(p) // slots, int(p) % slots, tokens[p]) for p in np.flatnonzero(invalid)]
+    numbers[invalid] = 0.0
+
+    n_blocks = -(-numbers.size // slots)
+    values = np.zeros(n_blocks * slots)
+    values[:numbers.size] = numbers
+    return ParseResult(values.reshape(n_blocks, slots), rejected, n_blocks * slots - numbers.size, truncated,
+                       ignored)
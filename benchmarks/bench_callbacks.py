@@ -0,0 +1,112 @@
+# 回调基准：在本进程内（Flask 测试客户端，不经过网络）测量主要回调和图表构建的单次耗时，
+# 超过预算时返回非0，可以在部署前运行以发现性能退化
+# 用法：python benchmarks/bench_callbacks.py [重复次数]
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dash_traffic import SimulatedBrowser
+
+import app as app_module
+
+# 每项的耗时预算（毫秒，中位数）
+BUDGETS = {
+    '模型阶段：单点修改': 30,
+    '模型阶段：全局系数': 30,
+    '模型阶段：批量粘贴': 50,
+    '渲染图1（整图）': 30,
+    '渲染图1（增量）': 30,
+    '图表构建（模板填充+序列化）': 5,
+    '下载CSV': 50,
+}
+
+
+# 每次调用前先执行 setup（不计时）；回调必须正常返回，返回 204（PreventUpdate）说明基准构造的操作无效
+def timed(func, repeat, setup=None):
+    samples = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        result = func()
+        samples.append((time.perf_counter() - start) * 1000)
+        if result is not None and result[0] != 200:
+            raise SystemExit(f"回调返回 {result[0]}: {func.__name__}")
+    return statistics.median(samples)
+
+
+def main(repeat=50):
+    client = app_module.app.server.test_client()
+
+    def send(body):
+        response = client.post('/_dash-update-component', data=body, content_type='application/json')
+        return response.status_code, response.data
+
+    layout = json.loads(client.get('/_dash-layout').data)
+    dependencies = json.loads(client.get('/_dash-dependencies').data)
+    browser = SimulatedBrowser(layout, dependencies, send)
+    n_slots = len(app_module.workspace.times)
+    counter = iter(range(10 ** 9))
+
+    def point_edit():
+        i = next(counter)
+        browser.props['adjustment-mode.value'] = 'individual'
+        browser.props['selected-point.data'] = {'index': i % n_slots}
+        return browser.fire('data-store.data', {'individual-variance.value': round((i % 97 + 1) / 100, 2)})
+
+    def global_multiplier():
+        i = next(counter)
+        browser.props['adjustment-mode.value'] = 'global'
+        return browser.fire('data-store.data', {'variance-multiplier.value': round(0.1 + (i % 30) / 10, 1)})
+
+    def paste():
+        i = next(counter)
+        text = '\n'.join(f"{(i + slot) % 100 / 100:.2f}" for slot in range(n_slots))
+        return browser.fire('data-store.data', dict(browser.click('apply-batch'), **{'batch-textarea.value': text}))
+
+    # 渲染：每次都从未渲染的状态开始（整图），或只落后一个版本（增量）
+    def render():
+        return browser.fire('graph1.figure', changed=['data-store.data'])
+
+    def unrendered():
+        browser.props['graph1-rendered.data'] = None
+
+    def one_version_behind():
+        point_edit()
+        stored = browser.props['data-store.data']
+        browser.props['graph1-rendered.data'] = dict(key=stored['key'], profile=stored['profile'],
+                                                     version=stored['version'] - 1, window=None)
+
+    profile = app_module.workspace.profile(app_module.workspace.default_label)
+
+    def figure_build():
+        app_module.to_json_plotly(app_module.figure_templates.graph1_figure(profile, app_module.workspace.default_label))
+
+    def download():
+        return browser.fire('download-dataframe-csv.data', browser.click('download-csv'))
+
+    point_edit()
+    results = {
+        '模型阶段：单点修改': timed(point_edit, repeat),
+        '渲染图1（增量）': timed(render, repeat, one_version_behind),
+        '模型阶段：全局系数': timed(global_multiplier, repeat),
+        '模型阶段：批量粘贴': timed(paste, repeat),
+        '渲染图1（整图）': timed(render, repeat, unrendered),
+        '图表构建（模板填充+序列化）': timed(figure_build, repeat),
+        '下载CSV': timed(download, repeat),
+    }
+
+    failed = 0
+    for name, elapsed in results.items():
+        budget = BUDGETS[name]
+        mark = '✅' if elapsed <= budget else '❌'
+        failed += elapsed > budget
+        print(f"{mark} {name}: {elapsed:.2f} ms（预算 {budget} ms）")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 50))
@@ -0,0 +1,66 @@
+# 图表构建基准：对比每次用 graph_objects 重建图表（原回调的做法）与 模板填充 y 数组 的单次耗时
+# 用法：python benchmarks/bench_figures.py [重复次数]
+import json
+import os
+import sys
+import timeit
+
+import numpy as np
+import plotly.graph_objects as go
+from plotly.io.json import to_json_plotly
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from figures import FigureTemplates
+from schedule_profile import Profile
+
+
+# 原回调中的构建方式（每次新建 go.Figure 并逐个 add_trace）
+def build_with_graph_objects(profile, label):
+    fig1 = go.Figure()
+    fig2 = go.Figure()
+    for fig, series in ((fig1, [('平均作息', profile.average, dict(color='orange', width=3), 4),
+                                ('作息方差', profile.variance, dict(color='green', width=3, dash='dash'), 4)]),
+                        (fig2, [('平均作息', profile.average, dict(color='blue', width=3), 4),
+                                ('作息上界', profile.upper, dict(color='red', width=2), 3),
+                                ('作息下界', profile.lower, dict(color='purple', width=2), 3)])):
+        for name, y, line, size in series:
+            fig.add_trace(go.Scatter(x=profile.times, y=y, mode='lines+markers', name=name,
+                                     line=line, marker=dict(size=size),
+                                     customdata=np.arange(len(profile))))
+    for fig, title in ((fig1, f"{label}客流"), (fig2, "作息上下界分析")):
+        fig.update_layout(
+            title=title,
+            xaxis_title="时间",
+            yaxis_title="数值",
+            xaxis=dict(tickmode='array', tickvals=profile.times[::4],
+                       ticktext=[f"{i//4:02d}:00" for i in range(0, len(profile), 4)]),
+            yaxis=dict(range=[0, 1]),
+            hovermode='x unified'
+        )
+    return fig1, fig2
+
+
+def main(number=200):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    profile = Profile.from_csv(os.path.join(root, '作息.csv'))
+    templates = FigureTemplates(profile.times)
+
+    # 两种方式填入的数据必须一致
+    for old, new in zip(build_with_graph_objects(profile, '341-工作日'), templates.build(profile, '341-工作日')):
+        old_ys = [trace['y'] for trace in json.loads(to_json_plotly(old))['data']]
+        new_ys = [trace['y'] for trace in json.loads(to_json_plotly(new))['data']]
+        assert old_ys == new_ys, "模板输出与 graph_objects 输出不一致"
+
+    cases = [
+        ("graph_objects 重建", lambda: build_with_graph_objects(profile, '341-工作日')),
+        ("模板填充", lambda: templates.build(profile, '341-工作日')),
+        ("graph_objects 重建 + JSON", lambda: [to_json_plotly(f) for f in build_with_graph_objects(profile, '341-工作日')]),
+        ("模板填充 + JSON", lambda: [to_json_plotly(f) for f in templates.build(profile, '341-工作日')]),
+    ]
+    for name, func in cases:
+        seconds = min(timeit.repeat(func, number=number, repeat=3)) / number
+        print(f"{name:<28}{seconds * 1000:8.3f} ms/次")
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
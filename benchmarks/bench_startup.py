@@ -0,0 +1,66 @@
+# 启动时间基准：在全新的解释器中导入 app，测量导入耗时、首次请求布局的耗时，
+# 以及页面加载后浏览器会立即发出的初始回调请求数（冷启动后这些请求会排队等待工作进程）
+# 用法：python benchmarks/bench_startup.py [重复次数]
+# 对比改动前后时，在两个版本的代码目录中分别运行
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_PROBE = r'''
+import json, time
+t0 = time.perf_counter()
+import dash, numpy, pandas
+t1 = time.perf_counter()
+import app
+t2 = time.perf_counter()
+client = app.app.server.test_client()
+t3 = time.perf_counter()
+layout = client.get('/_dash-layout').data
+t4 = time.perf_counter()
+dependencies = json.loads(client.get('/_dash-dependencies').data)
+
+ids = set()
+def collect(node):
+    if isinstance(node, dict):
+        if node.get('namespace') and isinstance(node.get('props'), dict) and 'id' in node['props']:
+            ids.add(node['props']['id'])
+        for value in node.values():
+            collect(value)
+    elif isinstance(node, list):
+        for value in node:
+            collect(value)
+collect(json.loads(layout))
+
+initial = 0
+for dependency in dependencies:
+    outputs = dependency['output'].strip('.').split('...')
+    present = any(output.rsplit('.', 1)[0].split('@')[0] in ids for output in outputs)
+    if present and not dependency.get('prevent_initial_call') and not dependency.get('clientside_function'):
+        initial += 1
+
+print(json.dumps({'依赖库导入': t1 - t0, '应用导入': t2 - t1, '首次布局请求': t4 - t3,
+                  '布局大小': len(layout), '初始回调数': initial}))
+'''
+
+
+def probe():
+    output = subprocess.run([sys.executable, '-c', _PROBE], cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def main(repeat=5):
+    results = [probe() for _ in range(repeat)]
+    for key in results[0]:
+        values = [result[key] for result in results]
+        if isinstance(values[0], float):
+            print(f"{key}: 中位数 {statistics.median(values) * 1000:.1f} ms（最小 {min(values) * 1000:.1f} ms）")
+        else:
+            print(f"{key}: {values[0]}")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
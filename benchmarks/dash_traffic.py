@@ -0,0 +1,187 @@
+# Dash 回调流量：模拟浏览器构造 _dash-update-component 请求，供压测（loadtest.py）和回调基准（bench_callbacks.py）使用
+# 布局和回调依赖从服务器的 /_dash-layout、/_dash-dependencies 读取，所以可以对任何正在运行的实例发请求。
+#
+# SimulatedBrowser 像浏览器一样保存所有组件的属性值：用户操作先修改属性，
+# 然后按回调的 Input/State 从当前属性值组装请求，响应中的输出再写回属性值（Patch 响应不展开）。
+import json
+import random
+import time
+from urllib.parse import urlencode
+
+
+def _walk_props(node, props):
+    if isinstance(node, dict):
+        component_props = node.get('props')
+        if node.get('namespace') and isinstance(component_props, dict) and isinstance(component_props.get('id'), str):
+            for name, value in component_props.items():
+                if name != 'children' or not isinstance(value, (dict, list)):
+                    props[f"{component_props['id']}.{name}"] = value
+        for value in node.values():
+            _walk_props(value, props)
+    elif isinstance(node, list):
+        for value in node:
+            _walk_props(value, props)
+
+
+# 布局中所有组件的初始属性 {'组件id.属性': 值}
+def layout_props(layout):
+    props = {}
+    _walk_props(layout, props)
+    return props
+
+
+def _output_specs(output):
+    specs = output[2:-2].split('...') if output.startswith('..') else [output]
+    return [spec.split('@')[0] for spec in specs]
+
+
+# 输出属性 -> 服务器端回调依赖（浏览器端回调不经过服务器，跳过）
+def callback_index(dependencies):
+    index = {}
+    for dependency in dependencies:
+        if dependency.get('clientside_function'):
+            continue
+        for spec in _output_specs(dependency['output']):
+            index[spec] = dependency
+    return index
+
+
+class SimulatedBrowser:
+    # send(请求体 bytes) -> (状态码, 响应体 bytes)；get(路径) -> (状态码, 响应体 bytes)，用于普通下载链接
+    def __init__(self, layout, dependencies, send, get=None):
+        self.props = layout_props(layout)
+        self.index = callback_index(dependencies)
+        self.send = send
+        self.get = get
+
+    def request_body(self, output, changed):
+        dependency = self.index[output]
+        specs = _output_specs(dependency['output'])
+        outputs = [{'id': spec.rsplit('.', 1)[0], 'property': spec.rsplit('.', 1)[1]} for spec in specs]
+        return json.dumps({
+            'output': dependency['output'],
+            'outputs': outputs if dependency['output'].startswith('..') else outputs[0],
+            'inputs': [dict(item, value=self.props.get(f"{item['id']}.{item['property']}"))
+                       for item in dependency['inputs']],
+            'state': [dict(item, value=self.props.get(f"{item['id']}.{item['property']}"))
+                      for item in dependency['state']],
+            'changedPropIds': list(changed),
+        }, ensure_ascii=False).encode('utf-8')
+
+    # 用户操作：先修改属性，再触发输出为 output 的回调；返回 (状态码, 响应字节数, 耗时秒)
+    def fire(self, output, changes=None, changed=None):
+        changes = changes or {}
+        self.props.update(changes)
+        body = self.request_body(output, changed or list(changes))
+        start = time.perf_counter()
+        status, payload = self.send(body)
+        elapsed = time.perf_counter() - start
+        if status == 200:
+            self.apply_response(payload)
+        return status, len(payload), elapsed
+
+    def apply_response(self, payload):
+        response = json.loads(payload).get('response', {})
+        for component_id, values in response.items():
+            for name, value in values.items():
+                if isinstance(value, dict) and '__dash_patch_update' in value:
+                    continue
+                self.props[f"{component_id}.{name}"] = value
+
+    # 打开下载链接；返回 (状态码, 响应字节数, 耗时秒)
+    def download(self, path):
+        start = time.perf_counter()
+        status, payload = self.get(path)
+        return status, len(payload), time.perf_counter() - start
+
+    def click(self, name):
+        return {f"{name}.n_clicks": (self.props.get(f"{name}.n_clicks") or 0) + 1}
+
+
+# 模拟场景：每个场景是 (浏览器, 随机数生成器) -> [(回调名称, 状态码, 响应字节数, 耗时秒)]
+def _run(browser, steps):
+    results = []
+    for output, changes in steps:
+        status, size, elapsed = browser.fire(output, changes)
+        results.append((output, status, size, elapsed))
+        # 模型阶段之后浏览器会渲染当前标签页
+        if output == 'data-store.data' and status == 200:
+            status, size, elapsed = browser.fire('graph1.figure', changed=['data-store.data'])
+            results.append(('graph1.figure', status, size, elapsed))
+    return results
+
+
+# 拖动全局方差滑块：拖动过程在浏览器端计算，松开后提交一次
+def scenario_drag(browser, rng):
+    steps = []
+    if browser.props.get('adjustment-mode.value') != 'global':
+        steps.append(('data-store.data', {'adjustment-mode.value': 'global'}))
+    steps.append(('data-store.data', {'variance-multiplier.value': round(rng.uniform(0.1, 3.0), 1)}))
+    return _run(browser, steps)
+
+
+# 点击图上的点，然后调整该点的方差
+def scenario_click(browser, rng):
+    results = []
+    if browser.props.get('adjustment-mode.value') != 'individual':
+        results += _run(browser, [('data-store.data', {'adjustment-mode.value': 'individual'})])
+    n_slots = len(browser.props['graph1.figure']['data'][0]['y'])
+    index = rng.randrange(n_slots)
+    click = {'points': [{'customdata': index, 'x': 0, 'y': 0.5, 'curveNumber': 0}]}
+    for output, changes in (('selected-point.data', {'graph1.clickData': click}),
+                            ('selected-point-info.children', {})):
+        status, size, elapsed = browser.fire(output, changes, changed=list(changes) or ['selected-point.data'])
+        results.append((output, status, size, elapsed))
+    results += _run(browser, [('data-store.data', {'individual-variance.value': round(rng.uniform(0, 1), 2)})])
+    return results
+
+
+# 粘贴一整条曲线并应用
+def scenario_paste(browser, rng):
+    n_slots = len(browser.props['graph1.figure']['data'][0]['y'])
+    text = '\n'.join(f"{rng.random():.3f}" for _ in range(n_slots))
+    changes = dict(browser.click('apply-batch'), **{'batch-textarea.value': text})
+    return _run(browser, [('data-store.data', changes)])
+
+
+# 下载当前曲线的CSV
+def scenario_download(browser, rng):
+    return _run(browser, [('download-dataframe-csv.data', browser.click('download-csv'))])
+
+
+# 导出工作区中的全部曲线（链接参数同 assets/clientside.js 中的 allProfilesUrl）
+def scenario_export_all(browser, rng):
+    props = browser.props
+    params = {'format': props.get('export-format.value') or 'csv', 'mode': props.get('adjustment-mode.value')}
+    if props.get('data-store.data'):
+        params['session'] = props['data-store.data']['key']
+    if params['mode'] == 'global':
+        params['multiplier'] = props.get('variance-multiplier.value')
+        params['model'] = props.get('variance-model.value')
+    status, size, elapsed = browser.download('/export/all?' + urlencode(params))
+    return [('/export/all', status, size, elapsed)]
+
+
+SCENARIOS = {
+    'drag': scenario_drag,
+    'click': scenario_click,
+    'paste': scenario_paste,
+    'download': scenario_download,
+    'export_all': scenario_export_all,
+}
+
+
+# 回放录制的请求（CALLBACK_RECORD_PATH，每行一个请求体）
+def replay(lines, send):
+    results = []
+    for line in lines:
+        body = line.encode('utf-8') if isinstance(line, str) else line
+        output = json.loads(body)['output']
+        start = time.perf_counter()
+        status, payload = send(body)
+        results.append((_output_specs(output)[0], status, len(payload), time.perf_counter() - start))
+    return results
+
+
+def new_rng(seed):
+    return random.Random(seed)
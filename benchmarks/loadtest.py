@@ -0,0 +1,169 @@
+# 压测：按场景模拟多个并发用户（或回放录制的请求），报告每个回调的延迟分位数、吞吐量和响应大小
+# 用法：
+#   python benchmarks/loadtest.py                                   在本进程内启动应用（多线程 werkzeug），默认场景
+#   python benchmarks/loadtest.py --url http://127.0.0.1:10000 --users 16 --duration 30
+#   python benchmarks/loadtest.py --mix drag=4,click=4,paste=1,download=1,export_all=0
+#   python benchmarks/loadtest.py --url ... --replay 录制.jsonl     回放用 CALLBACK_RECORD_PATH 录制的请求
+# 在本进程内启动时压测客户端和应用共用一个 GIL，结果偏保守；部署前的对比建议用 gunicorn 启动后加 --url。
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dash_traffic import SCENARIOS, SimulatedBrowser, new_rng, replay
+
+DEFAULT_MIX = 'drag=4,click=4,paste=1,download=1'
+
+
+def make_sender(url):
+    endpoint = url.rstrip('/') + '/_dash-update-component'
+
+    def send(body):
+        request = urllib.request.Request(endpoint, body, {'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(request, timeout=120) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+    return send
+
+
+def make_getter(url):
+    def get(path):
+        try:
+            with urllib.request.urlopen(url.rstrip('/') + path, timeout=120) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+    return get
+
+
+def fetch_json(url, path):
+    with urllib.request.urlopen(url.rstrip('/') + path, timeout=60) as response:
+        return json.loads(response.read())
+
+
+# 在本进程内启动应用，返回地址
+def start_local_server():
+    from werkzeug.serving import make_server
+    from app import app
+
+    server = make_server('127.0.0.1', 0, app.server, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}"
+
+
+def parse_mix(text):
+    mix = {}
+    for item in text.split(','):
+        name, _, weight = item.partition('=')
+        if name not in SCENARIOS:
+            raise SystemExit(f"未知场景: {name}（可选 {', '.join(SCENARIOS)}）")
+        mix[name] = float(weight or 1)
+    return {name: weight for name, weight in mix.items() if weight > 0}
+
+
+def percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def report(results, duration):
+    by_callback = {}
+    for output, status, size, elapsed in results:
+        by_callback.setdefault(output, []).append((status, size, elapsed))
+
+    print(f"{'回调输出':<32}{'请求数':>8}{'请求/秒':>9}{'错误':>6}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'平均字节':>10}")
+    for output, rows in sorted(by_callback.items()):
+        latencies = sorted(elapsed * 1000 for _, _, elapsed in rows)
+        errors = sum(1 for status, _, _ in rows if status >= 400)
+        size = sum(size for _, size, _ in rows) / len(rows)
+        print(f"{output:<32}{len(rows):>8}{len(rows) / duration:>9.1f}{errors:>6}{percentile(latencies, 0.5):>9.1f}"
+              f"{percentile(latencies, 0.95):>9.1f}{percentile(latencies, 0.99):>9.1f}{size:>10.0f}")
+
+    latencies = sorted(elapsed * 1000 for _, _, _, elapsed in results)
+    if latencies:
+        print(f"合计：{len(results)} 个请求，{len(results) / duration:.1f} 请求/秒，"
+              f"p50 {percentile(latencies, 0.5):.1f} ms，p95 {percentile(latencies, 0.95):.1f} ms，"
+              f"p99 {percentile(latencies, 0.99):.1f} ms")
+
+
+def run_users(url, users, duration, mix, seed):
+    layout = fetch_json(url, '/_dash-layout')
+    dependencies = fetch_json(url, '/_dash-dependencies')
+    send = make_sender(url)
+    get = make_getter(url)
+    names, weights = zip(*mix.items())
+    results = []
+    lock = threading.Lock()
+    deadline = time.time() + duration
+
+    def user(index):
+        rng = new_rng(seed + index)
+        browser = SimulatedBrowser(layout, dependencies, send, get)
+        while time.time() < deadline:
+            scenario = SCENARIOS[rng.choices(names, weights)[0]]
+            try:
+                steps = scenario(browser, rng)
+            except OSError as e:
+                steps = [('连接错误', 599, 0, 0.0)]
+                print(f"⚠️ 用户{index}: {e}", file=sys.stderr)
+            with lock:
+                results.extend(steps)
+
+    threads = [threading.Thread(target=user, args=(i,)) for i in range(users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def run_replay(url, users, path):
+    with open(path, encoding='utf-8') as f:
+        lines = [line for line in f if line.strip()]
+    send = make_sender(url)
+    results = []
+    lock = threading.Lock()
+
+    # 每个用户从不同的位置开始回放整段录制
+    def user(index):
+        offset = index * len(lines) // users
+        steps = replay(lines[offset:] + lines[:offset], send)
+        with lock:
+            results.extend(steps)
+
+    threads = [threading.Thread(target=user, args=(i,)) for i in range(users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Dash 回调压测")
+    parser.add_argument('--url', help="应用地址；不指定时在本进程内启动应用")
+    parser.add_argument('--users', type=int, default=8, help="并发用户数（默认8）")
+    parser.add_argument('--duration', type=float, default=20, help="压测秒数（默认20，回放时不使用）")
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f"场景权重（默认 {DEFAULT_MIX}）")
+    parser.add_argument('--replay', help="回放录制的请求文件（JSONL）")
+    parser.add_argument('--seed', type=int, default=0, help="随机种子")
+    args = parser.parse_args(argv)
+
+    url = args.url or start_local_server()
+    start = time.perf_counter()
+    if args.replay:
+        results = run_replay(url, args.users, args.replay)
+    else:
+        results = run_users(url, args.users, args.duration, parse_mix(args.mix), args.seed)
+    report(results, time.perf_counter() - start)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,202 @@
+# 回调性能指标：记录每个 Dash 回调请求各阶段的耗时、请求/响应大小和触发来源，
+# 以 Prometheus 文本格式（直方图和计数器）输出。阶段：
+#   total       整个请求（Flask 收到请求到生成响应）
+#   callback    回调函数本身
+#   framework   total - callback：Dash 解析请求、校验输出、序列化响应（图表的 JSON 序列化在这里）
+#   其他         回调内部用 stage(名称) 标记的阶段，如读取/保存会话、全局调整、生成图表
+# 网络传输时间在服务器端测量不到，用响应大小代替。
+# 指标保存在工作进程的内存中，标签 worker 为进程号；多个工作进程时每次抓取只看到处理该请求的进程。
+#
+# 采样分析（SamplingProfiler）：后台线程每隔一段时间用 sys._current_frames() 采样正在处理回调请求的线程的调用栈，
+# 请求结束时把该请求的采样按折叠栈格式（flamegraph.pl、speedscope 可以直接打开）写入一个文件。
+import bisect
+import contextlib
+import functools
+import os
+import sys
+import threading
+import time
+
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+# 回调名称：第一个输出，如 "..data-store.data...batch-input-status.children.." -> "data-store.data"
+def callback_name(output):
+    if output.startswith('..'):
+        output = output[2:-2].split('...')[0]
+    return output.split('@')[0]
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def lines(self, name, labels):
+        cumulative = 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            cumulative += count
+            yield f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+        yield f'{name}_sum{{{labels}}} {self.sum}'
+        yield f'{name}_count{{{labels}}} {self.count}'
+
+
+def _labels(**labels):
+    def escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return ','.join(f'{key}="{escape(value)}"' for key, value in labels.items())
+
+
+class CallbackMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._stages = {}
+        self._request_bytes = {}
+        self._response_bytes = {}
+        self._triggers = {}
+        self._responses = {}
+
+    # 开始记录当前线程正在处理的回调请求
+    def begin(self, callback, trigger, request_bytes):
+        self._local.current = {'callback': callback, 'trigger': trigger, 'request_bytes': request_bytes,
+                               'start': time.perf_counter(), 'stages': {}}
+
+    # 标记一个阶段；当前线程没有在处理回调请求时不记录
+    @contextlib.contextmanager
+    def stage(self, name):
+        current = getattr(self._local, 'current', None)
+        if current is None:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            current['stages'][name] = current['stages'].get(name, 0) + time.perf_counter() - start
+
+    # 包装回调函数，记录 callback 阶段
+    def instrument(self, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with self.stage('callback'):
+                return func(*args, **kwargs)
+        return wrapper
+
+    # 结束当前请求并汇总，返回 (回调名称, 各阶段耗时)；当前线程没有在处理回调请求时返回 None
+    def finish(self, status, response_bytes):
+        current = self._local.__dict__.pop('current', None)
+        if current is None:
+            return None
+        callback = current['callback']
+        stages = dict(current['stages'], total=time.perf_counter() - current['start'])
+        if 'callback' in stages:
+            stages['framework'] = max(stages['total'] - stages['callback'], 0)
+        with self._lock:
+            for name, seconds in stages.items():
+                self._histogram(self._stages, (callback, name), SECONDS_BUCKETS).observe(seconds)
+            self._histogram(self._request_bytes, (callback,), BYTES_BUCKETS).observe(current['request_bytes'])
+            self._histogram(self._response_bytes, (callback,), BYTES_BUCKETS).observe(response_bytes)
+            key = (callback, current['trigger'])
+            self._triggers[key] = self._triggers.get(key, 0) + 1
+            key = (callback, status)
+            self._responses[key] = self._responses.get(key, 0) + 1
+        return callback, stages
+
+    @staticmethod
+    def _histogram(histograms, key, buckets):
+        if key not in histograms:
+            histograms[key] = Histogram(buckets)
+        return histograms[key]
+
+    # Prometheus 文本格式
+    def render(self):
+        worker = os.getpid()
+        lines = []
+        with self._lock:
+            lines += ['# HELP dash_callback_stage_seconds 回调请求各阶段耗时',
+                      '# TYPE dash_callback_stage_seconds histogram']
+            for (callback, stage), histogram in sorted(self._stages.items()):
+                lines += histogram.lines('dash_callback_stage_seconds',
+                                         _labels(worker=worker, callback=callback, stage=stage))
+            for name, title, histograms in (('dash_callback_request_bytes', '回调请求体大小', self._request_bytes),
+                                            ('dash_callback_response_bytes', '回调响应体大小', self._response_bytes)):
+                lines += [f'# HELP {name} {title}', f'# TYPE {name} histogram']
+                for (callback,), histogram in sorted(histograms.items()):
+                    lines += histogram.lines(name, _labels(worker=worker, callback=callback))
+            lines += ['# HELP dash_callback_triggers_total 回调按触发来源计数',
+                      '# TYPE dash_callback_triggers_total counter']
+            lines += [f'dash_callback_triggers_total{{{_labels(worker=worker, callback=callback, trigger=trigger)}}} {count}'
+                      for (callback, trigger), count in sorted(self._triggers.items())]
+            lines += ['# HELP dash_callback_responses_total 回调按响应状态码计数',
+                      '# TYPE dash_callback_responses_total counter']
+            lines += [f'dash_callback_responses_total{{{_labels(worker=worker, callback=callback, status=status)}}} {count}'
+                      for (callback, status), count in sorted(self._responses.items())]
+        return '\n'.join(lines) + '\n'
+
+
+class SamplingProfiler:
+    # out_dir：输出目录；interval：采样间隔（秒）；min_seconds：只保存耗时不少于此值的请求
+    def __init__(self, out_dir, interval=0.005, min_seconds=0):
+        self.out_dir = out_dir
+        self.interval = interval
+        self.min_seconds = min_seconds
+        self._lock = threading.Lock()
+        self._active = {}
+        self._thread = None
+        self._pid = None
+        self._sequence = 0
+        os.makedirs(out_dir, exist_ok=True)
+
+    # 开始采样当前线程。采样线程在每个进程中首次使用时启动（preload_app 时主进程的线程不会被 fork 到工作进程）
+    def start(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._active = {}
+                self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+                self._thread.start()
+            self._active[threading.get_ident()] = {}
+
+    # 停止采样当前线程，写入折叠栈文件并返回文件路径；没有采样或耗时不足时返回 None
+    def stop(self, name, seconds):
+        with self._lock:
+            stacks = self._active.pop(threading.get_ident(), None)
+            self._sequence += 1
+            sequence = self._sequence
+        if not stacks or seconds < self.min_seconds:
+            return None
+        filename = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{sequence}-{name}-{seconds * 1000:.0f}ms.folded"
+        path = os.path.join(self.out_dir, filename.replace(os.sep, '_'))
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in sorted(stacks.items(), key=lambda item: -item[1]):
+                f.write(f"{stack} {count}\n")
+        return path
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self._lock:
+                for ident, stacks in self._active.items():
+                    frame = frames.get(ident)
+                    if frame is not None:
+                        stack = _folded_stack(frame)
+                        stacks[stack] = stacks.get(stack, 0) + 1
+
+
+def _folded_stack(frame):
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)})")
+        frame = frame.f_back
+    return ';'.join(reversed(names))
@@ -0,0 +1,113 @@
+# 计算结果缓存：相同的作息曲线 + 相同的参数直接返回之前的结果
+# 保存在本地 SQLite 文件中，多个 gunicorn 工作进程共享；条目数超过上限时按最近访问时间（LRU）淘汰。
+# 读取不写数据库：命中/未命中次数先在进程内累计，每 STATS_FLUSH_SECONDS 秒合并到同一个文件中（所有工作进程累计，供监控读取）；
+# 最近访问时间只在距上次记录超过 ACCESS_RESOLUTION_SECONDS 秒时更新，LRU 淘汰的精度为该值。
+# 这样命中时不需要等待数据库的写锁，多个工作进程、线程可以同时读取。
+import hashlib
+import os
+import tempfile
+import threading
+import time
+
+from sqlite_backend import LocalSqlite
+
+DEFAULT_DB_PATH = os.environ.get(
+    'CACHE_DB_PATH', os.path.join(tempfile.gettempdir(), 'zuoxi_cache.sqlite3'))
+DEFAULT_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', 2000))
+STATS_FLUSH_SECONDS = 10
+ACCESS_RESOLUTION_SECONDS = 60
+
+_SCHEMA = [
+    'CREATE TABLE IF NOT EXISTS cache ('
+    'key TEXT PRIMARY KEY, value BLOB NOT NULL, accessed REAL NOT NULL)',
+    'CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)',
+    'CREATE TABLE IF NOT EXISTS cache_stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)',
+    "INSERT OR IGNORE INTO cache_stats (name, value) VALUES ('hits', 0), ('misses', 0)",
+]
+
+
+class ComputeCache:
+    def __init__(self, path=DEFAULT_DB_PATH, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._db = LocalSqlite(path, _SCHEMA)
+        self._inserts = 0
+        self._inserts_lock = threading.Lock()
+        # 尚未合并到数据库的命中/未命中次数
+        self._stats_lock = threading.Lock()
+        self._pending = {'hits': 0, 'misses': 0}
+        self._pending_pid = os.getpid()
+        self._flushed = time.monotonic()
+
+    # 由任意个参数（bytes、字符串、数值、None）生成缓存键
+    @staticmethod
+    def make_key(*parts):
+        digest = hashlib.sha1()
+        for part in parts:
+            if not isinstance(part, bytes):
+                part = repr(part).encode('utf-8')
+            digest.update(len(part).to_bytes(8, 'little'))
+            digest.update(part)
+        return digest.hexdigest()
+
+    def get(self, key):
+        conn = self._db.connect()
+        row = conn.execute('SELECT value, accessed FROM cache WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            self._count(conn, 'misses')
+            return None
+        value, accessed = row
+        now = time.time()
+        if now - accessed > ACCESS_RESOLUTION_SECONDS:
+            conn.execute('UPDATE cache SET accessed = ? WHERE key = ?', (now, key))
+        self._count(conn, 'hits')
+        return value
+
+    def _count(self, conn, name):
+        with self._stats_lock:
+            # fork 之前主进程中未合并的次数不带到工作进程，否则会被每个工作进程重复合并
+            if self._pending_pid != os.getpid():
+                self._pending_pid = os.getpid()
+                self._pending = {'hits': 0, 'misses': 0}
+            self._pending[name] += 1
+            flush = time.monotonic() - self._flushed >= STATS_FLUSH_SECONDS
+        if flush:
+            self._flush_stats(conn)
+
+    # 把进程内累计的次数合并到数据库
+    def _flush_stats(self, conn):
+        with self._stats_lock:
+            pending = self._pending if self._pending_pid == os.getpid() else {}
+            self._pending = {'hits': 0, 'misses': 0}
+            self._pending_pid = os.getpid()
+            self._flushed = time.monotonic()
+        updates = [(count, name) for name, count in pending.items() if count]
+        if updates:
+            conn.executemany('UPDATE cache_stats SET value = value + ? WHERE name = ?', updates)
+
+    def set(self, key, value):
+        conn = self._db.connect()
+        conn.execute('INSERT OR REPLACE INTO cache (key, value, accessed) VALUES (?, ?, ?)',
+                     (key, value, time.time()))
+        # 每写入一定次数检查一次容量，避免每次写入都做一次删除
+        with self._inserts_lock:
+            self._inserts += 1
+            evict = self._inserts % 50 == 0
+        if evict:
+            self._evict(conn)
+
+    # 命中/未命中次数包括本进程的全部查找，其他工作进程最近 STATS_FLUSH_SECONDS 秒内的查找可能还没有合并
+    def stats(self):
+        conn = self._db.connect()
+        self._flush_stats(conn)
+        stats = dict(conn.execute('SELECT name, value FROM cache_stats'))
+        stats['entries'] = conn.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
+
+    def _evict(self, conn):
+        conn.execute(
+            'DELETE FROM cache WHERE key IN ('
+            'SELECT key FROM cache ORDER BY accessed DESC LIMIT -1 OFFSET ?)',
+            (self.max_entries,))
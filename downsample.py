@@ -0,0 +1,32 @@
+# 曲线降采样：Largest-Triangle-Three-Buckets (LTTB)
+# 在保留曲线形状（峰谷）的前提下，把 n 个点降到 threshold 个点，
+# 用于高分辨率（分钟级、多天）作息曲线缩小显示时减少传输和渲染的点数。
+import numpy as np
+
+
+# 返回被保留的点的下标（升序，包含首尾两点）
+def lttb_indices(y, threshold, x=None):
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.arange(n, dtype=np.float64) if x is None else np.asarray(x, dtype=np.float64)
+
+    # 首尾两点固定保留，中间的点均分到 threshold-2 个桶中
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        # 下一个桶的平均点（最后一个桶用末点）
+        next_start, next_end = end, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        # 当前桶中与上一个已选点、下一个桶平均点构成最大三角形的点
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
@@ -0,0 +1,210 @@
+# 编辑历史：每次保存只记录变化的时间槽（列、下标、旧值、新值），撤销/重做只需把这些值写回，与曲线长度无关
+# 上下界由平均作息和方差决定，不单独记录。整条曲线都变化时（全局系数、批量输入）不保存下标。
+# 每 SNAPSHOT_INTERVAL 步保存一次整条曲线的快照：恢复到某一步时从不晚于该步的最近快照开始重放，
+# 最多重放 SNAPSHOT_INTERVAL - 1 步；历史超过 MAX_STEPS 步时按快照边界删除最早的部分。
+# 与会话存储保存在同一个 SQLite 文件中（所有工作进程共享），按会话行（"会话键:曲线名称"）分别记录。
+import struct
+import time
+
+import numpy as np
+
+from schedule_profile import Profile
+from session_store import DEFAULT_DB_PATH, DEFAULT_MAX_ENTRIES, DEFAULT_TTL
+from sqlite_backend import LocalSqlite
+
+SNAPSHOT_INTERVAL = 20
+MAX_STEPS = 200
+
+# 记录的列，顺序即列编号
+COLUMNS = ('average', 'variance')
+
+_COLUMN_HEADER = struct.Struct('<Bi')
+
+_SCHEMA = [
+    'CREATE TABLE IF NOT EXISTS history_edits ('
+    'row TEXT NOT NULL, seq INTEGER NOT NULL, delta BLOB NOT NULL, PRIMARY KEY (row, seq))',
+    'CREATE TABLE IF NOT EXISTS history_snapshots ('
+    'row TEXT NOT NULL, seq INTEGER NOT NULL, payload BLOB NOT NULL, PRIMARY KEY (row, seq))',
+    'CREATE TABLE IF NOT EXISTS history_cursor ('
+    'row TEXT PRIMARY KEY, position INTEGER NOT NULL, head INTEGER NOT NULL, first INTEGER NOT NULL, '
+    'accessed REAL NOT NULL)',
+    'CREATE INDEX IF NOT EXISTS history_cursor_accessed ON history_cursor (accessed)',
+]
+
+
+# 两个版本之间的变化，没有变化时返回 None
+# 格式：每个变化的列为 (列编号, 个数) + 下标(int32) + 旧值(float64) + 新值(float64)；个数为负表示整列，不保存下标
+def diff(before, after):
+    parts = []
+    for code, column in enumerate(COLUMNS):
+        old, new = getattr(before, column), getattr(after, column)
+        indices = np.flatnonzero(old != new)
+        if not len(indices):
+            continue
+        if len(indices) == len(new):
+            parts += [_COLUMN_HEADER.pack(code, -len(new)), old.tobytes(), new.tobytes()]
+        else:
+            parts += [_COLUMN_HEADER.pack(code, len(indices)), indices.astype('<i4').tobytes(),
+                      old[indices].tobytes(), new[indices].tobytes()]
+    return b''.join(parts) or None
+
+
+# 把变化应用到 profile（undo 为 True 时写回旧值），返回变化的方差下标；平均作息或整列变化时返回 None
+def apply_delta(profile, delta, undo=False):
+    changed = []
+    offset = 0
+    while offset < len(delta):
+        code, count = _COLUMN_HEADER.unpack_from(delta, offset)
+        offset += _COLUMN_HEADER.size
+        values = getattr(profile, COLUMNS[code])
+        if count < 0:
+            indices = slice(None)
+            count = -count
+        else:
+            indices = np.frombuffer(delta, '<i4', count, offset).astype(np.int64)
+            offset += 4 * count
+        old = np.frombuffer(delta, np.float64, count, offset)
+        new = np.frombuffer(delta, np.float64, count, offset + 8 * count)
+        offset += 16 * count
+        values[indices] = old if undo else new
+        if changed is not None and COLUMNS[code] == 'variance' and not isinstance(indices, slice):
+            changed = indices
+        else:
+            changed = None
+    if changed is None:
+        profile.recompute_bounds()
+        return None
+    profile.recompute_bounds(changed)
+    return changed.tolist()
+
+
+class EditHistory:
+    def __init__(self, path=DEFAULT_DB_PATH, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES,
+                 max_steps=MAX_STEPS, snapshot_interval=SNAPSHOT_INTERVAL):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_steps = max_steps
+        self.snapshot_interval = snapshot_interval
+        self._db = LocalSqlite(path, _SCHEMA)
+
+    def _cursor(self, conn, row):
+        return conn.execute('SELECT position, head, first FROM history_cursor WHERE row = ? AND accessed >= ?',
+                            (row, time.time() - self.ttl)).fetchone()
+
+    def _set_cursor(self, conn, row, position, head, first):
+        conn.execute('INSERT OR REPLACE INTO history_cursor (row, position, head, first, accessed) '
+                     'VALUES (?, ?, ?, ?, ?)', (row, position, head, first, time.time()))
+
+    # 可以撤销和重做的步数 (撤销, 重做)
+    def counts(self, row):
+        cursor = self._cursor(self._db.connect(), row)
+        if cursor is None:
+            return 0, 0
+        position, head, first = cursor
+        return position - first + 1, head - position
+
+    # 记录一次保存：before/after 为保存前后的曲线。撤销之后再修改时，之后的重做记录被丢弃
+    def record(self, row, before, after):
+        delta = diff(before, after)
+        if delta is None:
+            return
+        conn = self._db.connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            cursor = self._cursor(conn, row)
+            if cursor is None:
+                # 新的历史：清除过期的残留记录，保存修改前的曲线作为第0步的快照
+                self._delete(conn, row)
+                position, first = 0, 1
+                conn.execute('INSERT INTO history_snapshots (row, seq, payload) VALUES (?, 0, ?)',
+                             (row, before.to_bytes()))
+            else:
+                position, _, first = cursor
+            seq = position + 1
+            conn.execute('DELETE FROM history_edits WHERE row = ? AND seq >= ?', (row, seq))
+            conn.execute('DELETE FROM history_snapshots WHERE row = ? AND seq >= ?', (row, seq))
+            conn.execute('INSERT INTO history_edits (row, seq, delta) VALUES (?, ?, ?)', (row, seq, delta))
+            if seq % self.snapshot_interval == 0:
+                conn.execute('INSERT INTO history_snapshots (row, seq, payload) VALUES (?, ?, ?)',
+                             (row, seq, after.to_bytes()))
+            first = self._trim(conn, row, seq, first)
+            self._set_cursor(conn, row, seq, seq, first)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        if cursor is None:
+            self._evict(conn)
+
+    # 超过 max_steps 步时，删除不晚于 (最新一步 - max_steps) 的最近快照之前的记录，返回新的最早可撤销步
+    def _trim(self, conn, row, head, first):
+        if head - first + 1 <= self.max_steps:
+            return first
+        snapshot = conn.execute('SELECT MAX(seq) FROM history_snapshots WHERE row = ? AND seq <= ?',
+                                (row, head - self.max_steps)).fetchone()[0]
+        if snapshot is None or snapshot < first:
+            return first
+        conn.execute('DELETE FROM history_edits WHERE row = ? AND seq <= ?', (row, snapshot))
+        conn.execute('DELETE FROM history_snapshots WHERE row = ? AND seq < ?', (row, snapshot))
+        return snapshot + 1
+
+    # 撤销一步：修改 profile，返回变化的方差下标（见 apply_delta）；没有可撤销的步骤时返回 False
+    def undo(self, row, profile):
+        return self._step(row, profile, undo=True)
+
+    # 重做一步，返回值同 undo
+    def redo(self, row, profile):
+        return self._step(row, profile, undo=False)
+
+    def _step(self, row, profile, undo):
+        conn = self._db.connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            cursor = self._cursor(conn, row)
+            if cursor is None:
+                conn.execute('COMMIT')
+                return False
+            position, head, first = cursor
+            seq = position if undo else position + 1
+            if seq < first or seq > head:
+                conn.execute('COMMIT')
+                return False
+            delta = conn.execute('SELECT delta FROM history_edits WHERE row = ? AND seq = ?', (row, seq)).fetchone()[0]
+            self._set_cursor(conn, row, seq - 1 if undo else seq, head, first)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return apply_delta(profile, delta, undo)
+
+    # 由快照和变化记录恢复第 seq 步（默认为当前步）的曲线；没有历史时返回 None
+    def restore(self, row, seq=None):
+        conn = self._db.connect()
+        cursor = self._cursor(conn, row)
+        if cursor is None:
+            return None
+        seq = cursor[0] if seq is None else seq
+        snapshot = conn.execute('SELECT seq, payload FROM history_snapshots WHERE row = ? AND seq <= ? '
+                                'ORDER BY seq DESC LIMIT 1', (row, seq)).fetchone()
+        if snapshot is None:
+            return None
+        start, payload = snapshot
+        profile = Profile.from_bytes(payload)
+        for (delta,) in conn.execute('SELECT delta FROM history_edits WHERE row = ? AND seq > ? AND seq <= ? '
+                                     'ORDER BY seq', (row, start, seq)):
+            apply_delta(profile, delta)
+        return profile
+
+    def _delete(self, conn, row):
+        for table in ('history_edits', 'history_snapshots', 'history_cursor'):
+            conn.execute(f'DELETE FROM {table} WHERE row = ?', (row,))
+
+    # 与会话存储相同的淘汰策略：超过 TTL 未访问或超出上限（按最近访问时间）的历史整段删除
+    def _evict(self, conn):
+        rows = conn.execute(
+            'SELECT row FROM history_cursor WHERE accessed < ? UNION '
+            'SELECT row FROM (SELECT row FROM history_cursor ORDER BY accessed DESC LIMIT -1 OFFSET ?)',
+            (time.time() - self.ttl, self.max_entries)).fetchall()
+        for (row,) in rows:
+            self._delete(conn, row)
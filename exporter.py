@@ -0,0 +1,141 @@
+# 导出：生成 作息分析结果.csv 的表格布局，以及工作区全部曲线的流式导出
+# 只依赖 pandas/numpy（Parquet 格式需要另行安装 pyarrow），网页应用和批处理命令行共用
+import codecs
+import importlib.util
+import zipfile
+
+from period_detection import PERIOD_KEYS, empty_period_times
+from workspace import profile_label
+
+EXPORT_FILENAME = '作息分析结果.csv'
+
+# 全部曲线的导出格式：名称 -> (显示名称, 文件名, MIME类型)
+EXPORT_FORMATS = {
+    'csv': ("CSV", '作息分析结果_全部.csv', 'text/csv; charset=utf-8'),
+    'excel-csv': ("CSV（Excel，带BOM）", '作息分析结果_全部_Excel.csv', 'text/csv; charset=utf-8'),
+    'parquet': ("Parquet", '作息分析结果_全部.parquet', 'application/vnd.apache.parquet'),
+    'zip': ("ZIP（每条曲线一个CSV）", '作息分析结果_全部.zip', 'application/zip'),
+}
+
+# 生成导出表格：A-F列为原始数据，G-J列的前两行为作息启动期/结束期
+def build_export_frame(profile, period_times=None):
+    period_times = period_times or empty_period_times()
+    
+    # 创建一个新的DataFrame，只包含原始数据（A-F列）
+    export_df = profile.to_frame()
+    
+    # 添加G-J列，初始化为空
+    export_df['作息启动期'] = ''
+    export_df['作息启动期A'] = ''
+    export_df['作息启动期B'] = ''
+    export_df['作息启动期C'] = ''
+    
+    # 在第1行设置作息启动期信息
+    export_df.loc[0, '作息启动期'] = '作息启动期'
+    export_df.loc[0, '作息启动期A'] = period_times.get('作息启动期A') or ''
+    export_df.loc[0, '作息启动期B'] = period_times.get('作息启动期B') or ''
+    export_df.loc[0, '作息启动期C'] = period_times.get('作息启动期C') or ''
+    
+    # 在第2行设置作息结束期信息
+    export_df.loc[1, '作息启动期'] = '作息结束期'
+    export_df.loc[1, '作息启动期A'] = period_times.get('作息结束期A') or ''
+    export_df.loc[1, '作息启动期B'] = period_times.get('作息结束期B') or ''
+    export_df.loc[1, '作息启动期C'] = period_times.get('作息结束期C') or ''
+    
+    # 限制数值列的小数点后最多6位
+    numeric_columns = ['平均作息', '作息方差', '作息上界', '作息下界']
+    export_df[numeric_columns] = export_df[numeric_columns].round(6)
+    
+    return export_df
+
+
+# 可用的导出格式 [(名称, 显示名称)]；Parquet 只在安装了 pyarrow 时可用
+def available_formats():
+    return [(name, title) for name, (title, _, _) in EXPORT_FORMATS.items()
+            if name != 'parquet' or importlib.util.find_spec('pyarrow') is not None]
+
+
+# 只追加、不可回退的输出缓冲区：写入的内容在每块之后取走，zipfile 检测到不可 seek 时按流式格式写入
+class _ChunkSink:
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+# 流式导出：frames 为按块生成的长表（见 Workspace.iter_frames），返回逐块产生 bytes 的生成器
+# 格式不可用时立即抛出 ValueError（在开始发送响应之前）
+def stream_export(frames, fmt):
+    if fmt not in dict(available_formats()):
+        raise ValueError(f"不支持的导出格式: {fmt}")
+    if fmt == 'parquet':
+        return _stream_parquet(frames)
+    if fmt == 'zip':
+        return _stream_zip(frames)
+    return _stream_csv(frames, bom=fmt == 'excel-csv')
+
+
+def _stream_csv(frames, bom=False):
+    header = True
+    for frame in frames:
+        data = frame.to_csv(index=False, header=header).encode('utf-8')
+        if header and bom:
+            data = codecs.BOM_UTF8 + data
+        header = False
+        yield data
+
+
+# 每块写成一个行组
+def _stream_parquet(frames):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    sink = _ChunkSink()
+    writer = None
+    for frame in frames:
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        if writer is None:
+            writer = pq.ParquetWriter(sink, table.schema)
+        writer.write_table(table)
+        yield sink.drain()
+    if writer is not None:
+        writer.close()
+    yield sink.drain()
+
+
+# 每条曲线一个带 BOM 的 CSV，布局同单条曲线下载（数据列，G-J列的前两行为作息启动期/结束期），
+# 文件名为曲线名称，如 "341-工作日.csv"。每块只格式化一次，再按曲线切分各行
+def _stream_zip(frames):
+    sink = _ChunkSink()
+    period_columns = ['作息启动期', '作息启动期A', '作息启动期B', '作息启动期C']
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for frame in frames:
+            values = frame.drop(columns=['站点', '日型', *PERIOD_KEYS])
+            header = codecs.BOM_UTF8 + (','.join([*values.columns, *period_columns]) + '\n').encode('utf-8')
+            lines = values.to_csv(index=False, header=False).splitlines()
+            for (station, day_type), rows in frame.groupby(['站点', '日型'], sort=False).indices.items():
+                periods = frame.iloc[rows[0]][PERIOD_KEYS].tolist()
+                tails = [','.join(['作息启动期', *periods[:3]]), ','.join(['作息结束期', *periods[3:]])]
+                body = ''.join(f"{lines[i]},{tails[n] if n < 2 else ',,,'}\n" for n, i in enumerate(rows))
+                archive.writestr(f"{profile_label(station, day_type)}.csv", header + body.encode('utf-8'))
+            yield sink.drain()
+    yield sink.drain()
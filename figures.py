@@ -0,0 +1,197 @@
+# 图表模板：启动时用 plotly.graph_objects 校验并生成一次图表骨架（布局、轨迹样式、刻度），
+# 每次回调只填入 y 数组，生成普通 dict，不再经过 graph_objects 的校验。
+#
+# 图1的轨迹顺序为 [平均作息, 作息方差]，图2为 [平均作息, 作息上界, 作息下界]，
+# 增量更新（Patch）和 assets/clientside.js 都依赖这个顺序。
+# 模拟结果图为 [P95, P5, P75, P25, P50, 平均作息]，P5/P25 填充到前一条轨迹形成分位数带。
+#
+# 时间轴为日期轴，x 为从第1天 00:00 起的毫秒数，所以分钟级、多天的曲线都能正确显示刻度；
+# 轨迹使用 WebGL（Scattergl）渲染。点数超过 MAX_PLOT_POINTS 时按当前可见范围用 LTTB 降采样，
+# 放大后（relayoutData）再按新的范围取点。
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+from plotly.io.json import to_json_plotly
+
+from downsample import lttb_indices
+from schedule_profile import slot_minutes
+
+# 单条轨迹最多发送的点数
+MAX_PLOT_POINTS = int(os.environ.get('MAX_PLOT_POINTS', 2000))
+# 图表生成方式的版本：填充方式变化（不只是骨架变化）时加1，之前缓存的图表自动失效
+FIGURE_VERSION = 2
+
+
+def _xaxis(n_slots, minutes):
+    days = n_slots * minutes / 1440
+    if days <= 1:
+        time_format, hours_per_tick = '%H:%M', 1
+    else:
+        time_format, hours_per_tick = '第%-d天 %H:%M', 6 if days <= 3 else 24
+    return dict(
+        type='date',
+        tickformat=time_format,
+        hoverformat=time_format,
+        dtick=hours_per_tick * 3600 * 1000
+    )
+
+
+def _layout(title, xaxis):
+    return dict(
+        title=title,
+        xaxis_title="时间",
+        yaxis_title="数值",
+        xaxis=xaxis,
+        yaxis=dict(range=[0, 1]),
+        hovermode='x unified'
+    )
+
+
+# 日期轴上的坐标（字符串或毫秒数）转换为毫秒数
+def _milliseconds(value):
+    if isinstance(value, str):
+        return pd.Timestamp(value).value / 1e6
+    return value
+
+
+# 射线法判断各点是否在多边形内（套索选区）
+def _in_polygon(px, py, xs, ys):
+    inside = np.zeros(len(px), dtype=bool)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for (x1, y1), (x2, y2) in zip(zip(xs, ys), zip(np.roll(xs, 1), np.roll(ys, 1))):
+            crosses = (y1 > py) != (y2 > py)
+            inside ^= crosses & (px < (x2 - x1) * (py - y1) / (y2 - y1) + x1)
+    return inside
+
+
+def _skeleton(traces, layout):
+    fig = go.Figure(layout=layout)
+    for trace in traces:
+        fig.add_trace(go.Scattergl(**{'mode': 'lines+markers', **trace}))
+    return fig.to_plotly_json()
+
+
+class FigureTemplates:
+    def __init__(self, times, minutes=None, max_points=MAX_PLOT_POINTS):
+        self.minutes = minutes or slot_minutes(times)
+        self.max_points = max_points
+        self.index = np.arange(len(times))
+        self.x = self.index * (self.minutes * 60 * 1000)
+        xaxis = _xaxis(len(times), self.minutes)
+        common = dict(x=self.x, customdata=self.index)
+
+        self.graph1 = _skeleton([
+            dict(name='平均作息', line=dict(color='orange', width=3), marker=dict(size=4), **common),
+            dict(name='作息方差', line=dict(color='green', width=3, dash='dash'), marker=dict(size=4), **common),
+        ], _layout("客流", xaxis))
+
+        self.graph2 = _skeleton([
+            dict(name='平均作息', line=dict(color='blue', width=3), marker=dict(size=4), **common),
+            dict(name='作息上界', line=dict(color='red', width=2), marker=dict(size=3), **common),
+            dict(name='作息下界', line=dict(color='purple', width=2), marker=dict(size=3), **common),
+        ], _layout("作息上下界分析", xaxis))
+
+        band = dict(mode='lines', line=dict(width=0), hoverinfo='skip', **common)
+        self.simulation = _skeleton([
+            dict(name='P95', showlegend=False, **band),
+            dict(name='P5–P95', fill='tonexty', fillcolor='rgba(31,119,180,0.15)', **band),
+            dict(name='P75', showlegend=False, **band),
+            dict(name='P25–P75', fill='tonexty', fillcolor='rgba(31,119,180,0.35)', **band),
+            dict(name='P50', mode='lines', line=dict(color='#1f77b4', width=2), **common),
+            dict(name='平均作息', mode='lines', line=dict(color='orange', width=2, dash='dot'), **common),
+        ], _layout("蒙特卡洛模拟", xaxis))
+
+        # 模板指纹：模板变化（例如升级后样式调整）时，之前缓存的图表自动失效
+        skeletons = to_json_plotly([FIGURE_VERSION, self.graph1, self.graph2, self.simulation,
+                                    self.max_points]).encode('utf-8')
+        self.fingerprint = hashlib.sha1(skeletons).hexdigest()
+
+    # 点数超过上限时图上显示的是降采样后的点，不能按下标做增量更新
+    def decimates(self, n_slots):
+        return n_slots > self.max_points
+
+    # 从 relayoutData 中取出当前可见的时间槽范围 [起, 止]，自动范围时返回 None；
+    # 不含 x 轴范围的 relayout（切换拖动模式、只缩放 y 轴等）不改变可见范围，返回之前的 window
+    def window_from_relayout(self, relayout, window=None):
+        if not relayout:
+            return window
+        if relayout.get('xaxis.autorange'):
+            return None
+        if 'xaxis.range[0]' in relayout:
+            start, end = relayout['xaxis.range[0]'], relayout['xaxis.range[1]']
+        elif 'xaxis.range' in relayout:
+            start, end = relayout['xaxis.range']
+        else:
+            return window
+        return [self._slot(start), self._slot(end)]
+
+    def _slot(self, value):
+        return _milliseconds(value) / (self.minutes * 60 * 1000)
+
+    # 降采样显示时图上只有部分点，selectedData['points'] 中没有未显示的时间槽，
+    # 所以按选区（框选的范围或套索的多边形）在完整曲线上重新取点。series 为图上各条轨迹的 y 数组，
+    # 任一轨迹在选区内的时间槽都算选中
+    def selected_slots(self, selected, series):
+        selected = selected or {}
+        x = self.x[:len(series[0])]
+        if selected.get('range'):
+            (x0, x1), (y0, y1) = [sorted(_milliseconds(v) for v in selected['range'][axis]) for axis in ('x', 'y')]
+            inside = lambda y: (x >= x0) & (x <= x1) & (y >= y0) & (y <= y1)
+        elif selected.get('lassoPoints'):
+            xs = np.array([_milliseconds(v) for v in selected['lassoPoints']['x']], dtype=np.float64)
+            ys = np.asarray(selected['lassoPoints']['y'], dtype=np.float64)
+            inside = lambda y: _in_polygon(x, y, xs, ys)
+        else:
+            return np.unique([point['customdata'] for point in selected.get('points', []) if 'customdata' in point])
+        hits = np.zeros(len(x), dtype=bool)
+        for y in series:
+            hits |= inside(np.asarray(y))
+        return np.flatnonzero(hits)
+
+    # 需要发送的点的下标，None 表示发送全部点
+    def _visible(self, average, window):
+        n = len(average)
+        if not self.decimates(n):
+            return None
+        lo, hi = 0, n - 1
+        if window is not None:
+            lo = min(max(int(np.floor(window[0])), 0), n - 1)
+            hi = min(max(int(np.ceil(window[1])), lo), n - 1)
+        return lo + lttb_indices(average[lo:hi + 1], self.max_points)
+
+    # 用骨架的浅拷贝填入 y 数组；骨架本身不被修改
+    def _fill(self, skeleton, ys, title, uirevision, indices):
+        layout = dict(skeleton['layout'], uirevision=uirevision)
+        if title is not None:
+            layout['title'] = dict(layout['title'], text=title)
+        if indices is None:
+            data = [dict(trace, y=y) for trace, y in zip(skeleton['data'], ys)]
+        else:
+            data = [dict(trace, x=self.x[indices], customdata=indices, y=y[indices])
+                    for trace, y in zip(skeleton['data'], ys)]
+            # 浏览器端据此提示选中的点数只是图上画出的点
+            layout['meta'] = {'decimated': True}
+        return {'data': data, 'layout': layout}
+
+    def graph1_figure(self, profile, label, window=None):
+        indices = self._visible(profile.average, window)
+        return self._fill(self.graph1, [profile.average, profile.variance], f"{label}客流", label, indices)
+
+    def graph2_figure(self, profile, label, window=None):
+        indices = self._visible(profile.average, window)
+        return self._fill(self.graph2, [profile.average, profile.upper, profile.lower], None, label, indices)
+
+    # percentiles 为 simulation.DEFAULT_PERCENTILES 对应的 (5, 时间槽数) 数组；容量阈值画为水平线
+    def simulation_figure(self, percentiles, average, label, capacity):
+        indices = self._visible(average, None)
+        p5, p25, p50, p75, p95 = percentiles
+        figure = self._fill(self.simulation, [p95, p5, p75, p25, p50, average], f"{label}蒙特卡洛模拟", label, indices)
+        figure['layout']['shapes'] = [dict(type='line', xref='paper', x0=0, x1=1, y0=capacity, y1=capacity,
+                                           line=dict(color='red', width=2, dash='dash'))]
+        return figure
+
+    def build(self, profile, label, window1=None, window2=None):
+        return self.graph1_figure(profile, label, window1), self.graph2_figure(profile, label, window2)
@@ -1,10 +1,23 @@
 # Gunicorn configuration file for Render deployment
+# 工作模式可以通过环境变量调整（见 DEPLOY_CHECKLIST.md 中的并发配置）：
+#   GUNICORN_WORKER_CLASS  gthread（默认，每个工作进程多个线程）、sync 或 gevent（需要另行安装 gevent）
+#   WEB_CONCURRENCY        工作进程数（Render 会自动设置）
+#   GUNICORN_THREADS       gthread 模式下每个工作进程的线程数
+#   GUNICORN_TIMEOUT       请求超时秒数
+#   GUNICORN_MAX_REQUESTS  每个工作进程处理多少个请求后重启（0 为不重启）
+import os
+
 bind = "0.0.0.0:10000"
-workers = 2
-worker_class = "sync"
-worker_connections = 1000
-timeout = 30
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+# sync 模式下 threads 大于1时 gunicorn 会自动改用 gthread，所以只在 gthread 模式下设置线程数
+threads = int(os.environ.get('GUNICORN_THREADS', 4)) if worker_class == 'gthread' else 1
+# worker_connections 只对异步工作模式有效
+if worker_class in ('gevent', 'eventlet'):
+    worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 1000))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
 keepalive = 2
-max_requests = 1000
+# 工作进程重启时 gthread 模式下排队中的长连接会被断开，所以按线程数放大，使重启频率与原来的 sync 模式相当
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000 * threads))
 max_requests_jitter = 50
 preload_app = True
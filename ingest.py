@@ -0,0 +1,261 @@
+# 原始客流日志导入：把原始事件/计数日志增量汇总为各站点 × 日型的作息曲线
+# 日志按块流式读取（CSV 或 JSONL），内存占用与日志大小无关：
+#   1. 每条记录按时间戳归入时间槽（默认15分钟），同一站点同一天的计数累加
+#   2. 一天的数据完整后按当天的最大时间槽计数归一化到 [0,1]，作为一次观测
+#   3. 按 站点 × 日型 用 Welford（批量合并）方法更新每个时间槽的均值和方差
+# 状态（均值、方差、未完成的天、已导入的天）保存在 .npz 文件中，
+# 新的日志只需要导入新的天，不需要重新读取历史日志。
+#
+# 日志中同一站点的记录大致按时间排列：出现更晚日期的记录后，更早的天视为完整（可以用 lateness 放宽）。
+# 已经汇总过的天再次出现时跳过，重复导入同一个日志不会重复计数。
+#
+# 用法示例：
+#   python ingest.py 日志/*.csv 日志/*.jsonl --state 作息状态.npz
+#   python ingest.py 日志/2024-06-01.csv --state 作息状态.npz --out 作息长表.csv
+# 状态文件可以直接作为 WORKSPACE_PATH（平均作息）和 VARIANCE_HISTORY_PATH（历史方差）。
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# 每次读取的行数
+CHUNK_ROWS = 200_000
+
+STATION_COLUMN = '站点'
+TIME_COLUMN = '时间'
+COUNT_COLUMN = '客流'
+
+
+# 一天内各时间槽的时间标签，格式与 作息.csv 相同（H:MM）
+def slot_times(minutes):
+    return [f"{m // 60}:{m % 60:02d}" for m in range(0, 1440, minutes)]
+
+
+# 日型：周一至周五为工作日，周六、周日为周末
+def day_types(dates):
+    return np.where(pd.DatetimeIndex(dates).dayofweek < 5, '工作日', '周末')
+
+
+def read_chunks(path, chunk_rows=CHUNK_ROWS):
+    if path.endswith('.jsonl') or path.endswith('.json'):
+        return pd.read_json(path, lines=True, chunksize=chunk_rows, dtype=False)
+    return pd.read_csv(path, chunksize=chunk_rows, dtype={STATION_COLUMN: str})
+
+
+class IngestState:
+    def __init__(self, minutes=15):
+        self.minutes = minutes
+        self.slots = 1440 // minutes
+        # 站点 × 日型 的观测天数、均值、平方差累计（Welford M2）
+        self.keys = []
+        self.key_index = {}
+        self.count = np.zeros(0, dtype=np.int64)
+        self.mean = np.zeros((0, self.slots))
+        self.m2 = np.zeros((0, self.slots))
+        # 未完成的天 {(站点, 日期): 各时间槽计数}，以及每个站点见过的最新日期
+        self.pending = {}
+        self.latest = {}
+        # 已经汇总过的天
+        self.done = set()
+
+    @property
+    def times(self):
+        return slot_times(self.minutes)
+
+    @property
+    def variance(self):
+        n = self.count[:, None]
+        return np.where(n > 1, self.m2 / np.maximum(n - 1, 1), np.nan)
+
+    def _key_rows(self, keys):
+        for key in keys:
+            if key not in self.key_index:
+                self.key_index[key] = len(self.keys)
+                self.keys.append(key)
+        grow = len(self.keys) - len(self.count)
+        if grow:
+            self.count = np.concatenate([self.count, np.zeros(grow, dtype=np.int64)])
+            self.mean = np.vstack([self.mean, np.zeros((grow, self.slots))])
+            self.m2 = np.vstack([self.m2, np.zeros((grow, self.slots))])
+        return np.array([self.key_index[key] for key in keys], dtype=np.int64)
+
+    # 导入一块记录，返回 (跳过的记录数（已汇总过的天）, 时间戳为空或无法解析而丢弃的记录数)
+    def add_chunk(self, stations, timestamps, counts=None):
+        timestamps = pd.to_datetime(pd.Series(timestamps).reset_index(drop=True), errors='coerce')
+        valid = timestamps.notna().to_numpy()
+        timestamps = timestamps[valid]
+        frame = pd.DataFrame({
+            'station': pd.Series(stations).astype(str).to_numpy()[valid],
+            'date': timestamps.dt.strftime('%Y-%m-%d').to_numpy(),
+            'slot': ((timestamps.dt.hour * 60 + timestamps.dt.minute) // self.minutes).to_numpy(dtype=np.int64),
+            'count': 1.0 if counts is None else
+            pd.to_numeric(pd.Series(counts), errors='coerce').fillna(0).to_numpy()[valid],
+        })
+        invalid = int((~valid).sum())
+        grouped = frame.groupby(['station', 'date', 'slot'])['count']
+        sums, sizes = grouped.sum(), grouped.size()
+        skipped = 0
+        for (station, date), day in sums.groupby(level=[0, 1]):
+            if (station, date) in self.done:
+                skipped += int(sizes.loc[(station, date)].sum())
+                continue
+            counts = self.pending.get((station, date))
+            if counts is None:
+                counts = self.pending[(station, date)] = np.zeros(self.slots)
+            counts[day.index.get_level_values(2)] += day.to_numpy()
+            if date > self.latest.get(station, ''):
+                self.latest[station] = date
+        return skipped, invalid
+
+    # 汇总完整的天：lateness 为允许的迟到天数，all_days 为 True 时汇总全部未完成的天
+    def finalize(self, lateness=0, all_days=False):
+        ready = []
+        for station, date in self.pending:
+            if all_days:
+                ready.append((station, date))
+                continue
+            cutoff = pd.Timestamp(self.latest[station]) - pd.Timedelta(days=lateness)
+            if pd.Timestamp(date) < cutoff:
+                ready.append((station, date))
+        if not ready:
+            return 0
+
+        counts = np.vstack([self.pending.pop(day) for day in ready])
+        self.done.update(ready)
+        # 按当天最大时间槽计数归一化；全天为0的天保持为0
+        peak = counts.max(axis=1, keepdims=True)
+        days = counts / np.where(peak > 0, peak, 1)
+
+        stations = [station for station, _ in ready]
+        types = day_types([date for _, date in ready])
+        rows = self._key_rows(list(zip(stations, types)))
+        self._merge(rows, days)
+        return len(ready)
+
+    # Welford 批量合并（Chan 等）：先算出这批天每个 站点 × 日型 的计数、均值、M2，再与已有统计量合并
+    def _merge(self, rows, days):
+        unique, inverse = np.unique(rows, return_inverse=True)
+        n_b = np.bincount(inverse).astype(np.float64)
+        sum_b = np.zeros((len(unique), self.slots))
+        np.add.at(sum_b, inverse, days)
+        mean_b = sum_b / n_b[:, None]
+        m2_b = np.zeros((len(unique), self.slots))
+        np.add.at(m2_b, inverse, (days - mean_b[inverse]) ** 2)
+
+        n_a = self.count[unique].astype(np.float64)
+        n = n_a + n_b
+        delta = mean_b - self.mean[unique]
+        self.mean[unique] += delta * (n_b / n)[:, None]
+        self.m2[unique] += m2_b + delta ** 2 * (n_a * n_b / n)[:, None]
+        self.count[unique] += n_b.astype(np.int64)
+
+    # 把状态导出为长表，列同 Workspace.from_long_file（站点, 日型, 时间, 平均作息），另加 作息方差、天数
+    def to_frame(self):
+        stations, types = zip(*self.keys) if self.keys else ((), ())
+        return pd.DataFrame({
+            '站点': np.repeat(stations, self.slots),
+            '日型': np.repeat(types, self.slots),
+            '时间': np.tile(self.times, len(self.keys)),
+            '平均作息': self.mean.ravel().round(6),
+            '作息方差': self.variance.ravel().round(6),
+            '天数': np.repeat(self.count, self.slots),
+        })
+
+    def save(self, path):
+        pending = list(self.pending)
+        arrays = {
+            'minutes': np.int64(self.minutes),
+            'keys': np.array(self.keys, dtype=str).reshape(-1, 2),
+            'count': self.count,
+            'mean': self.mean,
+            'm2': self.m2,
+            'pending_keys': np.array(pending, dtype=str).reshape(-1, 2),
+            'pending_counts': np.array([self.pending[day] for day in pending]).reshape(-1, self.slots),
+            'done': np.array(sorted(self.done), dtype=str).reshape(-1, 2),
+        }
+        # 先写临时文件再替换，导入中断时不会留下损坏的状态
+        tmp = f"{path}.tmp"
+        with open(tmp, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            state = cls(int(data['minutes']))
+            state._key_rows([tuple(key) for key in data['keys'].tolist()])
+            state.count = data['count'].copy()
+            state.mean = data['mean'].copy()
+            state.m2 = data['m2'].copy()
+            for key, counts in zip(data['pending_keys'].tolist(), data['pending_counts']):
+                state.pending[tuple(key)] = counts.copy()
+            state.done = {tuple(day) for day in data['done'].tolist()}
+        for station, date in list(state.pending) + list(state.done):
+            if date > state.latest.get(station, ''):
+                state.latest[station] = date
+        return state
+
+
+# 读取状态文件中的作息曲线，返回 (时间标签, [(站点, 日型)], 平均作息 N×时间槽数, 方差 N×时间槽数)
+def load_profiles(path):
+    state = IngestState.load(path)
+    return state.times, state.keys, state.mean, state.variance
+
+
+# 导入一个日志文件，返回 (读取的记录数, 跳过的记录数, 丢弃的记录数)
+def ingest_file(state, path, chunk_rows=CHUNK_ROWS, lateness=0,
+                station_column=STATION_COLUMN, time_column=TIME_COLUMN, count_column=COUNT_COLUMN):
+    rows = skipped = invalid = 0
+    for chunk in read_chunks(path, chunk_rows):
+        counts = chunk[count_column] if count_column in chunk else None
+        chunk_skipped, chunk_invalid = state.add_chunk(chunk[station_column], chunk[time_column], counts)
+        skipped += chunk_skipped
+        invalid += chunk_invalid
+        rows += len(chunk)
+        state.finalize(lateness)
+    return rows, skipped, invalid
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="把原始客流日志增量汇总为作息曲线")
+    parser.add_argument('inputs', nargs='+', help="日志文件（.csv 或 .jsonl）")
+    parser.add_argument('--state', required=True, help="状态文件（.npz），不存在时新建")
+    parser.add_argument('--minutes', type=int, default=15, help="时间槽分钟数（默认15，仅新建状态时有效）")
+    parser.add_argument('--lateness', type=int, default=0, help="允许迟到的天数（默认0）")
+    parser.add_argument('--keep-open', action='store_true', help="导入结束时保留各站点最新的一天，等待后续日志")
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS, help=f"每次读取的行数（默认{CHUNK_ROWS}）")
+    parser.add_argument('--station-column', default=STATION_COLUMN, help=f"站点列名（默认 {STATION_COLUMN}）")
+    parser.add_argument('--time-column', default=TIME_COLUMN, help=f"时间戳列名（默认 {TIME_COLUMN}）")
+    parser.add_argument('--count-column', default=COUNT_COLUMN, help=f"计数列名，不存在时每条记录计1（默认 {COUNT_COLUMN}）")
+    parser.add_argument('--out', help="同时导出作息长表（CSV）")
+    args = parser.parse_args(argv)
+
+    if os.path.exists(args.state):
+        state = IngestState.load(args.state)
+    else:
+        state = IngestState(args.minutes)
+
+    for path in args.inputs:
+        rows, skipped, invalid = ingest_file(state, path, args.chunk_rows, args.lateness,
+                                             args.station_column, args.time_column, args.count_column)
+        message = f"✅ {path}: {rows} 条记录"
+        if skipped:
+            message += f"，{skipped} 条属于已导入的天，已跳过"
+        if invalid:
+            message += f"，{invalid} 条时间戳为空或格式错误，已丢弃"
+        print(message)
+
+    if not args.keep_open:
+        state.finalize(all_days=True)
+    state.save(args.state)
+    if args.out:
+        state.to_frame().to_csv(args.out, index=False)
+
+    print(f"完成：{len(state.keys)} 条作息曲线，{len(state.done)} 天已汇总，{len(state.pending)} 天未完成")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,75 @@
+# 作息时间自动识别：从平均作息曲线推断作息启动期A/B/C和作息结束期A/B/C
+# 对 N×时间槽数 的矩阵一次向量化计算，可以同时处理整个工作区或一批文件。
+#
+# 方法（爬升阈值）：
+#   - 每条曲线先做滑动平均去掉毛刺，再按自身的最小值、最大值归一化到 [0,1]
+#   - 作息启动期A/B/C：峰值之前第一次达到低/中/高阈值的时间槽（开始爬升、爬升过半、接近峰值）
+#   - 作息结束期A/B/C：峰值之后最后一次不低于高/中/低阈值的时间槽（开始回落、回落过半、接近谷底）
+#   - 平坦的曲线（最大值与最小值相同）无法识别，对应字段留空
+import numpy as np
+
+# 作息时间字段（period-times 中的键），也是 detect_period_indices 结果的列顺序
+PERIOD_KEYS = ['作息启动期A', '作息启动期B', '作息启动期C', '作息结束期A', '作息结束期B', '作息结束期C']
+
+# 低/中/高阈值，对应作息启动期 A/B/C、作息结束期 C/B/A
+DETECT_THRESHOLDS = (0.2, 0.5, 0.8)
+
+# 滑动平均窗口（时间槽数）
+SMOOTH_WINDOW = 3
+
+# 最大值与最小值之差不超过此值时视为平坦曲线
+FLAT_TOLERANCE = 1e-9
+
+
+def empty_period_times():
+    return {key: '' for key in PERIOD_KEYS}
+
+
+# 沿时间轴做居中滑动平均，两端按边界值延拓
+def _smooth(values, window):
+    if window <= 1:
+        return values
+    half = window // 2
+    padded = np.pad(values, ((0, 0), (half, window - 1 - half)), mode='edge')
+    cumsum = np.cumsum(padded, axis=1)
+    cumsum = np.concatenate([np.zeros((len(values), 1)), cumsum], axis=1)
+    return (cumsum[:, window:] - cumsum[:, :-window]) / window
+
+
+# 返回每条曲线的作息时间下标，形状为 N×6（列顺序同 PERIOD_KEYS），无法识别的为 -1
+def detect_period_indices(averages, thresholds=DETECT_THRESHOLDS, window=SMOOTH_WINDOW):
+    averages = np.atleast_2d(np.asarray(averages, dtype=np.float64))
+    n, slots = averages.shape
+    smoothed = _smooth(averages, window)
+    low = smoothed.min(axis=1, keepdims=True)
+    span = smoothed.max(axis=1, keepdims=True) - low
+    # 累加和做滑动平均有舍入误差，平坦曲线的 span 不一定正好为0
+    flat = span[:, 0] <= FLAT_TOLERANCE
+    normalized = (smoothed - low) / np.where(flat[:, None], 1, span)
+    peak = normalized.argmax(axis=1)
+
+    # above[t, i, j]：第 i 条曲线在时间槽 j 是否达到第 t 个阈值
+    slot = np.arange(slots)
+    above = normalized[None, :, :] >= np.asarray(thresholds)[:, None, None]
+    rising = above & (slot[None, None, :] <= peak[None, :, None])
+    falling = above & (slot[None, None, :] >= peak[None, :, None])
+    # 峰值处总是达到所有阈值，所以 rising/falling 每行至少有一个 True
+    starts = rising.argmax(axis=2)
+    # 结束期按阈值从高到低排列，与启动期一样 A <= B <= C
+    ends = (slots - 1 - falling[:, :, ::-1].argmax(axis=2))[::-1]
+
+    indices = np.concatenate([starts.T, ends.T], axis=1)
+    indices[flat] = -1
+    return indices
+
+
+# 作息时间下标转换为时间标签（N×6），无法识别的为空字符串
+def period_labels(indices, times):
+    times = np.asarray(times, dtype=object)
+    return np.where(indices >= 0, times[np.maximum(indices, 0)], '')
+
+
+# 返回每条曲线的作息时间 {字段: 时间标签}，可以直接作为 period-times 或导出的作息时间
+def detect_periods(averages, times, thresholds=DETECT_THRESHOLDS, window=SMOOTH_WINDOW):
+    labels = period_labels(detect_period_indices(averages, thresholds, window), times)
+    return [dict(zip(PERIOD_KEYS, row)) for row in labels.tolist()]
@@ -0,0 +1,161 @@
+# 列式作息曲线库：所有曲线的平均作息保存在一个内存映射的二进制文件中，按 (站点, 日型) 建立索引
+# 库为一个目录：
+#   averages.f64  每条曲线一行（时间槽数个 little-endian float64），只追加不改写
+#   index.json    时间标签、已写入的行数和 [站点, 日型, 行号] 列表
+# 读取时用 np.memmap 映射数据文件，取一条曲线是对映射的零拷贝切片；
+# 追加新曲线只在数据文件末尾写入新行，然后原子替换索引。已有曲线再次追加时索引指向新行，
+# 旧行成为空洞，可以用 compact 重写整理。同一时间只允许一个写入者。
+#
+# 用法示例（导入目录、长表或日志导入状态文件中的曲线）：
+#   python profile_store.py 作息库 data/
+#   python profile_store.py 作息库 作息状态.npz --compact
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+INDEX_FILE = 'index.json'
+DATA_FILE = 'averages.f64'
+_DTYPE = np.dtype('<f8')
+
+
+def is_store(path):
+    return os.path.isfile(os.path.join(path, INDEX_FILE))
+
+
+class ProfileStore:
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, INDEX_FILE), encoding='utf-8') as f:
+            index = json.load(f)
+        self.times = index['times']
+        self.slots = len(self.times)
+        self.n_rows = index['n_rows']
+        self.keys = [(station, day_type) for station, day_type, _ in index['profiles']]
+        self.rows = np.array([row for _, _, row in index['profiles']], dtype=np.int64)
+        self.key_index = {key: i for i, key in enumerate(self.keys)}
+        self._data = None
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key):
+        return tuple(key) in self.key_index
+
+    @classmethod
+    def create(cls, path, times):
+        if is_store(path):
+            raise ValueError(f"作息库已存在: {path}")
+        os.makedirs(path, exist_ok=True)
+        open(os.path.join(path, DATA_FILE), 'wb').close()
+        _write_index(path, list(times), 0, [])
+        return cls(path)
+
+    @classmethod
+    def open_or_create(cls, path, times):
+        if not is_store(path):
+            return cls.create(path, times)
+        store = cls(path)
+        if store.times != list(times):
+            raise ValueError(f"时间槽与作息库不一致: {path}")
+        return store
+
+    # 数据文件的只读内存映射（行数 × 时间槽数），追加后自动重新映射
+    @property
+    def data(self):
+        if self._data is None or len(self._data) != self.n_rows:
+            if self.n_rows == 0:
+                self._data = np.zeros((0, self.slots), dtype=_DTYPE)
+            else:
+                self._data = np.memmap(os.path.join(self.path, DATA_FILE), dtype=_DTYPE, mode='r',
+                                       shape=(self.n_rows, self.slots))
+        return self._data
+
+    # 一条曲线的平均作息（零拷贝，只读）
+    def average(self, station, day_type):
+        return self.data[self.rows[self.key_index[(station, day_type)]]]
+
+    # 全部曲线的平均作息（按索引顺序）；没有空洞时为零拷贝视图
+    def averages(self):
+        if np.array_equal(self.rows, np.arange(len(self.rows))):
+            return self.data[:len(self.rows)]
+        return self.data[self.rows]
+
+    # 追加曲线：keys 为 [(站点, 日型)]，averages 为 N×时间槽数
+    def append(self, keys, averages):
+        keys = [(str(station), str(day_type)) for station, day_type in keys]
+        averages = np.ascontiguousarray(averages, dtype=_DTYPE).reshape(len(keys), self.slots)
+        # 从已提交的行数处写入，上次中断时写了一半的行会被覆盖
+        with open(os.path.join(self.path, DATA_FILE), 'r+b') as f:
+            f.seek(self.n_rows * self.slots * _DTYPE.itemsize)
+            f.write(averages.tobytes())
+            f.truncate()
+            f.flush()
+            os.fsync(f.fileno())
+
+        rows = self.rows.tolist()
+        for offset, key in enumerate(keys):
+            if key in self.key_index:
+                rows[self.key_index[key]] = self.n_rows + offset
+            else:
+                self.key_index[key] = len(self.keys)
+                self.keys.append(key)
+                rows.append(self.n_rows + offset)
+        self.rows = np.array(rows, dtype=np.int64)
+        self.n_rows += len(keys)
+        self._write_index()
+
+    # 去掉被覆盖的旧行，按索引顺序重写数据文件
+    def compact(self):
+        averages = np.array(self.averages())
+        tmp = os.path.join(self.path, f"{DATA_FILE}.tmp")
+        with open(tmp, 'wb') as f:
+            f.write(averages.astype(_DTYPE).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        self._data = None
+        os.replace(tmp, os.path.join(self.path, DATA_FILE))
+        self.rows = np.arange(len(self.keys), dtype=np.int64)
+        self.n_rows = len(self.keys)
+        self._write_index()
+
+    def _write_index(self):
+        profiles = [[station, day_type, int(row)] for (station, day_type), row in zip(self.keys, self.rows)]
+        _write_index(self.path, self.times, self.n_rows, profiles)
+
+
+def _write_index(path, times, n_rows, profiles):
+    tmp = os.path.join(path, f"{INDEX_FILE}.tmp")
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump({'times': times, 'n_rows': n_rows, 'profiles': profiles}, f, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, os.path.join(path, INDEX_FILE))
+
+
+def main(argv=None):
+    # 读取来源依赖 Workspace，而 Workspace 又从作息库读取，所以在这里导入
+    from workspace import Workspace
+
+    parser = argparse.ArgumentParser(description="把作息曲线导入列式作息库")
+    parser.add_argument('store', help="作息库目录，不存在时新建")
+    parser.add_argument('inputs', nargs='+', help="作息曲线目录、长表文件或日志导入状态文件（.npz）")
+    parser.add_argument('--compact', action='store_true', help="导入后整理数据文件")
+    args = parser.parse_args(argv)
+
+    store = None
+    for path in args.inputs:
+        workspace = Workspace.load(path)
+        store = store or ProfileStore.open_or_create(args.store, workspace.times)
+        store.append(workspace.keys, workspace.averages)
+        print(f"✅ {path}: {len(workspace)} 条作息曲线")
+    if args.compact:
+        store.compact()
+    print(f"完成：作息库中共 {len(store)} 条作息曲线")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,149 @@
+# 作息曲线的紧凑列式表示
+# 一条作息曲线由若干个时间槽组成（默认96个15分钟，也可以是分钟级或多天），用定长 float64 数组保存
+# 平均作息和作息方差，上下界由两者向量化计算得到。
+# 序列化为紧凑的二进制（或base64）格式，用于会话存储和传输。
+import base64
+import re
+import struct
+
+import numpy as np
+import pandas as pd
+
+# 二进制格式：魔数、时间槽数、时间标签字节数，随后是时间标签和两个 float64 数组
+_MAGIC = b'ZXP1'
+_HEADER = struct.Struct('<4sII')
+
+_TIME_LABEL = re.compile(r'(\d{1,2}):(\d{2})')
+
+
+# 作息方差模型：作息方差 = 平均作息³ × 系数
+def cube_variance(average, multiplier):
+    return (average ** 3) * multiplier
+
+
+class Profile:
+    __slots__ = ('times', 'average', 'variance', 'upper', 'lower')
+
+    def __init__(self, times, average, variance=None):
+        self.times = list(times)
+        self.average = np.array(average, dtype=np.float64)
+        if variance is None:
+            variance = cube_variance(self.average, 1.0)
+        self.variance = np.array(variance, dtype=np.float64)
+        self.upper = np.empty_like(self.average)
+        self.lower = np.empty_like(self.average)
+        self.recompute_bounds()
+
+    def __len__(self):
+        return len(self.average)
+
+    @classmethod
+    def from_frame(cls, df):
+        variance = df['作息方差'].to_numpy() if '作息方差' in df else None
+        return cls(df['时间'].astype(str), df['平均作息'].to_numpy(), variance)
+
+    @classmethod
+    def from_csv(cls, path):
+        return cls.from_frame(pd.read_csv(path))
+
+    def copy(self):
+        return Profile(self.times, self.average, self.variance)
+
+    # 重新计算上下界；给定 index（单个下标或下标数组）时只更新这些时间点
+    def recompute_bounds(self, index=None):
+        if index is None:
+            np.minimum(self.average + self.variance, 1, out=self.upper)
+            np.maximum(self.average - self.variance, 0, out=self.lower)
+        else:
+            self.upper[index] = np.minimum(self.average[index] + self.variance[index], 1)
+            self.lower[index] = np.maximum(self.average[index] - self.variance[index], 0)
+
+    # 全局调整：按系数重算全部方差；variance_model 为 (平均作息, 系数) -> 作息方差，见 variance_models.py
+    def apply_global(self, multiplier, variance_model=cube_variance):
+        self.variance = np.asarray(variance_model(self.average, multiplier), dtype=np.float64)
+        self.recompute_bounds()
+
+    # 逐个调整：修改单个时间点的方差，O(1)
+    def set_variance(self, index, value):
+        self.variance[index] = value
+        self.recompute_bounds(index)
+
+    # 批量修改多个时间点的方差，结果限制在 [0, 1]（与逐个调整的滑块范围相同），返回去重排序后的下标：
+    #   set     设为 value
+    #   scale   乘以 value
+    #   smooth  替换为以该点为中心、宽度为 value 个时间槽的滑动平均（窗口内未选中的点也参与平均，两端按端点值延伸），
+    #           窗口必须是不小于3的奇数，否则抛出 ValueError（偶数窗口不会悄悄改为 窗口+1）
+    def edit_variance(self, indices, operation, value):
+        indices = np.unique(np.asarray(indices, dtype=np.int64))
+        if operation == 'set':
+            self.variance[indices] = np.clip(value, 0, 1)
+        elif operation == 'scale':
+            self.variance[indices] = np.clip(self.variance[indices] * value, 0, 1)
+        elif operation == 'smooth':
+            if value < 3 or value != int(value) or int(value) % 2 == 0:
+                raise ValueError("平滑窗口必须是不小于3的奇数个时间槽")
+            half = int(value) // 2
+            padded = np.pad(self.variance, half, mode='edge')
+            smoothed = np.convolve(padded, np.full(2 * half + 1, 1 / (2 * half + 1)), mode='valid')
+            self.variance[indices] = smoothed[indices]
+        else:
+            raise ValueError(f"未知的批量修改方式: {operation}")
+        self.recompute_bounds(indices)
+        return indices
+
+    # 批量输入：替换平均作息（长度必须与时间槽数一致）
+    def set_average(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        if values.shape != self.average.shape:
+            raise ValueError(f"需要{len(self.average)}个数值，实际为{values.size}个")
+        self.average = values.copy()
+        self.recompute_bounds()
+
+    def to_frame(self):
+        return pd.DataFrame({
+            '时间': self.times,
+            '平均作息': self.average,
+            '作息方差': self.variance,
+            '作息上界': self.upper,
+            '作息下界': self.lower,
+        })
+
+    def to_bytes(self):
+        times = '\n'.join(self.times).encode('utf-8')
+        return b''.join([
+            _HEADER.pack(_MAGIC, len(self.average), len(times)),
+            times,
+            self.average.tobytes(),
+            self.variance.tobytes(),
+        ])
+
+    @classmethod
+    def from_bytes(cls, payload):
+        magic, n, times_len = _HEADER.unpack_from(payload)
+        if magic != _MAGIC:
+            raise ValueError("无法识别的作息数据格式")
+        offset = _HEADER.size
+        times = payload[offset:offset + times_len].decode('utf-8').split('\n')
+        offset += times_len
+        arrays = np.frombuffer(payload, dtype=np.float64, count=2 * n, offset=offset)
+        return cls(times, arrays[:n], arrays[n:])
+
+    def to_base64(self):
+        return base64.b64encode(self.to_bytes()).decode('ascii')
+
+    @classmethod
+    def from_base64(cls, text):
+        return cls.from_bytes(base64.b64decode(text))
+
+
+# 时间分辨率：从时间标签（格式 H:MM）推断每个时间槽的分钟数，无法推断时按15分钟
+def slot_minutes(times):
+    minutes = []
+    for label in times[:2]:
+        match = _TIME_LABEL.search(str(label))
+        if not match:
+            return 15
+        minutes.append(int(match.group(1)) * 60 + int(match.group(2)))
+    if len(minutes) < 2 or minutes[1] <= minutes[0]:
+        return 15
+    return minutes[1] - minutes[0]
@@ -0,0 +1,97 @@
+# 服务器端会话存储
+# 浏览器的 data-store 只保存会话键和版本号，
+# 作息数据本身保存在本地 SQLite 文件中，多个 gunicorn 工作进程共享同一个文件。
+# 淘汰策略：超过 TTL 未访问的会话删除；会话总数超过上限时按最近访问时间（LRU）删除。
+import os
+import tempfile
+import time
+import uuid
+
+from sqlite_backend import LocalSqlite
+
+DEFAULT_DB_PATH = os.environ.get(
+    'SESSION_DB_PATH', os.path.join(tempfile.gettempdir(), 'zuoxi_sessions.sqlite3'))
+DEFAULT_TTL = int(os.environ.get('SESSION_TTL', 2 * 3600))
+DEFAULT_MAX_ENTRIES = int(os.environ.get('SESSION_MAX_ENTRIES', 1000))
+
+# 最近访问时间的精度（秒）：读取时只有距上次记录超过这个时间才更新，避免每次读取都写数据库
+ACCESS_RESOLUTION_SECONDS = 60
+
+_SCHEMA = [
+    'CREATE TABLE IF NOT EXISTS sessions ('
+    'key TEXT PRIMARY KEY, version INTEGER NOT NULL, '
+    'payload BLOB NOT NULL, accessed REAL NOT NULL)',
+    'CREATE INDEX IF NOT EXISTS sessions_accessed ON sessions (accessed)',
+]
+
+
+class SessionStore:
+    def __init__(self, path=DEFAULT_DB_PATH, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._db = LocalSqlite(path, _SCHEMA)
+
+    def _connect(self):
+        return self._db.connect()
+
+    # 生成新的会话键
+    @staticmethod
+    def new_key():
+        return uuid.uuid4().hex
+
+    # 读取会话数据，不存在或已过期时返回 None
+    def load(self, key):
+        conn = self._connect()
+        now = time.time()
+        row = conn.execute('SELECT payload, accessed FROM sessions WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        payload, accessed = row
+        if now - accessed > self.ttl:
+            conn.execute('DELETE FROM sessions WHERE key = ?', (key,))
+            return None
+        if now - accessed > ACCESS_RESOLUTION_SECONDS:
+            conn.execute('UPDATE sessions SET accessed = ? WHERE key = ?', (now, key))
+        return payload
+
+    # 批量读取多个会话数据，返回 {key: payload}，不存在或已过期的键不包含在结果中
+    def load_many(self, keys):
+        conn = self._connect()
+        min_accessed = time.time() - self.ttl
+        result = {}
+        keys = list(keys)
+        # SQLite 单条语句的参数个数有限，分批查询
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            placeholders = ','.join('?' * len(batch))
+            rows = conn.execute(
+                f'SELECT key, payload FROM sessions WHERE key IN ({placeholders}) AND accessed >= ?',
+                (*batch, min_accessed))
+            result.update(rows)
+        return result
+
+    # 写回会话数据（不存在时新建），返回新的版本号：大于已保存的版本号和 min_version。
+    # 浏览器传回它看到的版本号作为 min_version，会话数据被淘汰后重新保存时版本号也不会回到1
+    def save(self, key, payload, min_version=0):
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT version FROM sessions WHERE key = ?', (key,)).fetchone()
+            version = max(row[0] if row else 0, min_version) + 1
+            conn.execute('INSERT OR REPLACE INTO sessions (key, version, payload, accessed) VALUES (?, ?, ?, ?)',
+                         (key, version, payload, time.time()))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        if row is None:
+            self._evict(conn)
+        return version
+
+    def _evict(self, conn):
+        conn.execute('DELETE FROM sessions WHERE accessed < ?', (time.time() - self.ttl,))
+        conn.execute(
+            'DELETE FROM sessions WHERE key IN ('
+            'SELECT key FROM sessions ORDER BY accessed DESC LIMIT -1 OFFSET ?)',
+            (self.max_entries,))
@@ -0,0 +1,212 @@
+# 蒙特卡洛模拟：按每条作息曲线的平均作息和作息方差生成大量模拟的一天，统计各时间槽的分位数和峰值超限概率
+# 每个时间槽服从 正态(平均作息, 标准差)，截断到 [0, 1]；相邻时间槽相关（相关系数 correlation^时间槽间隔），
+# 即 AR(1)：z[t] = correlation * z[t-1] + sqrt(1 - correlation²) * e[t]，按时间槽递推，每步对整块样本做一次向量运算，
+# 耗时和内存与时间槽数成正比（分钟级、多天的曲线也适用）。
+# 样本按块（chunk 个）生成，每块只累加到直方图（各时间槽的取值、每天的峰值，BINS 个区间）后丢弃，
+# 内存占用与样本数无关；直方图可以直接相加，所以各块可以分给进程池并行计算再合并。
+# 分位数和超限概率由直方图读取，精度为 1/BINS。
+#
+# 标准差的取法（spread）：
+#   band      作息方差即标准差，与图2的 作息上界/作息下界（平均作息 ± 作息方差，见 Profile.recompute_bounds）一致，
+#             上下界约为模拟的 P16/P84（默认）
+#   variance  作息方差按统计意义上的方差，标准差为其平方根（作息方差小于1时比上下界宽）
+#
+# 用法示例（批量，对多条曲线）：
+#   python simulation.py 作息库/ -o 模拟结果.csv --samples 100000 --capacity 0.9 --workers 8
+#   python simulation.py data/*.csv -o 模拟结果.csv --multiplier 1.5
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+BINS = 1000
+DEFAULT_SAMPLES = 10000
+DEFAULT_CHUNK = 10000
+DEFAULT_CORRELATION = 0.8
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+
+# 标准差的取法 -> 说明
+SPREADS = {
+    'band': "作息方差作为标准差（上下界为 ±1 个标准差）",
+    'variance': "作息方差作为方差（标准差为其平方根）",
+}
+DEFAULT_SPREAD = 'band'
+
+
+class SimulationResult:
+    def __init__(self, n_slots, bins=BINS):
+        self.bins = bins
+        self.samples = 0
+        self.slot_counts = np.zeros((n_slots, bins), dtype=np.int64)
+        self.peak_counts = np.zeros(bins, dtype=np.int64)
+
+    def add(self, draws):
+        n_samples, n_slots = draws.shape
+        binned = np.minimum((draws * self.bins).astype(np.int64), self.bins - 1)
+        offsets = np.arange(n_slots) * self.bins
+        self.slot_counts += np.bincount((binned + offsets).ravel(),
+                                        minlength=n_slots * self.bins).reshape(n_slots, self.bins)
+        self.peak_counts += np.bincount(binned.max(axis=1), minlength=self.bins)
+        self.samples += n_samples
+
+    def merge(self, other):
+        self.slot_counts += other.slot_counts
+        self.peak_counts += other.peak_counts
+        self.samples += other.samples
+        return self
+
+    # 各时间槽的分位数（百分位 × 时间槽数），取所在区间的中点
+    def percentiles(self, qs=DEFAULT_PERCENTILES):
+        cumulative = np.cumsum(self.slot_counts, axis=1)
+        targets = np.asarray(qs, dtype=np.float64) / 100 * self.samples
+        # 累计个数首次达到目标的区间
+        bins = (cumulative[None, :, :] < targets[:, None, None]).sum(axis=2)
+        return (np.minimum(bins, self.bins - 1) + 0.5) / self.bins
+
+    # 每天峰值超过 threshold 的概率
+    def peak_exceedance(self, threshold):
+        return self.peak_counts[self._first_bin_above(threshold):].sum() / self.samples
+
+    # 各时间槽超过 threshold 的概率
+    def slot_exceedance(self, threshold):
+        return self.slot_counts[:, self._first_bin_above(threshold):].sum(axis=1) / self.samples
+
+    def _first_bin_above(self, threshold):
+        return min(max(int(np.floor(threshold * self.bins)), 0), self.bins)
+
+
+# 相邻时间槽相关的标准正态，形状为 (n_samples, n_slots)
+def correlated_normals(rng, n_samples, n_slots, correlation=DEFAULT_CORRELATION):
+    # 按 (时间槽, 样本) 生成，递推时每一步访问连续的内存
+    normals = rng.standard_normal((n_slots, n_samples), dtype=np.float32)
+    normals[1:] *= np.float32(np.sqrt(1 - correlation ** 2))
+    for t in range(1, n_slots):
+        normals[t] += np.float32(correlation) * normals[t - 1]
+    return normals.T
+
+
+# 各时间槽的标准差
+def slot_std(variance, spread=DEFAULT_SPREAD):
+    if spread not in SPREADS:
+        raise ValueError(f"不支持的标准差取法: {spread}")
+    variance = np.maximum(np.asarray(variance, dtype=np.float32), 0)
+    return variance if spread == 'band' else np.sqrt(variance)
+
+
+# 生成 n_samples 个模拟的一天并累加到结果中
+def simulate_chunk(average, variance, n_samples, correlation, seed, bins=BINS, spread=DEFAULT_SPREAD):
+    rng = np.random.default_rng(seed)
+    result = SimulationResult(len(average), bins)
+    mean = np.asarray(average, dtype=np.float32)
+    std = slot_std(variance, spread)
+    draws = correlated_normals(rng, n_samples, len(average), correlation)
+    draws *= std
+    draws += mean
+    np.clip(draws, 0, 1, out=draws)
+    result.add(draws)
+    return result
+
+
+def _chunk_task(task):
+    return simulate_chunk(*task)
+
+
+def _chunk_sizes(samples, chunk):
+    return [min(chunk, samples - start) for start in range(0, samples, chunk)]
+
+
+# 模拟一条曲线；seed 为整数或 SeedSequence，workers 大于 1 时各块分给进程池，spread 见 SPREADS
+def simulate(average, variance, samples=DEFAULT_SAMPLES, correlation=DEFAULT_CORRELATION, seed=0,
+             chunk=DEFAULT_CHUNK, workers=1, bins=BINS, spread=DEFAULT_SPREAD):
+    sizes = _chunk_sizes(samples, chunk)
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    seeds = seed.spawn(len(sizes))
+    tasks = [(average, variance, size, correlation, chunk_seed, bins, spread) for size, chunk_seed in zip(sizes, seeds)]
+    result = SimulationResult(len(average), bins)
+    if workers == 1 or len(tasks) == 1:
+        for part in map(_chunk_task, tasks):
+            result.merge(part)
+        return result
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for part in executor.map(_chunk_task, tasks):
+            result.merge(part)
+    return result
+
+
+# 一条曲线的汇总：各百分位的最大值、峰值超限概率、超限概率最高的时间槽
+def summarize(result, times, capacity, qs=DEFAULT_PERCENTILES):
+    percentiles = result.percentiles(qs)
+    slot_exceedance = result.slot_exceedance(capacity)
+    worst = int(np.argmax(slot_exceedance))
+    summary = {f"P{q}峰值": round(float(values.max()), 4) for q, values in zip(qs, percentiles)}
+    summary.update({
+        '峰值超限概率': round(float(result.peak_exceedance(capacity)), 6),
+        '最易超限时间': times[worst],
+        '该时间超限概率': round(float(slot_exceedance[worst]), 6),
+    })
+    return summary
+
+
+def _profile_task(task):
+    label, times, average, variance, samples, correlation, seed, chunk, capacity, spread = task
+    result = simulate(average, variance, samples, correlation, seed, chunk, spread=spread)
+    return dict(曲线=label, **summarize(result, times, capacity))
+
+
+# 批量模拟多条曲线：profiles 为 [(名称, Profile)]，按曲线分给进程池，逐条返回汇总
+def simulate_many(profiles, samples=DEFAULT_SAMPLES, capacity=0.9, correlation=DEFAULT_CORRELATION, seed=0,
+                  chunk=DEFAULT_CHUNK, workers=None, spread=DEFAULT_SPREAD):
+    seeds = np.random.SeedSequence(seed).spawn(len(profiles))
+    tasks = [(label, profile.times, profile.average, profile.variance, samples, correlation, profile_seed, chunk,
+              capacity, spread) for (label, profile), profile_seed in zip(profiles, seeds)]
+    if workers == 1:
+        yield from map(_profile_task, tasks)
+        return
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(_profile_task, tasks, chunksize=max(1, len(tasks) // (workers * 4)))
+
+
+def main(argv=None):
+    # 读取输入与 batch.py 相同（作息CSV、目录、通配符或列式作息库）
+    from batch import expand_inputs, input_stem, load_input
+
+    parser = argparse.ArgumentParser(description="按作息方差对多条作息曲线做蒙特卡洛模拟")
+    parser.add_argument('inputs', nargs='+', help="作息CSV文件、目录、通配符或列式作息库")
+    parser.add_argument('-o', '--out', default='模拟结果.csv', help="汇总输出文件（默认 模拟结果.csv）")
+    parser.add_argument('--samples', type=int, default=DEFAULT_SAMPLES, help=f"每条曲线的样本数（默认{DEFAULT_SAMPLES}）")
+    parser.add_argument('--capacity', type=float, default=0.9, help="容量阈值，统计超过该值的概率（默认0.9）")
+    parser.add_argument('--multiplier', type=float, default=1.0, help="作息方差调整系数（默认1.0）")
+    parser.add_argument('--correlation', type=float, default=DEFAULT_CORRELATION,
+                        help=f"相邻时间槽的相关系数（默认{DEFAULT_CORRELATION}）")
+    parser.add_argument('--spread', choices=list(SPREADS), default=DEFAULT_SPREAD,
+                        help="标准差的取法：" + "；".join(f"{name} {title}" for name, title in SPREADS.items()))
+    parser.add_argument('--seed', type=int, default=0, help="随机种子")
+    parser.add_argument('--workers', type=int, default=None, help="进程数（默认为CPU核数）")
+    args = parser.parse_args(argv)
+
+    paths = expand_inputs(args.inputs)
+    if not paths:
+        parser.error("没有找到输入文件")
+    profiles = []
+    for path in paths:
+        profile = load_input(path)
+        profile.apply_global(args.multiplier)
+        profiles.append((input_stem(path), profile))
+
+    rows = []
+    for row in simulate_many(profiles, args.samples, args.capacity, args.correlation, args.seed,
+                             workers=args.workers, spread=args.spread):
+        rows.append(row)
+        print(f"✅ {row['曲线']}: 峰值超限概率 {row['峰值超限概率']:.4f}")
+    pd.DataFrame(rows).to_csv(args.out, index=False)
+    print(f"完成：{len(rows)} 条曲线 -> {args.out}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
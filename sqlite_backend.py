@@ -0,0 +1,26 @@
+# 本地 SQLite 连接管理：会话存储和计算缓存共用
+# sqlite 连接不能跨线程和 fork 共享，每个线程（以及 fork 后的每个工作进程）懒加载自己的连接；
+# 使用 WAL 模式，多个 gunicorn 工作进程可以同时读写同一个文件。
+import os
+import sqlite3
+import threading
+
+
+class LocalSqlite:
+    def __init__(self, path, schema):
+        self.path = path
+        self.schema = list(schema)
+        self._local = threading.local()
+
+    def connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        for statement in self.schema:
+            conn.execute(statement)
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
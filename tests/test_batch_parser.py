@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from batch_parser import parse_batch_text
+
+
+def test_separators_and_non_numeric_tokens():
+    text = "时间,平均作息\n0:00, 0.1\n0:15\t0.2\n0:30 0.3"
+    result = parse_batch_text(text, slots=3)
+    np.testing.assert_array_equal(result.values, [[0.1, 0.2, 0.3]])
+    assert result.ignored == 5
+    assert (result.padded, result.truncated, result.rejected) == (0, 0, [])
+
+
+def test_rejected_positions_keep_slots():
+    values = ['0.1'] * 8
+    values[2] = '1.5'
+    values[6] = '-0.2'
+    result = parse_batch_text(' '.join(values), slots=4)
+    assert result.rejected == [(0, 2, '1.5'), (1, 2, '-0.2')]
+    assert result.values[0, 2] == 0 and result.values[1, 2] == 0
+    assert result.values[0, 3] == 0.1
+
+
+def test_row_layout_splits_exact_multiples():
+    result = parse_batch_text(' '.join(str(i / 10) for i in range(6)), slots=3)
+    np.testing.assert_array_equal(result.values, [[0.0, 0.1, 0.2], [0.3, 0.4, 0.5]])
+
+
+def test_column_layout_one_profile_per_column():
+    rows = [f"{i / 10}\t{i / 100}" for i in range(4)]
+    result = parse_batch_text('\n'.join(rows), slots=4)
+    np.testing.assert_array_equal(result.values, [[0.0, 0.1, 0.2, 0.3], [0.0, 0.01, 0.02, 0.03]])
+
+
+def test_not_a_multiple_keeps_one_profile():
+    result = parse_batch_text(' '.join(['0.5'] * 5), slots=4)
+    assert result.values.shape == (1, 4)
+    assert (result.truncated, result.padded) == (1, 0)
+
+    result = parse_batch_text('0.5 0.5', slots=4)
+    np.testing.assert_array_equal(result.values, [[0.5, 0.5, 0.0, 0.0]])
+    assert (result.truncated, result.padded) == (0, 2)
+
+
+def test_rejected_values_beyond_the_profile_are_not_reported():
+    result = parse_batch_text('0.1 0.2 0.3 0.4 7', slots=4)
+    assert result.rejected == []
+    assert result.truncated == 1
+
+
+def test_no_numbers():
+    result = parse_batch_text('abc, def', slots=4)
+    assert result.values.shape == (0, 4)
+    assert result.ignored == 2
+
+
+def test_column_layout_keeps_missing_cells_in_place():
+    rows = [f"{i / 10}\t{i / 100}" for i in range(4)]
+    rows[1] = "\t0.01"
+    rows[2] = "0.2\tN/A"
+    result = parse_batch_text('时间\t站点1\t站点2\n' + '\n'.join(f"{i}:00\t{row}" for i, row in enumerate(rows)), slots=4)
+    np.testing.assert_array_equal(result.values, [[0.0, 0.0, 0.2, 0.3], [0.0, 0.01, 0.0, 0.03]])
+    assert result.rejected == [(0, 1, ''), (1, 2, 'N/A')]
+    assert result.ignored == 7
+
+
+def test_ambiguous_table_with_missing_cells_is_refused():
+    with pytest.raises(ValueError):
+        parse_batch_text("0.1\t0.2\n\t0.4\n0.5\t0.6", slots=4)
@@ -0,0 +1,32 @@
+import numpy as np
+
+from downsample import lttb_indices
+
+
+def test_keeps_all_points_below_threshold():
+    np.testing.assert_array_equal(lttb_indices(np.arange(10), 20), np.arange(10))
+    np.testing.assert_array_equal(lttb_indices(np.arange(10), 2), np.arange(10))
+
+
+def test_selects_threshold_sorted_points_with_both_ends():
+    y = np.random.default_rng(0).random(5000)
+    indices = lttb_indices(y, 500)
+    assert len(indices) == 500
+    assert indices[0] == 0 and indices[-1] == len(y) - 1
+    assert (np.diff(indices) > 0).all()
+
+
+def test_keeps_spikes():
+    y = np.zeros(4000)
+    y[[1234, 2999]] = 1.0
+    y[777] = -1.0
+    indices = lttb_indices(y, 100)
+    assert {777, 1234, 2999} <= set(indices.tolist())
+
+
+def test_one_point_per_bucket():
+    n, threshold = 1000, 52
+    indices = lttb_indices(np.sin(np.arange(n) / 30), threshold)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    buckets = np.searchsorted(edges, indices[1:-1], side='right') - 1
+    np.testing.assert_array_equal(buckets, np.arange(threshold - 2))
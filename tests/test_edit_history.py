@@ -0,0 +1,133 @@
+import numpy as np
+import pytest
+
+from edit_history import EditHistory, apply_delta, diff
+from schedule_profile import Profile
+
+TIMES = [f"{m // 60}:{m % 60:02d}" for m in range(0, 1440, 15)]
+ROW = 'session:341-工作日'
+
+
+def make_profile(rng):
+    return Profile(TIMES, rng.random(96), rng.random(96) * 0.2)
+
+
+def assert_same(a, b):
+    for column in ('average', 'variance', 'upper', 'lower'):
+        np.testing.assert_array_equal(getattr(a, column), getattr(b, column))
+
+
+# 依次做 n 次修改（单点、批量、整列方差、平均作息），返回各步的曲线（第0步为初始曲线）
+def record_edits(history, rng, n, row=ROW):
+    versions = [make_profile(rng)]
+    for step in range(n):
+        after = versions[-1].copy()
+        kind = step % 4
+        if kind == 0:
+            after.set_variance(int(rng.integers(96)), float(rng.random()))
+        elif kind == 1:
+            after.edit_variance(rng.choice(96, 5, replace=False), 'scale', 1.5)
+        elif kind == 2:
+            after.apply_global(float(rng.uniform(0.5, 2)))
+        else:
+            after.set_average(rng.random(96))
+        history.record(row, versions[-1], after)
+        versions.append(after)
+    return versions
+
+
+@pytest.fixture
+def history(tmp_path):
+    return EditHistory(str(tmp_path / 'history.sqlite3'), ttl=3600, max_entries=10, max_steps=10,
+                       snapshot_interval=4)
+
+
+def test_diff_round_trip():
+    rng = np.random.default_rng(0)
+    before = make_profile(rng)
+    after = before.copy()
+    after.set_variance(3, 0.5)
+    after.set_variance(40, 0.25)
+    delta = diff(before, after)
+
+    restored = before.copy()
+    assert apply_delta(restored, delta) == [3, 40]
+    assert_same(restored, after)
+    assert apply_delta(restored, delta, undo=True) == [3, 40]
+    assert_same(restored, before)
+
+
+def test_diff_full_column_and_no_change():
+    rng = np.random.default_rng(1)
+    before = make_profile(rng)
+    assert diff(before, before.copy()) is None
+
+    after = before.copy()
+    after.apply_global(2.0)
+    restored = before.copy()
+    assert apply_delta(restored, diff(before, after)) is None
+    assert_same(restored, after)
+
+
+def test_undo_redo_across_trim(history):
+    rng = np.random.default_rng(2)
+    versions = record_edits(history, rng, 23)
+    undo, redo = history.counts(ROW)
+    # 超过 max_steps 后按快照边界删除：保留第 (23 - undo) 步之后的记录
+    assert redo == 0
+    assert 10 <= undo < 10 + 4
+    oldest = len(versions) - 1 - undo
+
+    profile = versions[-1].copy()
+    for seq in range(len(versions) - 2, oldest - 1, -1):
+        assert history.undo(ROW, profile) is not False
+        assert_same(profile, versions[seq])
+    assert history.undo(ROW, profile) is False
+    assert history.counts(ROW) == (0, undo)
+
+    for seq in range(oldest + 1, len(versions)):
+        assert history.redo(ROW, profile) is not False
+        assert_same(profile, versions[seq])
+    assert history.redo(ROW, profile) is False
+
+
+def test_record_after_undo_drops_redo(history):
+    rng = np.random.default_rng(3)
+    versions = record_edits(history, rng, 5)
+    profile = versions[-1].copy()
+    history.undo(ROW, profile)
+    history.undo(ROW, profile)
+    edited = profile.copy()
+    edited.set_variance(0, 0.9)
+    history.record(ROW, profile, edited)
+    assert history.counts(ROW) == (4, 0)
+    assert_same(history.restore(ROW), edited)
+
+
+def test_restore_matches_replay(history):
+    rng = np.random.default_rng(4)
+    versions = record_edits(history, rng, 23)
+    undo, _ = history.counts(ROW)
+    oldest = len(versions) - 1 - undo
+    for seq in range(oldest, len(versions)):
+        assert_same(history.restore(ROW, seq), versions[seq])
+    assert_same(history.restore(ROW), versions[-1])
+
+    # 恢复到撤销后的当前步
+    profile = versions[-1].copy()
+    for _ in range(3):
+        history.undo(ROW, profile)
+    assert_same(history.restore(ROW), versions[-4])
+
+
+def test_restore_after_eviction(history):
+    rng = np.random.default_rng(5)
+    versions = {}
+    for i in range(12):
+        versions[i] = record_edits(history, rng, 2, row=f'session-{i}:341-工作日')
+    # max_entries=10：最早的两个会话的历史被整段删除，之后的仍可恢复
+    for i in (0, 1):
+        assert history.restore(f'session-{i}:341-工作日') is None
+        assert history.counts(f'session-{i}:341-工作日') == (0, 0)
+    for i in range(2, 12):
+        assert_same(history.restore(f'session-{i}:341-工作日'), versions[i][-1])
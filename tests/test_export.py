@@ -0,0 +1,79 @@
+import importlib
+import io
+import os
+import sys
+import zipfile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from exporter import stream_export
+from period_detection import PERIOD_KEYS, detect_periods
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TIMES = [f"{m // 60}:{m % 60:02d}" for m in range(0, 1440, 15)]
+
+
+# 用 600 条曲线的工作区导入应用（导出按每块 256 条曲线生成）
+@pytest.fixture(scope='module')
+def app_module(tmp_path_factory):
+    path = tmp_path_factory.mktemp('workspace') / '作息长表.csv'
+    rng = np.random.default_rng(0)
+    stations = np.repeat([f"{i:03d}" for i in range(300)], 2 * len(TIMES))
+    day_types = np.tile(np.repeat(['工作日', '周末'], len(TIMES)), 300)
+    pd.DataFrame({'站点': stations, '日型': day_types, '时间': np.tile(TIMES, 600),
+                  '平均作息': rng.random(600 * len(TIMES)).round(3)}).to_csv(path, index=False)
+    environ = dict(os.environ)
+    cwd = os.getcwd()
+    os.environ['WORKSPACE_PATH'] = str(path)
+    os.chdir(ROOT)
+    try:
+        sys.modules.pop('app', None)
+        yield importlib.import_module('app')
+    finally:
+        sys.modules.pop('app', None)
+        os.chdir(cwd)
+        os.environ.clear()
+        os.environ.update(environ)
+
+
+@pytest.mark.parametrize('fmt', ['csv', 'zip'])
+def test_export_all_is_streamed(app_module, monkeypatch, fmt):
+    workspace = app_module.workspace
+    built = []
+    long_frame = workspace._long_frame
+    monkeypatch.setattr(workspace, '_long_frame', lambda *args: built.append(1) or long_frame(*args))
+
+    response = app_module.app.server.test_client().get(f'/export/all?format={fmt}', buffered=False)
+    assert response.status_code == 200
+    # 开始读取响应之前（包括 after_request 钩子）最多生成第一块（测试客户端会预先取出第一块）
+    assert len(built) <= 1
+    body = iter(response.response)
+    next(body)
+    assert len(built) == 1
+    for _ in body:
+        pass
+    assert len(built) == 3
+    response.close()
+
+
+def test_bulk_export_has_detected_periods(app_module):
+    workspace = app_module.workspace
+    frames = list(workspace.iter_frames(1.0, chunk=256))
+    expected = detect_periods(workspace.averages, workspace.times)
+    frame = frames[1]
+    for i in (0, 255):
+        label = f"{frame['站点'].iloc[i * len(TIMES)]}-{frame['日型'].iloc[i * len(TIMES)]}"
+        rows = frame.iloc[i * len(TIMES):(i + 1) * len(TIMES)]
+        periods = expected[workspace.index[label]]
+        for key in PERIOD_KEYS:
+            assert (rows[key] == periods[key]).all()
+
+    archive = zipfile.ZipFile(io.BytesIO(b''.join(stream_export(iter(frames[:1]), 'zip'))))
+    lines = archive.read(f"{workspace.labels[0]}.csv").decode('utf-8-sig').splitlines()
+    periods = expected[0]
+    assert lines[0].endswith(',作息启动期,作息启动期A,作息启动期B,作息启动期C')
+    assert lines[1].endswith(','.join(['作息启动期', *(periods[key] for key in PERIOD_KEYS[:3])]))
+    assert lines[2].endswith(','.join(['作息结束期', *(periods[key] for key in PERIOD_KEYS[3:])]))
+    assert lines[3].endswith(',,,,')
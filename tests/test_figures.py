@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+
+from figures import FigureTemplates
+from schedule_profile import Profile
+
+N_SLOTS = 5000
+
+
+def date(slot):
+    return str(pd.Timestamp(slot * 60 * 1000, unit='ms'))
+
+
+TIMES = [str(i) for i in range(N_SLOTS)]
+
+
+def make_templates():
+    return FigureTemplates(TIMES, minutes=1, max_points=200)
+
+
+def test_box_selection_includes_hidden_slots():
+    templates = make_templates()
+    average = np.full(N_SLOTS, 0.5)
+    figure = templates.graph1_figure(Profile(TIMES, average, average / 10), '341')
+    drawn = set(figure['data'][0]['customdata'].tolist())
+    selected = {'points': [{'customdata': i} for i in drawn if 1000 <= i <= 1999],
+                'range': {'x': [date(1999.5), date(999.5)], 'y': [0.4, 0.6]}}
+    slots = templates.selected_slots(selected, [average, average / 10])
+    np.testing.assert_array_equal(slots, np.arange(1000, 2000))
+    assert len(drawn & set(slots.tolist())) < len(slots)
+
+
+def test_box_selection_checks_every_trace():
+    templates = make_templates()
+    average = np.full(N_SLOTS, 0.5)
+    variance = np.full(N_SLOTS, 0.05)
+    variance[100:110] = 0.9
+    selected = {'range': {'x': [0, 199.5 * 60 * 1000], 'y': [0.8, 1.0]}}
+    np.testing.assert_array_equal(templates.selected_slots(selected, [average, variance]), np.arange(100, 110))
+
+
+def test_lasso_selection():
+    templates = make_templates()
+    average = np.linspace(0, 1, N_SLOTS)
+    # 三角形：x 从第0到第4000个时间槽，斜边以下
+    selected = {'lassoPoints': {'x': [date(-0.5), date(4000.5), date(4000.5)], 'y': [-0.1, -0.1, 0.9]}}
+    slots = templates.selected_slots(selected, [average])
+    x = np.arange(N_SLOTS)
+    expected = np.flatnonzero((x <= 4000) & (average < -0.1 + (x + 0.5) / 4001))
+    np.testing.assert_array_equal(slots, expected)
+
+
+def test_points_without_a_selection_area():
+    templates = make_templates()
+    selected = {'points': [{'customdata': 7}, {'customdata': 3}, {'customdata': 7}, {}]}
+    assert templates.selected_slots(selected, [np.zeros(N_SLOTS)]).tolist() == [3, 7]
+
+
+def test_window_from_relayout():
+    templates = make_templates()
+    window = templates.window_from_relayout({'xaxis.range[0]': date(100), 'xaxis.range[1]': 60 * 1000 * 300})
+    assert window == [100, 300]
+    assert templates.window_from_relayout({'xaxis.range': [date(10), date(20)]}, window) == [10, 20]
+    assert templates.window_from_relayout({'xaxis.autorange': True}, window) is None
+
+
+def test_relayout_without_x_range_keeps_window():
+    templates = make_templates()
+    window = [100, 300]
+    for relayout in ({'dragmode': 'pan'}, {'yaxis.range[0]': 0.2, 'yaxis.range[1]': 0.6}, {'autosize': True}, None):
+        assert templates.window_from_relayout(relayout, window) == window
+    assert templates.window_from_relayout({'dragmode': 'lasso'}) is None
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+
+from ingest import IngestState, ingest_file
+
+
+def test_chunked_welford_merge_matches_numpy():
+    rng = np.random.default_rng(0)
+    days = rng.random((40, 96))
+    rows = np.zeros(40, dtype=np.int64)
+    state = IngestState()
+    state._key_rows([('341', '工作日')])
+    for start in range(0, 40, 7):
+        state._merge(rows[start:start + 7], days[start:start + 7])
+    assert state.count.tolist() == [40]
+    np.testing.assert_allclose(state.mean[0], days.mean(axis=0))
+    np.testing.assert_allclose(state.variance[0], np.var(days, axis=0, ddof=1))
+
+
+def test_merge_several_keys_in_one_batch():
+    rng = np.random.default_rng(1)
+    days = rng.random((30, 96))
+    rows = rng.integers(0, 3, 30)
+    state = IngestState()
+    state._key_rows([('341', '工作日'), ('341', '周末'), ('342', '工作日')])
+    state._merge(rows[:12], days[:12])
+    state._merge(rows[12:], days[12:])
+    for row in range(3):
+        expected = days[rows == row]
+        np.testing.assert_allclose(state.mean[row], expected.mean(axis=0))
+        np.testing.assert_allclose(state.variance[row], np.var(expected, axis=0, ddof=1))
+
+
+def test_single_observation_has_no_variance():
+    state = IngestState()
+    state._key_rows([('341', '工作日')])
+    state._merge(np.array([0]), np.full((1, 96), 0.5))
+    assert np.isnan(state.variance).all()
+
+
+def test_blank_and_malformed_timestamps_are_dropped(tmp_path):
+    path = tmp_path / 'log.csv'
+    pd.DataFrame({
+        '站点': ['341'] * 5,
+        '时间': ['2024-06-03 08:00', '', 'not a time', '2024-06-03 09:15', '2024-06-04 08:00'],
+        '客流': [5, 3, 2, 10, 4],
+    }).to_csv(path, index=False)
+    state = IngestState()
+    rows, skipped, invalid = ingest_file(state, str(path))
+    state.finalize(all_days=True)
+    assert (rows, skipped, invalid) == (5, 0, 2)
+    assert state.count.tolist() == [2]
+    times = state.times
+    assert state.mean[0, times.index('8:00')] == 0.75
+    assert state.mean[0, times.index('9:15')] == 0.5
+
+
+def test_reimporting_a_day_is_skipped(tmp_path):
+    path = tmp_path / 'log.csv'
+    pd.DataFrame({'站点': ['341', '341'], '时间': ['2024-06-03 08:00', '2024-06-03 08:20']}).to_csv(path, index=False)
+    state = IngestState()
+    ingest_file(state, str(path))
+    state.finalize(all_days=True)
+    _, skipped, _ = ingest_file(state, str(path))
+    assert skipped == 2
+    assert state.count.tolist() == [1]
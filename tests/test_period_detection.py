@@ -0,0 +1,20 @@
+import numpy as np
+
+from exporter import PERIOD_KEYS
+from period_detection import detect_period_indices
+
+
+def test_start_and_end_periods_run_a_to_c():
+    slot = np.arange(96)
+    # 8:00 开始爬升、12:00 到达峰值、18:00 开始回落、22:00 回到谷底
+    averages = np.interp(slot, [0, 32, 48, 72, 88, 95], [0, 0, 1, 1, 0, 0])
+    indices = dict(zip(PERIOD_KEYS, detect_period_indices(averages)[0]))
+    starts = [indices[f'作息启动期{c}'] for c in 'ABC']
+    ends = [indices[f'作息结束期{c}'] for c in 'ABC']
+    assert starts == sorted(starts) and ends == sorted(ends)
+    # 结束期A 为开始回落（高阈值），结束期C 为接近谷底（低阈值）
+    assert 72 <= ends[0] < ends[1] < ends[2] < 88
+
+
+def test_flat_profile_is_not_detected():
+    assert (detect_period_indices(np.full((2, 96), 0.4)) == -1).all()
@@ -0,0 +1,77 @@
+import importlib
+import json
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SLOT_MS = 15 * 60 * 1000
+
+
+# 每条轨迹最多 40 个点，96 个时间槽的曲线按降采样显示
+@pytest.fixture(scope='module')
+def client():
+    environ = dict(os.environ)
+    cwd = os.getcwd()
+    os.environ['MAX_PLOT_POINTS'] = '40'
+    os.chdir(ROOT)
+    try:
+        for name in ('app', 'figures'):
+            sys.modules.pop(name, None)
+        yield importlib.import_module('app').app.server.test_client()
+    finally:
+        for name in ('app', 'figures'):
+            sys.modules.pop(name, None)
+        os.chdir(cwd)
+        os.environ.clear()
+        os.environ.update(environ)
+
+
+# 触发图1的渲染回调，返回 (状态码, 图, graph1-rendered)
+def render(client, changed, data, relayout, rendered):
+    body = {
+        'output': '..graph1.figure...graph1-rendered.data..',
+        'outputs': [{'id': 'graph1', 'property': 'figure'}, {'id': 'graph1-rendered', 'property': 'data'}],
+        'inputs': [{'id': 'data-store', 'property': 'data', 'value': data},
+                   {'id': 'graph-tabs', 'property': 'value', 'value': 'graph1'},
+                   {'id': 'graph1', 'property': 'relayoutData', 'value': relayout}],
+        'state': [{'id': 'graph1-rendered', 'property': 'data', 'value': rendered}],
+        'changedPropIds': [changed],
+    }
+    response = client.post('/_dash-update-component', json=body)
+    if response.status_code != 200:
+        return response.status_code, None, None
+    outputs = json.loads(response.data)['response']
+    return 200, outputs['graph1'].get('figure'), outputs['graph1-rendered']['data']
+
+
+def slots(figure):
+    return figure['data'][0]['customdata']
+
+
+def test_zoom_then_relayout_without_x_keys(client):
+    data = {'key': None, 'profile': None, 'version': 0}
+    status, _, _ = render(client, 'graph1.relayoutData', data, None, None)
+    assert status == 204
+
+    zoom = {'xaxis.range[0]': 10 * SLOT_MS, 'xaxis.range[1]': 50 * SLOT_MS}
+    status, figure, rendered = render(client, 'graph1.relayoutData', data, zoom, None)
+    assert status == 200 and rendered['window'] == [10, 50]
+    assert min(slots(figure)) == 10 and max(slots(figure)) == 50
+
+    # 切换拖动模式、只缩放 y 轴：x 范围没有变化，不重新取点
+    for relayout in ({'dragmode': 'pan'}, {'yaxis.range[0]': 0.2, 'yaxis.range[1]': 0.8}):
+        status, _, _ = render(client, 'graph1.relayoutData', data, relayout, rendered)
+        assert status == 204
+
+    # 之后数据变化时仍按放大后的范围取点
+    rendered = dict(rendered, profile=figure['layout']['uirevision'])
+    data = {'key': None, 'profile': rendered['profile'], 'version': 1}
+    status, figure, rendered = render(client, 'data-store.data', data, {'dragmode': 'pan'}, rendered)
+    assert status == 200 and rendered['window'] == [10, 50]
+    assert min(slots(figure)) == 10 and max(slots(figure)) == 50
+
+    status, figure, rendered = render(client, 'graph1.relayoutData', data, {'xaxis.autorange': True}, rendered)
+    assert status == 200 and rendered['window'] is None
+    assert min(slots(figure)) == 0 and max(slots(figure)) == 95
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from schedule_profile import Profile
+
+TIMES = [f"{m // 60}:{m % 60:02d}" for m in range(0, 1440, 15)]
+
+
+@pytest.fixture
+def profile():
+    rng = np.random.default_rng(0)
+    return Profile(TIMES, rng.random(96), rng.random(96) * 0.2)
+
+
+def assert_bounds(profile):
+    np.testing.assert_array_equal(profile.upper, np.minimum(profile.average + profile.variance, 1))
+    np.testing.assert_array_equal(profile.lower, np.maximum(profile.average - profile.variance, 0))
+
+
+def test_set_only_touches_selected_slots(profile):
+    before = profile.variance.copy()
+    indices = profile.edit_variance([5, 3, 5], 'set', 1.5)
+    assert indices.tolist() == [3, 5]
+    assert profile.variance[3] == profile.variance[5] == 1
+    mask = np.ones(96, dtype=bool)
+    mask[[3, 5]] = False
+    np.testing.assert_array_equal(profile.variance[mask], before[mask])
+    assert_bounds(profile)
+
+
+def test_scale_is_clipped(profile):
+    before = profile.variance.copy()
+    profile.edit_variance([0, 1], 'scale', 2.0)
+    np.testing.assert_allclose(profile.variance[:2], before[:2] * 2)
+    profile.edit_variance([0], 'scale', 100.0)
+    assert profile.variance[0] == 1
+    profile.edit_variance([1], 'scale', -1.0)
+    assert profile.variance[1] == 0
+    assert_bounds(profile)
+
+
+def test_smooth_uses_neighbours_and_extends_edges(profile):
+    before = profile.variance.copy()
+    profile.edit_variance([0, 10, 95], 'smooth', 5)
+    assert profile.variance[10] == pytest.approx(before[8:13].mean())
+    assert profile.variance[0] == pytest.approx((3 * before[0] + before[1] + before[2]) / 5)
+    assert profile.variance[95] == pytest.approx((before[93] + before[94] + 3 * before[95]) / 5)
+    assert profile.variance[9] == before[9]
+    assert_bounds(profile)
+
+
+@pytest.mark.parametrize('window', [1, 2, 4, 3.5])
+def test_smooth_rejects_even_or_small_windows(profile, window):
+    before = profile.variance.copy()
+    with pytest.raises(ValueError):
+        profile.edit_variance([10], 'smooth', window)
+    np.testing.assert_array_equal(profile.variance, before)
+
+
+def test_empty_selection_changes_nothing(profile):
+    before = profile.variance.copy()
+    for operation, value in (('set', 0.5), ('scale', 2.0), ('smooth', 3)):
+        assert profile.edit_variance([], operation, value).size == 0
+    np.testing.assert_array_equal(profile.variance, before)
+
+
+def test_unknown_operation(profile):
+    with pytest.raises(ValueError):
+        profile.edit_variance([0], 'shift', 0.1)
@@ -0,0 +1,34 @@
+from types import SimpleNamespace
+
+import session_store
+from session_store import SessionStore
+
+
+def accessed(store, key):
+    return store._connect().execute('SELECT accessed FROM sessions WHERE key = ?', (key,)).fetchone()[0]
+
+
+def test_load_refreshes_accessed_at_most_once_per_resolution(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(session_store, 'time', SimpleNamespace(time=lambda: now[0]))
+    store = SessionStore(str(tmp_path / 'sessions.sqlite3'), ttl=3600)
+    store.save('a', b'payload')
+
+    now[0] += session_store.ACCESS_RESOLUTION_SECONDS - 1
+    assert store.load('a') == b'payload'
+    assert accessed(store, 'a') == 1000.0
+
+    now[0] += 2
+    assert store.load('a') == b'payload'
+    assert accessed(store, 'a') == now[0]
+
+
+def test_expired_session_is_dropped(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(session_store, 'time', SimpleNamespace(time=lambda: now[0]))
+    store = SessionStore(str(tmp_path / 'sessions.sqlite3'), ttl=600)
+    assert store.save('a', b'payload') == 1
+    now[0] += 601
+    assert store.load('a') is None
+    # 淘汰后重新保存时版本号接着浏览器看到的版本号
+    assert store.save('a', b'payload', min_version=1) == 2
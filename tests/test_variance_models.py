@@ -0,0 +1,36 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from variance_models import PIECEWISE_SEGMENTS, fit_params, piecewise_segments
+
+DEFAULT_CSV = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '作息.csv')
+
+
+def normal_averages():
+    return pd.read_csv(DEFAULT_CSV)['平均作息'].to_numpy(dtype=np.float64)
+
+
+def test_piecewise_segments_all_present():
+    counts = np.bincount(piecewise_segments(normal_averages())[0], minlength=len(PIECEWISE_SEGMENTS))
+    assert (counts > 0).all(), dict(zip(PIECEWISE_SEGMENTS, counts))
+
+
+def test_piecewise_segments_in_time_order():
+    segments = piecewise_segments(normal_averages())[0]
+    # 夜间 -> 启动期 -> 平稳期 -> 结束期 -> 夜间
+    changes = segments[np.flatnonzero(np.diff(segments)) + 1]
+    assert changes.tolist() == [1, 2, 3, 0]
+
+
+def test_piecewise_flat_profile_is_steady():
+    assert (piecewise_segments(np.full(96, 0.3)) == 2).all()
+
+
+def test_fit_params_fits_every_segment():
+    averages = normal_averages()[None, :]
+    segments = piecewise_segments(averages)
+    scale = np.array([1.0, 2.0, 3.0, 4.0])
+    params = fit_params(['341-工作日'], averages, averages ** 3 * scale[segments])
+    assert np.allclose(params['piecewise_multipliers'], scale)
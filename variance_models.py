@@ -0,0 +1,208 @@
+# 作息方差模型注册表
+# 每个模型都是 (平均作息, 系数, 参数, 曲线名称) -> 作息方差 的函数，平均作息可以是一条曲线（长度为时间槽数）
+# 或一批曲线（N×时间槽数），整块数组向量化计算。
+#
+# 内置模型：
+#   cube       立方模型：平均作息³ × 系数（原有模型）
+#   power      幂律模型：c × 平均作息^k × 系数，c、k 由历史数据拟合（没有历史数据时 c=1、k=3，与立方模型相同）
+#   empirical  经验模型：历史数据中同一曲线、同一时间槽的方差 × 系数（没有历史数据的曲线/时间槽按立方模型）
+#   piecewise  分段模型：立方模型 × 各时段系数 × 系数，时段按自动识别的作息时间划分为
+#              夜间、启动期（启动期A~C）、平稳期（启动期C~结束期A）、结束期（结束期A~C），
+#              各时段系数由历史数据拟合（没有历史数据时均为1）
+#
+# 历史数据为长表 CSV（列为 站点, 日型, 日期, 时间, 作息，每天每个时间槽一行），
+# 或原始日志导入的状态文件（.npz，见 ingest.py，其中已经保存了每个时间槽的均值和方差）。
+# 读取和拟合只做一次，拟合参数按历史文件的指纹保存在计算结果缓存中，重启或其他工作进程直接复用。
+import io
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from compute_cache import ComputeCache
+from ingest import load_profiles
+from period_detection import detect_period_indices
+from schedule_profile import cube_variance
+from workspace import profile_label
+
+# 名称 -> (显示名称, 是否需要历史数据, 计算函数)
+VARIANCE_MODELS = {}
+
+DEFAULT_MODEL = 'cube'
+
+# 分段模型的时段，顺序即时段编号
+PIECEWISE_SEGMENTS = ['夜间', '启动期', '平稳期', '结束期']
+
+# 拟合方法的版本：拟合或时段划分的方法变化时加1，之前缓存的拟合参数和全局调整结果自动失效
+FIT_VERSION = 2
+
+# 没有历史数据时的参数
+DEFAULT_PARAMS = {
+    'power_scale': np.float64(1.0),
+    'power_exponent': np.float64(3.0),
+    'piecewise_multipliers': np.ones(len(PIECEWISE_SEGMENTS)),
+    'empirical_labels': np.array([], dtype=str),
+    'empirical_variance': np.zeros((0, 0)),
+}
+
+
+def register_model(name, title, needs_history=False):
+    def decorator(func):
+        VARIANCE_MODELS[name] = (title, needs_history, func)
+        return func
+    return decorator
+
+
+@register_model('cube', "立方模型（平均作息³ × 系数）")
+def cube_model(averages, multiplier, params, labels=None):
+    return cube_variance(averages, multiplier)
+
+
+@register_model('power', "幂律模型（拟合指数）", needs_history=True)
+def power_model(averages, multiplier, params, labels=None):
+    return params['power_scale'] * averages ** params['power_exponent'] * multiplier
+
+
+@register_model('empirical', "经验模型（历史方差）", needs_history=True)
+def empirical_model(averages, multiplier, params, labels=None):
+    fallback = cube_variance(averages, multiplier)
+    known = {label: i for i, label in enumerate(params['empirical_labels'].tolist())}
+    rows = [known.get(label, -1) for label in np.atleast_1d(labels if labels is not None else [])]
+    if not known or len(rows) != len(np.atleast_2d(averages)):
+        return fallback
+    rows = np.asarray(rows)
+    history = params['empirical_variance'][rows] * multiplier
+    history[rows < 0] = np.nan
+    history = history.reshape(np.shape(averages))
+    return np.where(np.isnan(history), fallback, history)
+
+
+# 每个时间槽所属的时段编号（形状同 averages）
+def piecewise_segments(averages):
+    averages = np.atleast_2d(averages)
+    indices = detect_period_indices(averages)
+    slot = np.arange(averages.shape[1])[None, :]
+    start_a, start_c, end_a, end_c = (indices[:, [i]] for i in (0, 2, 3, 5))
+    segments = np.zeros(averages.shape, dtype=np.int64)
+    segments[(slot >= start_a) & (slot < start_c)] = 1
+    segments[(slot >= start_c) & (slot <= end_a)] = 2
+    segments[(slot > end_a) & (slot <= end_c)] = 3
+    # 平坦曲线无法识别作息时间，整条按平稳期
+    segments[indices[:, 0] < 0] = 2
+    return segments
+
+
+@register_model('piecewise', "分段模型（各时段系数）", needs_history=True)
+def piecewise_model(averages, multiplier, params, labels=None):
+    segments = piecewise_segments(averages).reshape(np.shape(averages))
+    return cube_variance(averages, multiplier) * params['piecewise_multipliers'][segments]
+
+
+# 读取历史数据，返回 (曲线名称列表, 平均作息 N×时间槽数, 方差 N×时间槽数)；缺少的时间槽为 NaN
+def load_history(path, times):
+    if path.endswith('.npz'):
+        state_times, keys, means, variances = load_profiles(path)
+        columns = pd.Index(state_times).get_indexer(times)
+        labels = [profile_label(*key) for key in keys]
+        aligned = [np.where(columns >= 0, values[:, columns], np.nan) for values in (means, variances)]
+        return (labels, *aligned)
+    df = pd.read_csv(path, dtype={'站点': str, '日型': str, '时间': str})
+    df['曲线'] = [profile_label(station, day_type) for station, day_type in zip(df['站点'], df['日型'])]
+    stats = df.groupby(['曲线', '时间'])['作息'].agg(['mean', 'var'])
+    labels = stats.index.get_level_values(0).unique().tolist()
+    columns = pd.Index(times, name='时间')
+    means = stats['mean'].unstack().reindex(index=labels, columns=columns).to_numpy(dtype=np.float64)
+    variances = stats['var'].unstack().reindex(index=labels, columns=columns).to_numpy(dtype=np.float64)
+    return labels, means, variances
+
+
+# 由历史统计量拟合各模型的参数
+def fit_params(labels, means, variances):
+    params = dict(DEFAULT_PARAMS)
+    params['empirical_labels'] = np.array(labels, dtype=str)
+    params['empirical_variance'] = variances
+
+    # 幂律：log(方差) = log(c) + k × log(平均作息)，最小二乘
+    usable = (means > 0) & (variances > 0)
+    if usable.sum() >= 2 and np.ptp(means[usable]) > 0:
+        k, log_c = np.polyfit(np.log(means[usable]), np.log(variances[usable]), 1)
+        params['power_scale'] = np.float64(np.exp(log_c))
+        params['power_exponent'] = np.float64(k)
+
+    # 分段：各时段内 方差 / 平均作息³ 的中位数
+    segments = piecewise_segments(np.nan_to_num(means))
+    ratios = np.where(means > 0, variances / np.where(means > 0, means, 1) ** 3, np.nan)
+    multipliers = np.ones(len(PIECEWISE_SEGMENTS))
+    for segment in range(len(PIECEWISE_SEGMENTS)):
+        values = ratios[(segments == segment) & ~np.isnan(ratios)]
+        if values.size:
+            multipliers[segment] = np.median(values)
+    params['piecewise_multipliers'] = multipliers
+    return params
+
+
+def _pack(params):
+    buffer = io.BytesIO()
+    np.savez(buffer, **params)
+    return buffer.getvalue()
+
+
+def _unpack(payload):
+    with np.load(io.BytesIO(payload), allow_pickle=False) as data:
+        return {key: data[key] for key in data.files}
+
+
+class VarianceEngine:
+    def __init__(self, history_path=None, times=None, cache=None):
+        self.history_path = history_path
+        self.times = list(times) if times is not None else None
+        self.cache = cache
+        self._params = None
+        self._params_lock = threading.Lock()
+
+    # 历史数据的指纹：拟合方法版本、文件路径、大小、修改时间和时间槽，文件变化后重新拟合
+    @property
+    def fingerprint(self):
+        if not self.history_path:
+            return None
+        stat = os.stat(self.history_path)
+        return ComputeCache.make_key('variance-params', FIT_VERSION, os.path.abspath(self.history_path),
+                                     stat.st_size, stat.st_mtime_ns, '\n'.join(self.times or []))
+
+    # 拟合参数：首次调用时从缓存读取或拟合一次，之后在进程内复用；多线程同时首次调用时只拟合一次
+    def fit(self):
+        if self._params is None:
+            with self._params_lock:
+                if self._params is None:
+                    self._params = self._load_params()
+        return self._params
+
+    @property
+    def params(self):
+        return self.fit()
+
+    def _load_params(self):
+        if not self.history_path:
+            return dict(DEFAULT_PARAMS)
+        key = self.fingerprint
+        payload = self.cache.get(key) if self.cache is not None else None
+        if payload is not None:
+            return _unpack(payload)
+        params = fit_params(*load_history(self.history_path, self.times))
+        if self.cache is not None:
+            self.cache.set(key, _pack(params))
+        return params
+
+    # 可选的模型 [(名称, 显示名称)]；需要历史数据的模型只在配置了历史数据时可选
+    def available(self):
+        return [(name, title) for name, (title, needs_history, _) in VARIANCE_MODELS.items()
+                if self.history_path or not needs_history]
+
+    def variance(self, model, averages, multiplier, labels=None):
+        _, _, func = VARIANCE_MODELS[model]
+        return func(np.asarray(averages, dtype=np.float64), multiplier, self.params, labels)
+
+    # 返回 (平均作息, 系数) -> 作息方差 的函数，供 Profile/Workspace 的全局调整使用
+    def model_function(self, model, labels=None):
+        return lambda averages, multiplier: self.variance(model, averages, multiplier, labels)
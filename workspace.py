@@ -0,0 +1,164 @@
+# 多作息曲线工作区：同时加载多个站点 × 日型的作息曲线
+# 所有曲线共享同一组时间槽，平均作息保存为 N×时间槽数 的矩阵，
+# 全局方差系数可以对全部曲线一次性向量化计算。
+#
+# 支持四种数据来源：
+#   1. 目录：每个文件名为 "<站点>-<日型>.csv"，列为 时间, 平均作息
+#   2. 单个长表文件：列为 站点, 日型, 时间, 平均作息
+#   3. 原始日志导入的状态文件（.npz，见 ingest.py）
+#   4. 列式作息库目录（见 profile_store.py），平均作息矩阵直接使用内存映射，不复制
+import glob
+import os
+
+import numpy as np
+import pandas as pd
+
+from ingest import load_profiles
+from period_detection import PERIOD_KEYS, detect_period_indices, period_labels
+from profile_store import ProfileStore, is_store
+from schedule_profile import Profile, cube_variance
+
+# 分块导出时每块的曲线数
+EXPORT_CHUNK = 256
+
+
+# 作息曲线的显示名称，例如 "341-工作日"
+def profile_label(station, day_type):
+    return f"{station}-{day_type}" if day_type else str(station)
+
+
+class Workspace:
+    def __init__(self, times, keys, averages):
+        self.times = list(times)
+        self.keys = [(str(station), str(day_type)) for station, day_type in keys]
+        # 平均作息只读（多线程共享）；来自作息库时为内存映射视图
+        self.averages = np.asarray(averages, dtype=np.float64).reshape(len(self.keys), len(self.times))
+        self.averages.flags.writeable = False
+        self.labels = [profile_label(*key) for key in self.keys]
+        self.index = {label: i for i, label in enumerate(self.labels)}
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, label):
+        return label in self.index
+
+    @property
+    def default_label(self):
+        return self.labels[0]
+
+    @classmethod
+    def from_profile(cls, profile, station, day_type):
+        return cls(profile.times, [(station, day_type)], profile.average[np.newaxis, :])
+
+    @classmethod
+    def from_directory(cls, path):
+        files = sorted(glob.glob(os.path.join(path, '*.csv')))
+        if not files:
+            raise ValueError(f"目录中没有作息文件: {path}")
+        times = None
+        keys = []
+        rows = []
+        for file in files:
+            df = pd.read_csv(file)
+            if times is None:
+                times = df['时间'].astype(str).tolist()
+            elif len(df) != len(times):
+                raise ValueError(f"{file} 的时间槽数为{len(df)}，与其他作息曲线（{len(times)}）不一致")
+            stem = os.path.splitext(os.path.basename(file))[0]
+            station, _, day_type = stem.partition('-')
+            keys.append((station, day_type))
+            rows.append(df['平均作息'].to_numpy(dtype=np.float64))
+        return cls(times, keys, np.vstack(rows))
+
+    @classmethod
+    def from_long_file(cls, path):
+        df = pd.read_csv(path, dtype={'站点': str, '日型': str, '时间': str})
+        # 保持时间槽和曲线在文件中首次出现的顺序
+        times = pd.unique(df['时间']).tolist()
+        keys = list(dict.fromkeys(zip(df['站点'], df['日型'])))
+        matrix = df.pivot_table(index=['站点', '日型'], columns='时间', values='平均作息', aggfunc='first')
+        matrix = matrix.reindex(index=pd.MultiIndex.from_tuples(keys), columns=times)
+        if matrix.isna().to_numpy().any():
+            raise ValueError(f"{path} 中部分作息曲线缺少时间槽")
+        return cls(times, keys, matrix.to_numpy(dtype=np.float64))
+
+    @classmethod
+    def from_ingest_state(cls, path):
+        times, keys, averages, _ = load_profiles(path)
+        if not keys:
+            raise ValueError(f"{path} 中还没有汇总完成的作息曲线")
+        return cls(times, keys, averages)
+
+    @classmethod
+    def from_store(cls, path):
+        store = ProfileStore(path)
+        if not len(store):
+            raise ValueError(f"作息库中没有作息曲线: {path}")
+        return cls(store.times, store.keys, store.averages())
+
+    @classmethod
+    def load(cls, path):
+        if is_store(path):
+            return cls.from_store(path)
+        if os.path.isdir(path):
+            return cls.from_directory(path)
+        if path.endswith('.npz'):
+            return cls.from_ingest_state(path)
+        return cls.from_long_file(path)
+
+    # 取出一条作息曲线（方差按系数1.0初始化）
+    def profile(self, label):
+        return Profile(self.times, self.averages[self.index[label]])
+
+    # 全局调整：一次性计算全部曲线的方差和上下界（N×时间槽数）
+    def apply_global(self, multiplier, averages=None, variance_model=cube_variance):
+        averages = self.averages if averages is None else averages
+        variance = variance_model(averages, multiplier)
+        upper = np.minimum(averages + variance, 1)
+        lower = np.maximum(averages - variance, 0)
+        return variance, upper, lower
+
+    # 按块导出长表，每块 chunk 条曲线，内存占用与曲线总数无关：
+    # 站点, 日型, 时间, 平均作息, 作息方差, 作息上界, 作息下界，以及自动识别的作息时间
+    # （作息启动期A/B/C、作息结束期A/B/C，同一曲线的各行相同），作息时间按块一次向量化识别。
+    # overrides 为 {显示名称: Profile}，用于替换会话中已修改过的曲线
+    # variance_model_for(显示名称列表) 返回该块曲线使用的方差模型（方差模型可能与曲线名称有关）
+    def iter_frames(self, multiplier, overrides=None, variance_model_for=None, chunk=EXPORT_CHUNK):
+        for start in range(0, len(self), chunk):
+            labels = self.labels[start:start + chunk]
+            averages = np.array(self.averages[start:start + chunk])
+            variance_model = variance_model_for(labels) if variance_model_for else cube_variance
+            variance, upper, lower = self.apply_global(multiplier, averages, variance_model)
+            self._apply_overrides(labels, overrides, averages, variance, upper, lower)
+            yield self._long_frame(self.keys[start:start + chunk], averages, variance, upper, lower)
+
+    @staticmethod
+    def _apply_overrides(labels, overrides, averages, variance, upper, lower):
+        if not overrides:
+            return
+        for i, label in enumerate(labels):
+            profile = overrides.get(label)
+            if profile is not None:
+                averages[i] = profile.average
+                variance[i] = profile.variance
+                upper[i] = profile.upper
+                lower[i] = profile.lower
+
+    # 作息时间按修改后的平均作息识别
+    def _long_frame(self, keys, averages, variance, upper, lower):
+        n_profiles, n_slots = averages.shape
+        stations, day_types = zip(*keys)
+        periods = period_labels(detect_period_indices(averages), self.times)
+        frame = pd.DataFrame({
+            '站点': np.repeat(stations, n_slots),
+            '日型': np.repeat(day_types, n_slots),
+            '时间': np.tile(self.times, n_profiles),
+            '平均作息': averages.ravel().round(6),
+            '作息方差': variance.ravel().round(6),
+            '作息上界': upper.ravel().round(6),
+            '作息下界': lower.ravel().round(6),
+        })
+        for column, key in enumerate(PERIOD_KEYS):
+            frame[key] = np.repeat(periods[:, column], n_slots)
+        return frame
@@ -1,5 +1,8 @@
 # WSGI entry point for Render deployment
 from app import app
 
+# gunicorn 的入口：gunicorn wsgi:server
+server = app.server
+
 if __name__ == "__main__":
     app.run()